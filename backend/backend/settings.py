@@ -158,6 +158,78 @@ CACHES = {
     }
 }
 
+# Interaction tracking: events are buffered in-process and bulk inserted
+INTERACTION_TRACKING_ENABLED = os.environ.get('INTERACTION_TRACKING_ENABLED', 'True').lower() == 'true'
+INTERACTION_BUFFER_SIZE = 10000  # Oldest events are dropped beyond this
+INTERACTION_FLUSH_BATCH_SIZE = 500
+INTERACTION_FLUSH_INTERVAL = 5  # seconds
+INTERACTION_FLUSH_MAX_RETRIES = 3  # failed flushes of a batch before its bad rows are dropped
+INTERACTION_PROPERTY_IDS_TTL = 300  # seconds
+
+# Listing totals are cached per filtered query and dropped on any property save
+PROPERTY_COUNT_CACHE_TTL = 60  # seconds
+
+# core.aggregation: days per grouped query and rows per upsert when building PropertyStat
+STATS_AGGREGATION_CHUNK_DAYS = 7
+STATS_AGGREGATION_BATCH_SIZE = 1000
+STATS_BACKFILL_MAX_DAYS = 730  # longest backfill the admin endpoint will plan
+
+# core.images: watermark logo (relative to the media root), derivative widths and encoder quality
+WATERMARK_IMAGE = 'logo/logo2.webp'
+IMAGE_DERIVATIVES = {'hero': 1600, 'card': 800, 'thumb': 320}
+IMAGE_JPEG_QUALITY = 85
+IMAGE_WEBP_QUALITY = 80
+# Masters are capped to this longest edge and re-encoded in this format by the image task.
+# 2000 lets JPEG draft decoding do the resize for 4000px and 8000px camera photos.
+IMAGE_MAX_EDGE = 2000
+IMAGE_UPLOAD_FORMAT = 'WEBP'
+IMAGE_WEBP_METHOD = 2  # encoder effort, 0 (fast) to 6 (small)
+WATERMARK_CACHE_SIZE = 16  # scaled logos kept per process, one per (width, opacity)
+
+# core.alerts: cached match index lifetime (seconds) and listings per alert email
+ALERT_INDEX_TIMEOUT = 3600
+ALERT_EMAIL_MAX_PROPERTIES = 10
+
+# core.digests: alert digests and the weekly summary are sent in chunks over one connection
+DIGEST_SEND_CHUNK_SIZE = 100
+
+# core.recommendations: interaction window and neighbours kept per listing
+RECOMMENDER_WINDOW_DAYS = 180
+RECOMMENDER_TOP_K = 20
+RECOMMENDER_SEED_COUNT = 20
+RECOMMENDER_WEIGHTS = {'view': 1.0, 'share': 2.0, 'favorite': 3.0, 'inquiry': 4.0}
+
+# core.popularity: days of PropertyStat scored, score half-lives (days) and weight per event
+POPULARITY_WINDOW_DAYS = 30
+POPULARITY_HALF_LIFE_DAYS = 7
+TRENDING_HALF_LIFE_DAYS = 1
+POPULARITY_WEIGHTS = {'views': 1.0, 'shares': 2.0, 'favorites': 3.0, 'inquiries': 4.0}
+
+# core.feature_index: tag vocabulary size and full reload interval (seconds)
+FEATURE_INDEX_TAGS = 64
+FEATURE_INDEX_MAX_AGE = 3600
+FEATURE_INDEX_LOAD_IN_BACKGROUND = True  # False loads inline, for tests and scripts
+
+# core.media_sync: parallel uploads for manage.py sync_media, multipart above the threshold
+MEDIA_SYNC_WORKERS = 8
+MEDIA_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+MEDIA_MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+
+# core.media_metadata: manage.py update_acl concurrency and request rate limit (per second)
+MEDIA_UPDATE_WORKERS = 16
+MEDIA_UPDATE_RATE = 200
+
+# core.partitions: monthly PropertyInteraction partitions kept ahead, and raw months retained
+INTERACTION_PARTITIONS_AHEAD = 2
+INTERACTION_RETENTION_MONTHS = 13
+INTERACTION_ROLL_OFF_BATCH_SIZE = 5000  # rows per DELETE where the table is not partitioned
+
+# core.caching: stale values are served this long past expiry while one worker refreshes
+CACHE_STALE_TIMEOUT = 300  # seconds
+CACHE_LOCK_TIMEOUT = 30  # seconds a single-flight recompute may hold its lock
+CACHE_LOCK_WAIT = 5  # seconds a cold-miss reader waits for another worker's result
+CACHE_REFRESH_IN_BACKGROUND = True
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -190,6 +262,8 @@ FRONTEND_URL = os.environ.get('FRONTEND_URL', 'https://hsp.co.zw')
 ADMIN_BASE_URL = 'hsp.co.zw'
 ADMINS = [('HSP Admin', 'simbamtombe@gmail.com'), ] #('HSP Admin', 'sales@hsp.co.zw'), ('HSP Admin', 'info@hsp.co.zw'),('HSP Admin', 'leonita@hsp.co.zw',)
 APP_NAME = 'House of Stone Properties'
+ADMIN_EMAILS_LOCAL_TTL = 60  # seconds a process trusts its admin recipient list
+ADMIN_EMAILS_SAVED_FLUSH_INTERVAL = 60  # seconds between flushes of the avoided-query count
 
 # settings.py
 # Email Configuration (Development)
@@ -204,11 +278,31 @@ DEFAULT_FROM_EMAIL = 'HSP <sales@hsp.co.zw>'
 SERVER_EMAIL = 'sales@hsp.co.zw'  # For error notifications
 SITE_NAME = "House of Stone Properties"
 
+# Notification emails go through the EmailOutbox table (core.notifications)
+EMAIL_OUTBOX_BATCH_SIZE = 50  # Emails sent per SMTP connection
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60  # seconds, doubled on each retry
+EMAIL_OUTBOX_CLAIM_TIMEOUT = 600  # seconds before a stuck claim is retried
+
 # Celery settings for async email sending (optional but recommended)
 CELERY_BEAT_SCHEDULE = {
+    'process-email-outbox': {
+        'task': 'core.tasks.process_email_outbox',
+        'schedule': crontab(),  # Every minute, picks up retries
+    },
+    'cleanup-email-outbox': {
+        'task': 'core.tasks.cleanup_email_outbox',
+        'schedule': crontab(minute=30, hour=2),  # Daily at 2:30 AM
+    },
     'check-property-alerts': {
         'task': 'core.tasks.check_property_alerts',
         'schedule': crontab(hour=8, minute=0),  # Daily at 8 AM
+        'kwargs': {'frequency': 'daily'},
+    },
+    'check-weekly-property-alerts': {
+        'task': 'core.tasks.check_property_alerts',
+        'schedule': crontab(hour=8, minute=0, day_of_week=1),  # Monday at 8 AM
+        'kwargs': {'frequency': 'weekly'},
     },
     'weekly-summary': {
         'task': 'core.tasks.send_weekly_summary',
@@ -222,6 +316,30 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'core.tasks.aggregate_daily_stats',
         'schedule': crontab(hour=1, minute=0),  # Daily at 1 AM
     },
+    'flush-live-property-stats': {
+        'task': 'core.tasks.flush_live_property_stats',
+        'schedule': crontab(),  # Every minute
+    },
+    'refresh-dashboard-rollup': {
+        'task': 'core.tasks.refresh_dashboard_rollup',
+        'schedule': crontab(minute='*/15'),  # Every 15 minutes
+    },
+    'refresh-property-popularity': {
+        'task': 'core.tasks.refresh_property_popularity',
+        'schedule': crontab(minute='10-59/15'),  # Every 15 minutes, before the dashboard rollup
+    },
+    'build-property-similarities': {
+        'task': 'core.tasks.build_property_similarities',
+        'schedule': crontab(hour=3, minute=30),  # Daily at 3:30 AM
+    },
+    'maintain-interaction-partitions': {
+        'task': 'core.tasks.maintain_interaction_partitions',
+        'schedule': crontab(hour=4, minute=0),  # Daily at 4 AM, after aggregation
+    },
+    'rebuild-property-facets': {
+        'task': 'core.tasks.rebuild_property_facets',
+        'schedule': crontab(hour=3, minute=0),  # Daily at 3 AM
+    },
 }
 
 # Logging configuration
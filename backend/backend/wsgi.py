@@ -15,3 +15,7 @@ settings_module = 'backend.deployment' if 'RENDER_EXTERNAL_HOSTNAME' in os.envir
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
 
 application = get_wsgi_application()
+
+# Build the similar-listings index before the first request needs it
+from core.feature_index import feature_index  # noqa: E402
+feature_index.load_in_background()
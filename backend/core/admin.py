@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Profile, Inquiry, Property, Neighborhood, SavedSearch, FavoriteProperty, PropertyImage, PropertyAlert, BlogPost, PropertyInteraction, AdminActionLog, Agent, PropertyAgent
+from .models import Profile, Inquiry, Property, Neighborhood, SavedSearch, FavoriteProperty, PropertyImage, PropertyAlert, BlogPost, PropertyInteraction, AdminActionLog, Agent, PropertyAgent, EmailOutbox
 from django.contrib.auth.models import User
 
 class AdminProfileOverview(admin.ModelAdmin):
@@ -179,6 +179,27 @@ class AdminPropertyAgent(admin.ModelAdmin):
         "assigned_date",
     )
 
+class AdminEmailOutbox(admin.ModelAdmin):
+    list_display = (
+        "subject",
+        "template_name",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "created_at",
+        "sent_at",
+    )
+    search_fields = (
+        "subject",
+        "template_name",
+    )
+    list_filter = (
+        "status",
+        "template_name",
+    )
+
+    ordering = ("-created_at",)
+
 
 admin.site.register(Profile, AdminProfileOverview)
 admin.site.register(Inquiry, AdminInquiry)
@@ -193,6 +214,7 @@ admin.site.register(Agent, AdminAgent)
 admin.site.register(PropertyAgent, AdminPropertyAgent)
 admin.site.register(PropertyInteraction)
 admin.site.register(AdminActionLog, AdminActionLogOverview)
+admin.site.register(EmailOutbox, AdminEmailOutbox)
 
 admin.site.site_header = "House of Stone Properties Admin"
 admin.site.site_title = "Properties Admin"
@@ -0,0 +1,330 @@
+# core/aggregation.py
+"""
+Statistics aggregation.
+
+aggregate_interactions() turns raw PropertyInteraction rows into daily
+PropertyStat rows. Each chunk of days is one grouped query, with the
+interaction types pivoted into columns in SQL, and one bulk upsert on
+(property, date). Long backfills are split into BackfillChunk checkpoints
+that core.tasks runs in parallel and can resume.
+
+DashboardRollup backs the admin dashboard. It keeps one row per day
+(interaction totals from PropertyStat, new users, new listings) and one
+all-time row. rollup_day() recomputes a day
+and adds the difference to the all-time row, so totals never need a scan of
+the whole PropertyStat history. refresh_dashboard_snapshot() stores the
+platform counts and top lists on the all-time row, taking the popular
+listings from PropertyPopularity (core.popularity); the dashboard then reads
+at most fifteen small rows.
+"""
+import logging
+import time
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .caching import ADMIN_DASHBOARD, invalidate_namespace
+
+logger = logging.getLogger(__name__)
+
+STAT_METRICS = ('views', 'inquiries', 'favorites', 'shares')
+DAY_METRICS = STAT_METRICS + ('new_users', 'new_properties')
+
+# PropertyStat column -> PropertyInteraction.interaction_type
+INTERACTION_METRICS = {
+    'views': 'view',
+    'inquiries': 'inquiry',
+    'favorites': 'favorite',
+    'shares': 'share',
+}
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def aggregate_interactions(start_date, end_date, chunk_days=None):
+    """
+    Write PropertyStat rows for every property with interactions between
+    start_date and end_date (inclusive), chunk_days at a time.
+    Returns the row count and throughput.
+    """
+    from .models import PropertyInteraction, PropertyStat
+
+    chunk_days = chunk_days or getattr(settings, 'STATS_AGGREGATION_CHUNK_DAYS', 7)
+    batch_size = getattr(settings, 'STATS_AGGREGATION_BATCH_SIZE', 1000)
+    started = time.monotonic()
+    written = 0
+
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+
+        # Range on the raw column so an index on timestamp can be used
+        rows = (
+            PropertyInteraction.objects.filter(
+                timestamp__gte=_day_start(chunk_start),
+                timestamp__lt=_day_start(chunk_end + timedelta(days=1)),
+            )
+            .annotate(day=TruncDate('timestamp'))
+            .order_by()
+            .values('property_id', 'day')
+            .annotate(**{
+                metric: Count('id', filter=Q(interaction_type=interaction_type))
+                for metric, interaction_type in INTERACTION_METRICS.items()
+            })
+        )
+        stats = [
+            PropertyStat(
+                property_id=row['property_id'],
+                date=row['day'],
+                **{metric: row[metric] for metric in INTERACTION_METRICS}
+            )
+            for row in rows
+        ]
+        PropertyStat.objects.bulk_create(
+            stats,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['property', 'date'],
+            update_fields=list(INTERACTION_METRICS),
+        )
+        written += len(stats)
+        chunk_start = chunk_end + timedelta(days=1)
+
+    elapsed = time.monotonic() - started
+    return {
+        'start_date': str(start_date),
+        'end_date': str(end_date),
+        'rows': written,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(written / elapsed, 1) if elapsed else written,
+    }
+
+
+def plan_backfill(start_date, end_date, chunk_days=None):
+    """Create a BackfillRun with one checkpoint chunk per chunk_days days"""
+    from .models import BackfillChunk, BackfillRun
+
+    chunk_days = chunk_days or getattr(settings, 'STATS_AGGREGATION_CHUNK_DAYS', 7)
+    with transaction.atomic():
+        run = BackfillRun.objects.create(
+            start_date=start_date, end_date=end_date, chunk_days=chunk_days
+        )
+        chunks = []
+        chunk_start = start_date
+        while chunk_start <= end_date:
+            chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+            chunks.append(BackfillChunk(run=run, start_date=chunk_start, end_date=chunk_end))
+            chunk_start = chunk_end + timedelta(days=1)
+        BackfillChunk.objects.bulk_create(chunks)
+    return run
+
+
+def backfill_progress(run):
+    """Days done and remaining for a backfill run, plus its throughput"""
+    chunks = list(run.chunks.all())
+    days_total = (run.end_date - run.start_date).days + 1
+    days_done = sum(chunk.days for chunk in chunks if chunk.status == 'done')
+    rows = sum(chunk.rows for chunk in chunks)
+    elapsed = ((run.finished_at or timezone.now()) - run.created_at).total_seconds()
+    by_status = {}
+    for chunk in chunks:
+        by_status[chunk.status] = by_status.get(chunk.status, 0) + 1
+
+    return {
+        'id': run.id,
+        'status': run.status,
+        'start_date': run.start_date,
+        'end_date': run.end_date,
+        'days_total': days_total,
+        'days_done': days_done,
+        'days_remaining': days_total - days_done,
+        'percent': round(days_done * 100 / days_total, 1) if days_total else 100,
+        'chunks': by_status,
+        'rows': rows,
+        'rows_per_second': round(rows / elapsed, 1) if elapsed > 0 else rows,
+        'created_at': run.created_at,
+        'finished_at': run.finished_at,
+        'errors': [
+            {'start_date': chunk.start_date, 'error': chunk.last_error}
+            for chunk in chunks if chunk.status == 'failed'
+        ],
+    }
+
+
+def compute_day(day):
+    """Dashboard figures for one date, straight from the source tables"""
+    from .models import Property, PropertyStat
+
+    figures = PropertyStat.objects.filter(date=day).aggregate(
+        **{metric: Sum(metric) for metric in STAT_METRICS}
+    )
+    figures = {metric: figures[metric] or 0 for metric in STAT_METRICS}
+    figures['new_users'] = User.objects.filter(date_joined__date=day).count()
+    figures['new_properties'] = Property.objects.filter(created_at__date=day).count()
+    return figures
+
+
+def rollup_day(day):
+    """Recompute one day's row and fold the change into the all-time row"""
+    from .models import DashboardRollup
+
+    figures = compute_day(day)
+    with transaction.atomic():
+        row, created = DashboardRollup.objects.select_for_update().get_or_create(
+            period='day', date=day
+        )
+        delta = {metric: figures[metric] - getattr(row, metric) for metric in STAT_METRICS}
+        for metric, value in figures.items():
+            setattr(row, metric, value)
+        row.save()
+
+        total, created = DashboardRollup.objects.get_or_create(
+            period='total', defaults={'date': day}
+        )
+        if any(delta.values()) or day > total.date:
+            DashboardRollup.objects.filter(pk=total.pk).update(
+                date=max(day, total.date),
+                **{metric: F(metric) + change for metric, change in delta.items()}
+            )
+    return figures
+
+
+def refresh_dashboard_snapshot():
+    """Store current platform counts and top lists on the all-time row"""
+    from .models import AdminActionLog, DashboardRollup, Property, PropertyPopularity
+
+    today = date.today()
+
+    listings = Property.objects.aggregate(
+        active_listings=Count('id', filter=Q(is_published=True)),
+        pending_listings=Count('id', filter=Q(is_published=False)),
+    )
+    users = User.objects.aggregate(
+        total_users=Count('id'),
+        active_admins=Count('id', filter=Q(is_staff=True)),
+    )
+
+    # Popular properties: the top of the maintained popularity scores
+    popular_properties = PropertyPopularity.objects.filter(
+        popularity_score__gt=0
+    ).order_by('-popularity_score', 'property').values(
+        'property_id', 'property__title', 'property__location',
+        'views', 'inquiries', 'favorites', 'shares',
+    )[:10]
+
+    snapshot = {
+        **listings,
+        **users,
+        'popular_properties': [
+            {
+                'id': p['property_id'],
+                'title': p['property__title'],
+                'location': p['property__location'],
+                'views': p['views'],
+                'inquiries': p['inquiries'],
+                'favorites': p['favorites'],
+                'shares': p['shares'],
+            } for p in popular_properties
+        ],
+        'popular_locations': list(
+            Property.objects.values('location')
+            .annotate(count=Count('id'))
+            .order_by('-count')[:5]
+        ),
+        'admin_activity': list(
+            AdminActionLog.objects.values('action_type')
+            .annotate(total=Count('id'))
+            .order_by('-total')
+        ),
+    }
+
+    # Today's row so user growth includes signups since midnight
+    rollup_day(today)
+    DashboardRollup.objects.filter(period='total').update(snapshot=snapshot)
+    transaction.on_commit(lambda: invalidate_namespace(ADMIN_DASHBOARD))
+    return snapshot
+
+
+def dashboard_stats():
+    """
+    Platform-wide dashboard figures, read from the rollup table in one query.
+    The calling admin's recent actions are added by the view.
+    """
+    from .models import DashboardRollup
+
+    today = date.today()
+    seven_days_ago = today - timedelta(days=7)
+    fourteen_days_ago = today - timedelta(days=14)
+
+    rows = list(DashboardRollup.objects.filter(
+        Q(period='total') | Q(period='day', date__gte=fourteen_days_ago)
+    ))
+    total = next((row for row in rows if row.period == 'total'), None)
+    if total is None or not total.snapshot:
+        # First load after deployment: build the snapshot, then read again
+        refresh_dashboard_snapshot()
+        return dashboard_stats()
+
+    days = [row for row in rows if row.period == 'day']
+    current = [row for row in days if row.date >= seven_days_ago]
+    previous = [row for row in days if row.date < seven_days_ago]
+
+    # Calculate trends (percentage change)
+    def calc_trend(metric):
+        now = sum(getattr(row, metric) for row in current)
+        before = sum(getattr(row, metric) for row in previous)
+        if before == 0:
+            return 100 if now > 0 else 0
+        return round(((now - before) / before) * 100, 1)
+
+    snapshot = total.snapshot
+    return {
+        # Summary stats
+        'total_views': total.views,
+        'total_inquiries': total.inquiries,
+        'total_favorites': total.favorites,
+        'total_shares': total.shares,
+
+        # Period stats with daily breakdown
+        'stats_last_7_days': [
+            {
+                'date': row.date,
+                'total_views': row.views,
+                'total_inquiries': row.inquiries,
+                'total_favorites': row.favorites,
+                'total_shares': row.shares,
+            }
+            for row in sorted(current, key=lambda row: row.date, reverse=True)
+            if any(getattr(row, metric) for metric in STAT_METRICS)
+        ],
+
+        # Trends
+        'trends': {metric: calc_trend(metric) for metric in STAT_METRICS},
+
+        # Popular properties
+        'popular_properties': snapshot.get('popular_properties', []),
+
+        # Platform stats
+        'total_users': snapshot.get('total_users', 0),
+        'active_listings': snapshot.get('active_listings', 0),
+        'pending_listings': snapshot.get('pending_listings', 0),
+        'active_admins': snapshot.get('active_admins', 0),
+
+        # Location breakdown
+        'popular_locations': snapshot.get('popular_locations', []),
+
+        # Admin activity
+        'user_growth': [
+            {'date': row.date, 'count': row.new_users}
+            for row in sorted(current, key=lambda row: row.date, reverse=True)
+            if row.new_users
+        ],
+        'admin_activity': snapshot.get('admin_activity', []),
+    }
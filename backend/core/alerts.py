@@ -0,0 +1,352 @@
+# core/alerts.py
+"""
+Matching listings against PropertyAlert and SavedSearch criteria.
+
+Instead of running one Property query per alert, the criteria of every
+active alert and saved search are loaded into an AlertIndex:
+
+- a term index per exact-match field (type, category, status);
+- an interval index per range field (price, beds, baths): the lower and
+  upper bounds sorted separately, so the subscriptions whose range holds a
+  value are two bisects away;
+- a trigram index over location fragments, verified with a substring test
+  so the result matches location__icontains.
+
+A saved listing is tested against the index once, so matching costs the
+same however many people subscribe. The index is cached and rebuilt when an
+alert or saved search changes.
+
+Matches are stored as AlertMatch rows, which also stop a listing from being
+announced twice: match_property() locks the listing's row while it checks,
+records and announces its matches, so two tasks for the same listing (a
+create and an edit queued back to back) run one after the other and the
+second finds the first one's rows.
+
+Saved search matches become in-app Notifications straight away, as do
+instant alerts, which are emailed too. Daily and weekly alerts
+collect their matches for core.digests.send_alert_digests().
+"""
+import logging
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import ALERT_INDEX, cached
+
+logger = logging.getLogger(__name__)
+
+TERM_FIELDS = ('property_type', 'category', 'status')
+RANGE_FIELDS = ('price', 'beds', 'baths')
+
+# Property fields whose change can make a listing match
+MATCH_FIELDS = ('is_published',) + TERM_FIELDS + RANGE_FIELDS + ('location',)
+
+# Accepted criteria keys: the listing filter parameters and ORM lookups
+RANGE_KEYS = {
+    'price': (('price_min', 'min_price', 'price__gte'), ('price_max', 'max_price', 'price__lte')),
+    'beds': (('beds_min', 'min_beds', 'beds__gte'), ('beds_max', 'max_beds', 'beds__lte')),
+    'baths': (('baths_min', 'min_baths', 'baths__gte'), ('baths_max', 'max_baths', 'baths__lte')),
+}
+LOCATION_KEYS = ('location', 'location__icontains')
+
+# Alerts without a status only hear about listings still on the market
+DEFAULT_STATUS = 'available'
+
+UNBOUNDED = (float('-inf'), float('inf'))
+
+# Candidate sets smaller than this are range-checked one by one
+INTERVAL_SCAN_THRESHOLD = 256
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _values(value):
+    if isinstance(value, (list, tuple)):
+        values = value
+    else:
+        values = str(value).split(',')
+    return {str(v).strip().lower() for v in values if str(v).strip() and str(v).strip() != 'all'}
+
+
+def parse_criteria(params):
+    """
+    Normalise alert or saved search parameters into
+    {'terms': {field: set}, 'ranges': {field: (low, high)}, 'location': str}.
+    Keys that are not listing filters are ignored.
+    """
+    params = params if isinstance(params, dict) else {}
+    terms = {}
+    for field in TERM_FIELDS:
+        value = params.get(field, params.get(f'{field}__in'))
+        if value not in (None, ''):
+            values = _values(value)
+            if values:
+                terms[field] = values
+    terms.setdefault('status', {DEFAULT_STATUS})
+
+    ranges = {}
+    for field, (low_keys, high_keys) in RANGE_KEYS.items():
+        exact = _number(params.get(field))
+        low = next((_number(params[key]) for key in low_keys if _number(params.get(key)) is not None), None)
+        high = next((_number(params[key]) for key in high_keys if _number(params.get(key)) is not None), None)
+        if exact is not None:
+            low = high = exact
+        if low is not None or high is not None:
+            ranges[field] = (
+                low if low is not None else UNBOUNDED[0],
+                high if high is not None else UNBOUNDED[1],
+            )
+
+    location = next(
+        (str(params[key]).strip().lower() for key in LOCATION_KEYS if str(params.get(key) or '').strip()),
+        '',
+    )
+    return {'terms': terms, 'ranges': ranges, 'location': location}
+
+
+def _in_range(bounds, value):
+    if bounds is None:
+        return True
+    return value is not None and bounds[0] <= float(value) <= bounds[1]
+
+
+class IntervalIndex:
+    """Subscriptions by [low, high] range; stab() returns those containing a value"""
+
+    def __init__(self, intervals, everyone):
+        self.unbounded = {key for key in everyone if key not in intervals}
+        by_low = sorted((low, key) for key, (low, high) in intervals.items())
+        by_high = sorted((high, key) for key, (low, high) in intervals.items())
+        self.lows = [low for low, key in by_low]
+        self.low_keys = [key for low, key in by_low]
+        self.highs = [high for high, key in by_high]
+        self.high_keys = [key for high, key in by_high]
+
+    def stab(self, value):
+        if value is None:
+            return self.unbounded
+        value = float(value)
+        started = set(self.low_keys[:bisect_right(self.lows, value)])
+        started.intersection_update(self.high_keys[bisect_left(self.highs, value):])
+        return started | self.unbounded
+
+
+class AlertIndex:
+    """
+    Inverted index over subscription criteria. Subscriptions are keyed
+    ('alert', id) or ('search', id).
+    """
+
+    def __init__(self, subscriptions):
+        self.subscriptions = subscriptions
+        everyone = set(subscriptions)
+
+        self.terms = {}
+        for field in TERM_FIELDS:
+            postings = defaultdict(set)
+            unconstrained = set()
+            for key, criteria in subscriptions.items():
+                values = criteria['terms'].get(field)
+                if values is None:
+                    unconstrained.add(key)
+                for value in values or ():
+                    postings[value].add(key)
+            self.terms[field] = (dict(postings), unconstrained)
+
+        self.ranges = {
+            field: IntervalIndex(
+                {key: c['ranges'][field] for key, c in subscriptions.items() if field in c['ranges']},
+                everyone,
+            )
+            for field in RANGE_FIELDS
+        }
+
+        self.trigrams = defaultdict(set)
+        self.short_locations = set()
+        self.anywhere = set()
+        for key, criteria in subscriptions.items():
+            needle = criteria['location']
+            if not needle:
+                self.anywhere.add(key)
+            elif len(needle) < 3:
+                self.short_locations.add(key)
+            else:
+                self.trigrams[needle[:3]].add(key)
+
+    def _location_matches(self, location):
+        location = (location or '').lower()
+        candidates = set(self.short_locations)
+        for i in range(len(location) - 2):
+            candidates |= self.trigrams.get(location[i:i + 3], set())
+        return self.anywhere | {
+            key for key in candidates
+            if self.subscriptions[key]['location'] in location
+        }
+
+    def match(self, values):
+        """Keys of the subscriptions a listing, as a dict of field values, satisfies"""
+        candidate_sets = []
+        for field in TERM_FIELDS:
+            postings, unconstrained = self.terms[field]
+            value = str(values.get(field) or '').lower()
+            candidate_sets.append(postings.get(value, set()) | unconstrained)
+        candidate_sets.sort(key=len)
+        if not candidate_sets[0]:
+            return set()
+
+        matches = set(candidate_sets[0])
+        for candidates in candidate_sets[1:]:
+            matches &= candidates
+        for field in RANGE_FIELDS:
+            if not matches:
+                return matches
+            value = values.get(field)
+            if len(matches) > INTERVAL_SCAN_THRESHOLD:
+                matches &= self.ranges[field].stab(value)
+            else:
+                # Checking a few candidates beats materialising the stab set
+                matches = {
+                    key for key in matches
+                    if _in_range(self.subscriptions[key]['ranges'].get(field), value)
+                }
+        if matches:
+            matches &= self._location_matches(values.get('location'))
+        return matches
+
+    def __len__(self):
+        return len(self.subscriptions)
+
+
+def build_index():
+    from .models import PropertyAlert, SavedSearch
+
+    subscriptions = {}
+    for alert_id, params in PropertyAlert.objects.filter(is_active=True).values_list(
+        'id', 'search_parameters'
+    ).iterator():
+        subscriptions[('alert', alert_id)] = parse_criteria(params)
+    for search_id, params in SavedSearch.objects.values_list('id', 'filters').iterator():
+        subscriptions[('search', search_id)] = parse_criteria(params)
+    return AlertIndex(subscriptions)
+
+
+def get_index():
+    return cached(
+        'index', build_index,
+        timeout=getattr(settings, 'ALERT_INDEX_TIMEOUT', 3600), namespace=ALERT_INDEX,
+    )
+
+
+def listing_values(instance):
+    return {field: getattr(instance, field) for field in MATCH_FIELDS}
+
+
+def match_property(property_id):
+    """
+    Record the alerts and saved searches a listing newly matches and send the
+    immediate notifications. Returns the number of new matches.
+    """
+    from .models import Property
+
+    with transaction.atomic():
+        # Held until the matches and notifications commit
+        instance = Property.objects.select_for_update().filter(pk=property_id).first()
+        if instance is None or not instance.is_published:
+            return 0
+        return _record_matches(instance)
+
+
+def _record_matches(instance):
+    """match_property() for a listing whose row the caller holds locked"""
+    from .models import AlertMatch, Notification, PropertyAlert, SavedSearch
+
+    keys = get_index().match(listing_values(instance))
+    if not keys:
+        return 0
+    alert_ids = {key_id for kind, key_id in keys if kind == 'alert'}
+    search_ids = {key_id for kind, key_id in keys if kind == 'search'}
+
+    # Only matches not recorded before are announced
+    known = AlertMatch.objects.filter(property=instance)
+    alert_ids -= set(known.filter(alert_id__in=alert_ids).values_list('alert_id', flat=True))
+    search_ids -= set(known.filter(saved_search_id__in=search_ids).values_list('saved_search_id', flat=True))
+    alerts = list(PropertyAlert.objects.filter(
+        pk__in=alert_ids, is_active=True
+    ).select_related('user'))
+    searches = list(SavedSearch.objects.filter(pk__in=search_ids))
+
+    now = timezone.now()
+    instant = [alert for alert in alerts if alert.frequency == 'instant']
+    AlertMatch.objects.bulk_create(
+        [
+            AlertMatch(alert=alert, property=instance,
+                       notified_at=now if alert.frequency == 'instant' else None)
+            for alert in alerts
+        ] + [AlertMatch(saved_search=search, property=instance) for search in searches],
+        ignore_conflicts=True,
+    )
+
+    data = {
+        'property_id': instance.id,
+        'property_title': instance.title,
+        'property_location': instance.location,
+    }
+    Notification.objects.bulk_create(
+        [
+            Notification(
+                user_id=search.user_id,
+                notification_type='property_match',
+                title='New Listing Matches Your Saved Search',
+                message=f'"{instance.title}" in {instance.location} matches your saved search',
+                data=dict(data, saved_search_id=search.id),
+            )
+            for search in searches
+        ] + [
+            Notification(
+                user_id=alert.user_id,
+                notification_type='property_match',
+                title='New Listing Matches Your Alert',
+                message=f'"{instance.title}" in {instance.location} matches your alert',
+                data=dict(data, alert_id=alert.id),
+            )
+            for alert in instant
+        ]
+    )
+    for alert in instant:
+        send_alert_email(alert, [instance.id])
+
+    logger.info(
+        f"Property {instance.id} matched {len(alerts)} alerts and {len(searches)} saved searches"
+    )
+    return len(alerts) + len(searches)
+
+
+def send_alert_email(alert, property_ids):
+    from .models import Property
+    from .signals import send_notification_email
+
+    if not alert.user.email:
+        return
+    limit = getattr(settings, 'ALERT_EMAIL_MAX_PROPERTIES', 10)
+    send_notification_email(
+        subject="New Properties Match Your Alert",
+        template_name='property_alert',
+        context={
+            'user': alert.user,
+            'alert': alert,
+            'properties': Property.objects.filter(pk__in=property_ids[:limit]),
+            'total': len(property_ids),
+            'site_name': settings.SITE_NAME,
+            'site_url': settings.FRONTEND_URL,
+            'timestamp': timezone.now(),
+        },
+        recipient_list=[alert.user.email],
+    )
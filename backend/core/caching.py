@@ -0,0 +1,187 @@
+# core/caching.py
+"""
+Stampede-safe caching for expensive reads.
+
+cached() stores each value with its soft expiry and the time it took to
+compute. Readers then:
+
+- serve fresh values directly, but refresh a little early with a probability
+  that rises as expiry approaches and with the cost of the computation
+  (probabilistic early expiration, "XFetch"), so hot keys rarely expire at all;
+- serve a stale value for up to stale_timeout seconds past expiry while one
+  worker recomputes it in the background (stale-while-revalidate);
+- on a cold miss, let exactly one worker compute (a cache.add lock, i.e.
+  SET NX on Redis) while the others wait briefly for its result.
+
+Keys live in versioned namespaces. invalidate_namespace() bumps the version,
+which orphans every key in it at once; model signals call it when the
+underlying data changes.
+"""
+import hashlib
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# Namespaces invalidated from core.signals
+PROPERTY_FACETS = 'property_facets'
+ADMIN_DASHBOARD = 'admin_dashboard'
+AGENT_STATS = 'agent_stats'
+ALERT_INDEX = 'alert_index'
+FEATURE_INDEX = 'feature_index'
+
+
+def namespace_version(namespace):
+    key = f'cachens:{namespace}'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key) or 1
+    return version
+
+
+def invalidate_namespace(namespace):
+    """Make every key cached under namespace unreachable; returns the new version"""
+    key = f'cachens:{namespace}'
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+        return 2
+
+
+def make_key(key, namespace=None):
+    if namespace is None:
+        return f'cached:{key}'
+    return f'cached:{namespace}:v{namespace_version(namespace)}:{key}'
+
+
+def hashed_key(*parts):
+    """Short stable key for arbitrary arguments"""
+    return hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+
+
+def get_redis_connection_or_none():
+    """Raw Redis client behind the default cache, or None for other backends"""
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except Exception:
+        return None
+
+
+def _acquire(lock_key, timeout):
+    """
+    Try to take the single-flight lock. Returns the owner token, None if
+    someone else holds it, or False if the cache is unreachable.
+    """
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, timeout):
+        return token
+    if cache.get(lock_key) is None:
+        # add() failed but nothing holds the lock: the cache is down
+        return False
+    return None
+
+
+def _release(lock_key, token):
+    if token and cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def _store(full_key, compute, timeout, stale_timeout):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+    entry = {'value': value, 'expires': time.time() + timeout, 'delta': delta}
+    cache.set(full_key, entry, timeout + stale_timeout)
+    return value
+
+
+def _refresh(full_key, lock_key, token, compute, timeout, stale_timeout):
+    try:
+        _store(full_key, compute, timeout, stale_timeout)
+    except Exception as e:
+        logger.error(f"Error refreshing cache key {full_key}: {str(e)}")
+    finally:
+        _release(lock_key, token)
+
+
+def _refresh_in_background(*args):
+    if not getattr(settings, 'CACHE_REFRESH_IN_BACKGROUND', True):
+        _refresh(*args)
+        return
+
+    def run():
+        try:
+            _refresh(*args)
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=run, name='cache-refresh', daemon=True).start()
+
+
+def _should_refresh_early(entry, beta):
+    # XFetch: now - delta * beta * ln(rand) >= expiry
+    return time.time() - entry['delta'] * beta * math.log(random.random() or 1e-12) >= entry['expires']
+
+
+def cached(key, compute, timeout=300, namespace=None, stale_timeout=None, beta=1.0):
+    """
+    Return the cached value for key, computing it with compute() when needed.
+    stale_timeout defaults to CACHE_STALE_TIMEOUT; beta > 1 refreshes earlier.
+    """
+    if stale_timeout is None:
+        stale_timeout = getattr(settings, 'CACHE_STALE_TIMEOUT', 300)
+    lock_timeout = getattr(settings, 'CACHE_LOCK_TIMEOUT', 30)
+
+    full_key = make_key(key, namespace)
+    lock_key = f'{full_key}:lock'
+    entry = cache.get(full_key)
+
+    if entry is not None:
+        if time.time() < entry['expires'] and not _should_refresh_early(entry, beta):
+            return entry['value']
+        # Expiring or stale: one worker refreshes, everyone keeps serving
+        token = _acquire(lock_key, lock_timeout)
+        if token:
+            _refresh_in_background(full_key, lock_key, token, compute, timeout, stale_timeout)
+        return entry['value']
+
+    token = _acquire(lock_key, lock_timeout)
+    if token is False:
+        return compute()
+    if token is None:
+        value = _wait_for(full_key, getattr(settings, 'CACHE_LOCK_WAIT', 5))
+        if value is not _MISSING:
+            return value
+        # The computing worker is slow or died; do not make the caller wait longer
+        return compute()
+
+    try:
+        return _store(full_key, compute, timeout, stale_timeout)
+    finally:
+        _release(lock_key, token)
+
+
+def _wait_for(full_key, wait):
+    deadline = time.monotonic() + wait
+    delay = 0.05
+    while time.monotonic() < deadline:
+        time.sleep(delay)
+        entry = cache.get(full_key)
+        if entry is not None:
+            return entry['value']
+        delay = min(delay * 2, 0.5)
+    return _MISSING
+
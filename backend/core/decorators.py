@@ -1,24 +1,24 @@
-from django.core.cache import cache
 from functools import wraps
-import hashlib
 
-def cache_query(timeout=300):
+from .caching import cached, hashed_key
+
+
+def cache_query(timeout=300, namespace=None, stale_timeout=None):
+    """
+    Cache a function's result per arguments, with stampede protection and
+    stale-while-revalidate (see core.caching.cached).
+    """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
             # Create cache key from function name and arguments
-            cache_key = hashlib.md5(
-                f"{func.__name__}_{str(args)}_{str(kwargs)}".encode()
-            ).hexdigest()
-            
-            # Try to get from cache
-            result = cache.get(cache_key)
-            if result is not None:
-                return result
-            
-            # Execute query and cache result
-            result = func(*args, **kwargs)
-            cache.set(cache_key, result, timeout)
-            return result
+            cache_key = f"{func.__module__}.{func.__qualname__}:" + hashed_key(args, sorted(kwargs.items()))
+            return cached(
+                cache_key,
+                lambda: func(*args, **kwargs),
+                timeout=timeout,
+                namespace=namespace,
+                stale_timeout=stale_timeout,
+            )
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,237 @@
+# core/digests.py
+"""
+Batch delivery for digest emails: alert digests and the weekly summary.
+
+Digests go out in bulk at fixed times, so they skip the per-message outbox
+used for transactional mail (core.notifications). A DigestBatch renders
+each message from a compiled template that is loaded once per process, then
+sends everything through one mail connection, in chunks of
+DIGEST_SEND_CHUNK_SIZE. Messages go out one send_messages() call at a time:
+SMTP raises on the first refused message after delivering the ones before
+it, so a batched call could not say which were sent without risking
+duplicates. After a failed message the connection is reopened, so a single
+bad address does not sink the others. Callers get per-run delivery stats
+and the keys of the messages that failed, so they can leave those for the
+next run.
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Count, Q
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def compiled_template(template_name):
+    return get_template(f'emails/{template_name}.html')
+
+
+class DigestBatch:
+    """Rendered digest messages waiting to go out over one connection"""
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size or getattr(settings, 'DIGEST_SEND_CHUNK_SIZE', 100)
+        self.messages = []
+        self.stats = {
+            'messages': 0, 'sent': 0, 'failed': 0, 'render_errors': 0, 'chunks': 0,
+            'render_seconds': 0.0, 'send_seconds': 0.0,
+        }
+        self.failed_keys = []
+
+    def add(self, template_name, subject, context, recipient_list, key=None, from_email=None):
+        """Render one message; key identifies it in failed_keys"""
+        started = time.monotonic()
+        try:
+            html_content = compiled_template(template_name).render(context)
+        except Exception as e:
+            logger.error(f"Error rendering digest {template_name} for {recipient_list}: {str(e)}")
+            self.stats['render_errors'] += 1
+            self.failed_keys.append(key)
+            return
+        finally:
+            self.stats['render_seconds'] += time.monotonic() - started
+
+        msg = EmailMultiAlternatives(
+            subject=subject,
+            body=strip_tags(html_content),
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            to=list(recipient_list),
+        )
+        msg.attach_alternative(html_content, "text/html")
+        self.messages.append((key, msg))
+        self.stats['messages'] += 1
+
+    def _send_chunk(self, connection, chunk):
+        """Send each message in chunk, counting it as sent or failed"""
+        for key, msg in chunk:
+            try:
+                delivered = connection.send_messages([msg])
+                broken = False
+            except Exception as e:
+                logger.error(f"Failed to send digest to {msg.to}: {str(e)}")
+                delivered = 0
+                broken = True
+
+            if delivered:
+                self.stats['sent'] += 1
+            else:
+                self.stats['failed'] += 1
+                self.failed_keys.append(key)
+
+            if broken:
+                # The server may have dropped the session after the error
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+                connection.open()
+
+    def send(self):
+        """Send every rendered message; returns the run's stats"""
+        started = time.monotonic()
+        if self.messages:
+            connection = get_connection(fail_silently=False)
+            try:
+                connection.open()
+                for i in range(0, len(self.messages), self.chunk_size):
+                    self._send_chunk(connection, self.messages[i:i + self.chunk_size])
+                    self.stats['chunks'] += 1
+            except Exception as e:
+                # Could not reach the mail server at all
+                logger.error(f"Error opening mail connection for digests: {str(e)}")
+                unsent = self.messages[self.stats['sent'] + self.stats['failed']:]
+                self.stats['failed'] += len(unsent)
+                self.failed_keys.extend(key for key, msg in unsent)
+            finally:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+            self.messages = []
+
+        self.stats['send_seconds'] += time.monotonic() - started
+        return self.result()
+
+    def result(self):
+        return dict(
+            self.stats,
+            render_seconds=round(self.stats['render_seconds'], 3),
+            send_seconds=round(self.stats['send_seconds'], 3),
+        )
+
+
+def send_alert_digests(frequency, chunk_size=None):
+    """
+    Email every daily or weekly PropertyAlert the listings it matched since
+    its last digest. All matched listings are loaded in one query. Matches
+    whose email failed stay pending for the next run. Returns the run's stats.
+    """
+    from .models import AlertMatch, Property, PropertyAlert
+
+    limit = getattr(settings, 'ALERT_EMAIL_MAX_PROPERTIES', 10)
+    pending = AlertMatch.objects.filter(
+        alert__frequency=frequency, alert__is_active=True, notified_at__isnull=True,
+    ).order_by('-created_at').values_list('id', 'alert_id', 'property_id')
+
+    match_ids = defaultdict(list)
+    property_ids = defaultdict(list)
+    for match_id, alert_id, property_id in pending:
+        match_ids[alert_id].append(match_id)
+        property_ids[alert_id].append(property_id)
+
+    # Listings unpublished since they matched are left out
+    properties = Property.objects.filter(
+        pk__in={pk for ids in property_ids.values() for pk in ids}, is_published=True,
+    ).in_bulk()
+
+    batch = DigestBatch(chunk_size)
+    now = timezone.now()
+    skipped = []
+    alerts = PropertyAlert.objects.filter(pk__in=match_ids).select_related('user')
+    for alert in alerts:
+        listings = [properties[pk] for pk in property_ids[alert.id] if pk in properties]
+        if not listings or not alert.user.email:
+            skipped.append(alert.id)
+            continue
+        batch.add(
+            'property_alert',
+            "New Properties Match Your Alert",
+            {
+                'user': alert.user,
+                'alert': alert,
+                'properties': listings[:limit],
+                'total': len(listings),
+                'site_name': settings.SITE_NAME,
+                'site_url': settings.FRONTEND_URL,
+                'timestamp': now,
+            },
+            [alert.user.email],
+            key=alert.id,
+        )
+
+    stats = batch.send()
+    failed = set(batch.failed_keys)
+    done = [pk for alert_id, ids in match_ids.items() if alert_id not in failed for pk in ids]
+    AlertMatch.objects.filter(pk__in=done).update(notified_at=timezone.now())
+    stats.update(frequency=frequency, alerts=len(match_ids), skipped=len(skipped))
+    logger.info(f"Alert digests ({frequency}): {stats}")
+    return stats
+
+
+def weekly_summary_stats(since):
+    """Platform figures for the weekly summary, one aggregate query per table"""
+    from django.contrib.auth.models import User
+    from .models import Agent, Inquiry, Property
+
+    properties = Property.objects.aggregate(
+        total_properties=Count('id'),
+        new_properties=Count('id', filter=Q(created_at__gte=since)),
+        sold_properties=Count('id', filter=Q(status='sold', updated_at__gte=since)),
+    )
+    users = User.objects.aggregate(
+        total_users=Count('id'),
+        new_users=Count('id', filter=Q(date_joined__gte=since)),
+    )
+    agents = Agent.objects.aggregate(
+        total_agents=Count('id'),
+        new_agents=Count('id', filter=Q(created_at__gte=since)),
+    )
+    inquiries = Inquiry.objects.filter(created_at__gte=since).count()
+    return {
+        **properties, **users, **agents,
+        'new_inquiries': inquiries,
+        'inquiries': inquiries,
+    }
+
+
+def send_weekly_summary(chunk_size=None):
+    """Send the weekly summary to settings.ADMINS; returns the run's stats"""
+    admin_emails = [email for name, email in settings.ADMINS]
+    if not admin_emails:
+        return None
+
+    now = timezone.now()
+    one_week_ago = now - timedelta(days=7)
+    batch = DigestBatch(chunk_size)
+    batch.add(
+        'weekly_summary',
+        f"Weekly Summary - {settings.SITE_NAME}",
+        {
+            'stats': weekly_summary_stats(one_week_ago),
+            'site_name': settings.SITE_NAME,
+            'admin_url': f"https://{settings.ADMIN_BASE_URL}",
+            'week_start': one_week_ago.strftime('%B %d, %Y'),
+            'week_end': now,
+        },
+        admin_emails,
+    )
+    return batch.send()
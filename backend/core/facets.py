@@ -0,0 +1,219 @@
+# core/facets.py
+"""
+Filter facets for property searches.
+
+PropertyFacetCount and PropertyFacetRange hold the unfiltered facets over
+published listings. Property signals keep them current with one small update
+per changed facet, so the filter options endpoint reads two tiny tables
+instead of aggregating the whole property table. rebuild_facets() recomputes
+everything and runs nightly to correct any drift.
+
+Facets for an already-filtered search are computed live with disjunctive
+faceting: each facet is counted with every filter applied except its own.
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+
+logger = logging.getLogger(__name__)
+
+FACET_FIELDS = ('property_type', 'category', 'status', 'location')
+RANGE_FIELDS = ('price', 'beds', 'baths')
+
+# Query parameter -> (facet it narrows, queryset lookup)
+PROPERTY_FILTERS = {
+    'price_min': ('price', 'price__gte'),
+    'price_max': ('price', 'price__lte'),
+    'property_type': ('property_type', 'property_type'),
+    'category': ('category', 'category'),
+    'status': ('status', 'status'),
+    'beds_min': ('beds', 'beds__gte'),
+    'baths_min': ('baths', 'baths__gte'),
+}
+
+
+def apply_property_filters(queryset, params, skip_facet=None):
+    """Apply the listing filter query parameters, optionally leaving one facet out"""
+    filters = {}
+    for param, (facet, lookup) in PROPERTY_FILTERS.items():
+        if facet == skip_facet:
+            continue
+        value = params.get(param)
+        if value and value != 'all':
+            filters[lookup] = value
+    return queryset.filter(**filters) if filters else queryset
+
+
+def has_property_filters(params):
+    return any(
+        params.get(param) and params.get(param) != 'all'
+        for param in PROPERTY_FILTERS
+    )
+
+
+def published_values(instance, old=False):
+    """
+    Facet values a property contributes, or None if it contributes nothing.
+    With old=True the values are read from the tracker snapshot, i.e. as the
+    row was before the current save.
+    """
+    get = instance.get_old if old else (lambda field: getattr(instance, field))
+    if not get('is_published'):
+        return None
+    return {field: get(field) for field in FACET_FIELDS + RANGE_FIELDS}
+
+
+def apply_facet_change(old, new):
+    """Move one property's contribution from old values to new values"""
+    from .models import PropertyFacetCount
+
+    if old == new:
+        return
+
+    for facet in FACET_FIELDS:
+        before = old[facet] if old else None
+        after = new[facet] if new else None
+        if before == after:
+            continue
+        if before is not None:
+            PropertyFacetCount.objects.filter(facet=facet, value=before).update(
+                count=F('count') - 1
+            )
+        if after is not None:
+            PropertyFacetCount.objects.get_or_create(facet=facet, value=after)
+            PropertyFacetCount.objects.filter(facet=facet, value=after).update(
+                count=F('count') + 1
+            )
+
+    for field in RANGE_FIELDS:
+        before = old[field] if old else None
+        after = new[field] if new else None
+        if before == after:
+            continue
+        if before is not None and _is_range_edge(field, before):
+            # The extreme may have gone; only a full aggregate can tell
+            recompute_range(field)
+        elif after is not None:
+            _widen_range(field, after)
+
+
+def _is_range_edge(field, value):
+    from .models import PropertyFacetRange
+
+    row = PropertyFacetRange.objects.filter(facet=field).first()
+    if row is None or row.min_value is None:
+        return True
+    return Decimal(value) <= row.min_value or Decimal(value) >= row.max_value
+
+
+def _widen_range(field, value):
+    from .models import PropertyFacetRange
+
+    value = Value(Decimal(value))
+    PropertyFacetRange.objects.get_or_create(facet=field)
+    PropertyFacetRange.objects.filter(facet=field).update(
+        min_value=Least(Coalesce(F('min_value'), value), value),
+        max_value=Greatest(Coalesce(F('max_value'), value), value),
+    )
+
+
+def recompute_range(field):
+    from .models import Property, PropertyFacetRange
+
+    stats = Property.objects.filter(is_published=True).aggregate(
+        low=Min(field), high=Max(field)
+    )
+    PropertyFacetRange.objects.update_or_create(
+        facet=field,
+        defaults={'min_value': stats['low'], 'max_value': stats['high']},
+    )
+
+
+def record_property_change(old, new):
+    """Signal entry point; facet upkeep must never fail the save itself"""
+    try:
+        with transaction.atomic():
+            apply_facet_change(old, new)
+    except Exception as e:
+        logger.error(f"Error updating property facets: {str(e)}")
+
+
+def rebuild_facets():
+    """Recompute every facet count and range from the property table"""
+    from .models import Property, PropertyFacetCount
+
+    published = Property.objects.filter(is_published=True)
+    rows = [
+        PropertyFacetCount(facet=facet, value=item[facet], count=item['count'])
+        for facet in FACET_FIELDS
+        for item in published.order_by().values(facet).annotate(count=Count('id'))
+    ]
+    with transaction.atomic():
+        PropertyFacetCount.objects.all().delete()
+        PropertyFacetCount.objects.bulk_create(rows)
+        for field in RANGE_FIELDS:
+            recompute_range(field)
+    return len(rows)
+
+
+def facet_snapshot():
+    """Unfiltered filter options, read from the maintained facet tables"""
+    from .models import PropertyFacetCount, PropertyFacetRange
+
+    counts = defaultdict(list)
+    for row in PropertyFacetCount.objects.filter(count__gt=0):
+        counts[row.facet].append((row.value, row.count))
+    ranges = {
+        row.facet: (row.min_value, row.max_value)
+        for row in PropertyFacetRange.objects.all()
+    }
+    return _build_payload(counts, ranges)
+
+
+def filtered_facets(queryset, params):
+    """Facets for a filtered search; each facet ignores its own filter"""
+    counts = {}
+    for facet in FACET_FIELDS:
+        rows = (
+            apply_property_filters(queryset, params, skip_facet=facet)
+            .order_by()
+            .values(facet)
+            .annotate(count=Count('id'))
+            .order_by(facet)
+        )
+        counts[facet] = [(row[facet], row['count']) for row in rows]
+
+    ranges = {}
+    for field in RANGE_FIELDS:
+        stats = apply_property_filters(queryset, params, skip_facet=field).aggregate(
+            low=Min(field), high=Max(field)
+        )
+        ranges[field] = (stats['low'], stats['high'])
+    return _build_payload(counts, ranges)
+
+
+def _build_payload(counts, ranges):
+    def options(facet):
+        return [{facet: value, 'count': count} for value, count in sorted(counts.get(facet, []))]
+
+    def bounds(field, default_max, cast):
+        low, high = ranges.get(field, (None, None))
+        return {
+            'min': cast(low) if low is not None else 0,
+            'max': cast(high) if high is not None else default_max,
+        }
+
+    return {
+        'locations': [value for value, count in sorted(counts.get('location', []))],
+        'location_counts': options('location'),
+        'price_range': bounds('price', 0, Decimal),
+        'property_types': options('property_type'),
+        'categories': options('category'),
+        'statuses': options('status'),
+        'bed_range': bounds('beds', 10, int),
+        'bath_range': bounds('baths', 10, int),
+    }
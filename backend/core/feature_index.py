@@ -0,0 +1,351 @@
+# core/feature_index.py
+"""
+Content-based nearest neighbours over published listings.
+
+Every listing becomes a float32 feature vector with these parts:
+
+- log price, beds, baths, and floor or land area converted to square metres
+  (log-scaled);
+- latitude and longitude;
+- one-hot property type and category;
+- its PropertyFeature tags, over the FEATURE_INDEX_TAGS most common ones.
+
+Numeric columns are standardised with statistics fixed when the index is
+loaded, and every column group is weighted (FEATURE_INDEX_WEIGHTS). The
+vectors sit in one NumPy matrix per process. A query is a single
+matrix-vector product plus argpartition, which takes a few milliseconds at
+100k listings.
+
+Full loads never run inside a request. Each web process starts one on a
+background thread when the WSGI application is created, and again every
+FEATURE_INDEX_MAX_AGE seconds; the new arrays are built without holding
+the index lock and swapped in at once, so queries keep using the previous
+matrix meanwhile. Until the first load finishes a process has no index and
+returns no neighbours.
+
+Property and PropertyFeature signals bump the FEATURE_INDEX cache
+namespace. Tag changes also store the listing's id under the version they
+created (record_tag_change), because they leave the listing itself
+untouched. Before answering, each process checks that version and re-reads
+only the listings updated since its last sync plus those whose tags
+changed, overwriting or appending their rows. Deleted listings are
+filtered out when results are fetched and dropped at the next full load.
+"""
+import logging
+import math
+import os
+import threading
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .caching import FEATURE_INDEX, invalidate_namespace, namespace_version
+
+logger = logging.getLogger(__name__)
+
+# Area unit -> square metres
+AREA_UNITS = {'sqm': 1.0, 'sqft': 0.092903, 'hectares': 10000.0, 'acres': 4046.86}
+
+NUMERIC_FIELDS = ('price', 'beds', 'baths', 'area', 'latitude', 'longitude')
+
+DEFAULT_WEIGHTS = {
+    'price': 2.0, 'beds': 1.0, 'baths': 0.7, 'area': 1.0,
+    'latitude': 1.5, 'longitude': 1.5,
+    'property_type': 1.5, 'category': 1.5, 'tags': 0.5,
+}
+
+VALUE_FIELDS = (
+    'id', 'is_published', 'price', 'beds', 'baths', 'area_measurement', 'area_unit',
+    'sqft', 'latitude', 'longitude', 'property_type', 'category',
+)
+
+# Rows re-read on sync overlap the previous one by this much, for clock skew
+SYNC_OVERLAP = timedelta(seconds=5)
+
+# A process further behind than this many versions waits for its next full
+# load to pick up tag changes rather than reading every version's key
+MAX_TAG_VERSIONS = 1000
+
+
+def _tags_key(version):
+    return f'feature_index:tags:v{version}'
+
+
+def record_tag_change(property_id):
+    """Bump the index version and note that this listing's tags changed"""
+    version = invalidate_namespace(FEATURE_INDEX)
+    cache.set(_tags_key(version), property_id, 2 * getattr(settings, 'FEATURE_INDEX_MAX_AGE', 3600))
+
+
+def tag_changes(since_version, version):
+    """Ids of the listings whose tags changed after since_version"""
+    if version - since_version > MAX_TAG_VERSIONS:
+        return None
+    keys = [_tags_key(v) for v in range(since_version + 1, version + 1)]
+    return set(cache.get_many(keys).values()) if keys else set()
+
+
+def _log(value):
+    return math.log1p(float(value)) if value else None
+
+
+def area_sqm(row):
+    if row['area_measurement']:
+        return float(row['area_measurement']) * AREA_UNITS.get(row['area_unit'], 1.0)
+    if row['sqft']:
+        return row['sqft'] * AREA_UNITS['sqft']
+    return None
+
+
+def raw_features(row):
+    """Numeric values of a listing before standardisation, None where unknown"""
+    return {
+        'price': _log(row['price']),
+        'beds': row['beds'],
+        'baths': row['baths'],
+        'area': _log(area_sqm(row)),
+        'latitude': row['latitude'],
+        'longitude': row['longitude'],
+    }
+
+
+def _load_rows(queryset):
+    from .models import PropertyFeature
+
+    rows = list(queryset.values(*VALUE_FIELDS))
+    tags = defaultdict(set)
+    for property_id, feature in PropertyFeature.objects.filter(
+        property_id__in=[row['id'] for row in rows] if len(rows) < 1000 else queryset.values('id')
+    ).values_list('property_id', 'feature').iterator(chunk_size=10000):
+        tags[property_id].add(feature.strip().lower())
+    for row in rows:
+        row['tags'] = tags.get(row['id'], set())
+    return rows
+
+
+class FeatureIndex:
+    """Per-process matrix of listing vectors; see the module docstring"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        # Pid of the process whose thread is loading; a forked child has none
+        self._loading = None
+        self.loaded_at = None
+        self.synced_at = None
+        self.version = None
+        self.matrix = None
+
+    def _layout(self, rows):
+        from .models import Property
+        import numpy as np
+
+        self.weights = dict(DEFAULT_WEIGHTS, **getattr(settings, 'FEATURE_INDEX_WEIGHTS', {}))
+        self.types = {value: i for i, (value, label) in enumerate(Property.PROPERTY_TYPES)}
+        self.categories = {value: i for i, (value, label) in enumerate(Property.CATEGORY_TYPES)}
+        tag_counts = Counter(tag for row in rows for tag in row['tags'])
+        self.tags = {
+            tag: i for i, (tag, count) in
+            enumerate(tag_counts.most_common(getattr(settings, 'FEATURE_INDEX_TAGS', 64)))
+        }
+
+        self.stats = {}
+        for field in NUMERIC_FIELDS:
+            values = np.array(
+                [v for v in (raw_features(row)[field] for row in rows) if v is not None],
+                dtype=np.float64,
+            )
+            mean = float(values.mean()) if len(values) else 0.0
+            std = float(values.std()) if len(values) > 1 else 1.0
+            self.stats[field] = (mean, std or 1.0)
+
+        self.offsets = {}
+        width = 0
+        for name, size in (
+            *((field, 1) for field in NUMERIC_FIELDS),
+            ('property_type', len(self.types)),
+            ('category', len(self.categories)),
+            ('tags', len(self.tags)),
+        ):
+            self.offsets[name] = width
+            width += size
+        self.width = width
+
+    def vector(self, row):
+        import numpy as np
+
+        vector = np.zeros(self.width, dtype=np.float32)
+        # Unknown numeric values stay at the mean (zero after standardising)
+        for field, value in raw_features(row).items():
+            if value is not None:
+                mean, std = self.stats[field]
+                vector[self.offsets[field]] = (float(value) - mean) / std * self.weights[field]
+        if row['property_type'] in self.types:
+            vector[self.offsets['property_type'] + self.types[row['property_type']]] = self.weights['property_type']
+        if row['category'] in self.categories:
+            vector[self.offsets['category'] + self.categories[row['category']]] = self.weights['category']
+        tags = [self.tags[tag] for tag in row['tags'] if tag in self.tags]
+        if tags:
+            # Spread over the tags so many-tag listings do not dominate
+            vector[[self.offsets['tags'] + i for i in tags]] = self.weights['tags'] / math.sqrt(len(tags))
+        return vector
+
+    def load(self):
+        """
+        Build the whole matrix from the published listings, then swap it in.
+        Queries keep using the current arrays while this runs.
+        """
+        import numpy as np
+        from .models import Property
+
+        fresh = FeatureIndex()
+        started = timezone.now()
+        version = namespace_version(FEATURE_INDEX)
+        rows = _load_rows(Property.objects.filter(is_published=True))
+        fresh._layout(rows)
+        fresh.ids = np.array([row['id'] for row in rows], dtype=np.int64)
+        fresh.rows = {row['id']: i for i, row in enumerate(rows)}
+        fresh.matrix = (
+            np.vstack([fresh.vector(row) for row in rows]) if rows
+            else np.zeros((0, fresh.width), dtype=np.float32)
+        )
+        fresh.active = np.ones(len(rows), dtype=bool)
+        fresh.norms = (fresh.matrix ** 2).sum(axis=1)
+        fresh.loaded_at = fresh.synced_at = started
+        fresh.version = version
+
+        state = {name: value for name, value in vars(fresh).items() if not name.startswith('_')}
+        with self._lock:
+            vars(self).update(state)
+
+    def load_in_background(self):
+        """Start a full load on a daemon thread unless this process has one running"""
+        if not getattr(settings, 'FEATURE_INDEX_LOAD_IN_BACKGROUND', True):
+            self.load()
+            return
+        with self._lock:
+            if self._loading == os.getpid():
+                return
+            self._loading = os.getpid()
+
+        def run():
+            try:
+                self.load()
+            except Exception as e:
+                logger.error(f"Error loading feature index: {str(e)}")
+            finally:
+                self._loading = None
+                connections.close_all()
+
+        threading.Thread(target=run, name='feature-index-load', daemon=True).start()
+
+    def apply(self, rows):
+        """Overwrite, append or deactivate the rows for changed listings"""
+        import numpy as np
+
+        new_rows = []
+        for row in rows:
+            index = self.rows.get(row['id'])
+            if index is None:
+                if row['is_published']:
+                    new_rows.append(row)
+                continue
+            self.matrix[index] = self.vector(row)
+            self.norms[index] = float(self.matrix[index] @ self.matrix[index])
+            self.active[index] = row['is_published']
+        if new_rows:
+            vectors = np.vstack([self.vector(row) for row in new_rows])
+            start = len(self.ids)
+            self.matrix = np.vstack([self.matrix, vectors])
+            self.norms = np.concatenate([self.norms, (vectors ** 2).sum(axis=1)])
+            self.active = np.concatenate([self.active, np.ones(len(new_rows), dtype=bool)])
+            self.ids = np.concatenate([self.ids, np.array([row['id'] for row in new_rows], dtype=np.int64)])
+            positions = dict(self.rows)
+            for offset, row in enumerate(new_rows):
+                positions[row['id']] = start + offset
+            self.rows = positions
+
+    def sync(self):
+        """
+        Bring the matrix up to date with the listings changed since the last
+        sync; a cache read when nothing changed. Starts a background load
+        when there is no matrix yet or it is due for a rebuild.
+        """
+        from .models import Property
+
+        max_age = getattr(settings, 'FEATURE_INDEX_MAX_AGE', 3600)
+        if self.matrix is None or (timezone.now() - self.loaded_at).total_seconds() > max_age:
+            self.load_in_background()
+            if self.matrix is None:
+                return
+        version = namespace_version(FEATURE_INDEX)
+        if version == self.version:
+            return
+        # One request per process syncs; the others answer from the current matrix
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            since, since_version, started = self.synced_at, self.version, timezone.now()
+            changed = Q(updated_at__gte=since - SYNC_OVERLAP)
+            tagged = tag_changes(since_version, version)
+            if tagged is None:
+                self.load_in_background()
+            elif tagged:
+                changed |= Q(pk__in=tagged)
+            rows = _load_rows(Property.objects.filter(changed))
+            with self._lock:
+                if self.synced_at != since:
+                    return  # A full load was swapped in meanwhile
+                self.apply(rows)
+                self.synced_at = started
+                self.version = version
+        finally:
+            self._sync_lock.release()
+
+    def nearest(self, property_ids, limit=10, exclude=()):
+        """
+        Ids of the listings closest to the given ones (their centroid when
+        there are several), nearest first.
+        """
+        import numpy as np
+
+        self.sync()
+        with self._lock:
+            if self.matrix is None:
+                return []  # Still loading
+            # A consistent set of arrays; a concurrent sync replaces them
+            matrix, norms, active, ids, rows = self.matrix, self.norms, self.active, self.ids, self.rows
+        seeds = [rows[pk] for pk in property_ids if pk in rows]
+        if not seeds or not len(ids):
+            return []
+        query = matrix[seeds].mean(axis=0)
+
+        # Squared euclidean distance to every row in one product
+        distances = norms - 2 * (matrix @ query) + float(query @ query)
+        distances[~active] = np.inf
+        skip = [rows[pk] for pk in set(property_ids) | set(exclude) if pk in rows]
+        distances[skip] = np.inf
+
+        k = min(limit, int(np.isfinite(distances).sum()))
+        if k <= 0:
+            return []
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        return ids[nearest].tolist()
+
+
+feature_index = FeatureIndex()
+
+
+def similar_properties(property_ids, limit=10, exclude=()):
+    """Published listings most like the given ones, nearest first"""
+    from .models import Property
+
+    ids = feature_index.nearest(list(property_ids), limit=limit * 2, exclude=exclude)
+    properties = Property.objects.filter(pk__in=ids, is_published=True).in_bulk()
+    return [properties[pk] for pk in ids if pk in properties][:limit]
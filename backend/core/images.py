@@ -0,0 +1,193 @@
+# core/images.py
+"""
+Property image processing.
+
+Uploads are stored as they arrive, so the request only copies bytes. The
+process_property_image task, queued once the upload commits, does the rest
+through the storage API, so it works the same on the local filesystem and on
+Spaces:
+
+- read the original and decode it once. JPEGs are decoded in draft mode,
+  directly at the scale needed, and the longest edge is capped at
+  IMAGE_MAX_EDGE (shrink_upload);
+- apply the EXIF orientation, watermark the photo and write it as the
+  master in IMAGE_UPLOAD_FORMAT, without its EXIF metadata. The upload is
+  then deleted, so storage, CDN egress and every later decode work on the
+  smaller file;
+- resize the same decoded image into the IMAGE_DERIVATIVES widths, largest
+  first, each from the previous one, in the master's format.
+
+Derivative names and sizes are stored on PropertyImage.derivatives, and the
+upload and master sizes on original_bytes and stored_bytes.
+"""
+import logging
+import math
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .utils import Watermarker
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DERIVATIVES = {'hero': 1600, 'card': 800, 'thumb': 320}
+
+# Pillow format -> file extension
+EXTENSIONS = {'WEBP': '.webp', 'JPEG': '.jpg'}
+
+
+def derivative_widths():
+    """{label: max width}, largest first"""
+    widths = getattr(settings, 'IMAGE_DERIVATIVES', DEFAULT_DERIVATIVES)
+    return dict(sorted(widths.items(), key=lambda item: -item[1]))
+
+
+def image_format(name):
+    """Format a stored image is written in, from its extension"""
+    return 'WEBP' if name.lower().endswith('.webp') else 'JPEG'
+
+
+def derivative_name(name, label):
+    directory, filename = os.path.split(os.path.splitext(name)[0])
+    return f'{directory}/derivatives/{filename}_{label}{EXTENSIONS[image_format(name)]}'
+
+
+def load_watermark():
+    """
+    The watermark logo, WATERMARK_IMAGE relative to the media root. The
+    local copy shipped with the code is used when present, otherwise it is
+    read from the default storage.
+    """
+    name = getattr(settings, 'WATERMARK_IMAGE', 'logo/logo2.webp')
+    local_path = os.path.join(settings.MEDIA_ROOT_LOCAL, name)
+    if os.path.exists(local_path):
+        source = open(local_path, 'rb')
+    else:
+        source = default_storage.open(name, 'rb')
+    with source, Image.open(source) as logo:
+        logo.load()
+        return logo.copy()
+
+
+watermarker = Watermarker(
+    load_watermark, cache_size=getattr(settings, 'WATERMARK_CACHE_SIZE', 16)
+)
+
+
+def encode_image(image, format='JPEG', **options):
+    output = BytesIO()
+    if format == 'WEBP':
+        image.save(
+            output, format='WEBP',
+            quality=getattr(settings, 'IMAGE_WEBP_QUALITY', 80),
+            method=getattr(settings, 'IMAGE_WEBP_METHOD', 2),
+            **options
+        )
+    else:
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.save(
+            output, format='JPEG',
+            quality=getattr(settings, 'IMAGE_JPEG_QUALITY', 85),
+            progressive=True, **options
+        )
+    return output.getvalue()
+
+
+def shrink_upload(image):
+    """
+    Cap a freshly opened upload at IMAGE_MAX_EDGE and apply its EXIF
+    orientation. JPEGs are decoded in draft mode, directly at the scale
+    needed. Returns the loaded image, converted to a mode the encoders take.
+    """
+    max_edge = getattr(settings, 'IMAGE_MAX_EDGE', 2000)
+    width, height = image.size
+    scale = min(1.0, max_edge / max(width, height))
+    if scale < 1 and image.format in ('JPEG', 'MPO'):
+        # Let libjpeg decode at 1/2, 1/4 or 1/8 scale, never below the target
+        image.draft('RGB', (math.ceil(width * scale), math.ceil(height * scale)))
+
+    # Resize first so the orientation fix works on the smaller image; the
+    # bounding box is square, so the result is the same either way round
+    if scale < 1:
+        image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA', 'L'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    return image
+
+
+def process_image(image_id):
+    """
+    Watermark one PropertyImage and write its derivatives. Returns the
+    derivatives, or None if the image no longer exists.
+    """
+    from .models import PropertyImage
+
+    instance = PropertyImage.objects.filter(pk=image_id).first()
+    if instance is None or not instance.image:
+        return None
+
+    storage = instance.image.storage
+    name = instance.image.name
+    with storage.open(name, 'rb') as source:
+        original = source.read()
+    # Not closed: closing would free the pixels the watermark is drawn on
+    image = Image.open(BytesIO(original))
+    if instance.is_watermarked:
+        image = image.convert('RGB')
+    else:
+        # Keep the colour profile; EXIF (camera, GPS) is left out
+        options = {}
+        if image.info.get('icc_profile'):
+            options['icc_profile'] = image.info['icc_profile']
+        image = shrink_upload(image)
+        image = watermarker.apply(image, position='center', size_ratio=0.20, opacity=0.55)
+
+        # Point the row at the new master before the upload is removed, so a
+        # failure further on leaves a readable, already watermarked image
+        target_format = getattr(settings, 'IMAGE_UPLOAD_FORMAT', 'WEBP')
+        encoded = encode_image(image, target_format, **options)
+        master_name = storage.save(
+            os.path.splitext(name)[0] + EXTENSIONS[target_format], ContentFile(encoded)
+        )
+        PropertyImage.objects.filter(pk=image_id).update(
+            image=master_name, is_watermarked=True,
+            original_bytes=len(original), stored_bytes=len(encoded),
+        )
+        if master_name != name:
+            storage.delete(name)
+        name = master_name
+
+    derivatives = {}
+    for label, width in derivative_widths().items():
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        target = derivative_name(name, label)
+        if storage.exists(target):
+            storage.delete(target)
+        derivatives[label] = {
+            'name': storage.save(target, ContentFile(encode_image(image, image_format(name)))),
+            'width': image.width,
+            'height': image.height,
+        }
+
+    PropertyImage.objects.filter(pk=image_id).update(derivatives=derivatives)
+    logger.info(f"Processed image {image_id}: {', '.join(derivatives)}")
+    return derivatives
+
+
+def delete_derivatives(derivatives):
+    from .models import PropertyImage
+
+    storage = PropertyImage._meta.get_field('image').storage
+    for derivative in (derivatives or {}).values():
+        try:
+            storage.delete(derivative['name'])
+        except Exception as e:
+            logger.error(f"Error deleting derivative {derivative.get('name')}: {str(e)}")
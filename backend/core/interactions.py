@@ -0,0 +1,216 @@
+# core/interactions.py
+"""
+Buffered ingestion pipeline for property interactions.
+
+Request threads only append events to an in-process ring buffer. A daemon
+flusher thread drains the buffer to the database with bulk_create, either
+every INTERACTION_FLUSH_INTERVAL seconds or as soon as a full batch is queued.
+A batch that keeps failing is split in halves until the rows that fail on
+their own are found and dropped, so one bad event cannot stall the buffer.
+Today's PropertyStat counters are kept live in core.live_stats.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from . import live_stats
+from .caching import get_redis_connection_or_none
+
+logger = logging.getLogger(__name__)
+
+PROPERTY_IDS_CACHE_KEY = 'interactions:property_ids'
+
+
+class PropertyIdCache:
+    """
+    Cached set of existing property ids, used instead of an exists() query
+    on every tracked request.
+    """
+
+    def __init__(self, ttl=300, miss_refresh_interval=5):
+        self.ttl = ttl
+        self.miss_refresh_interval = miss_refresh_interval
+        self._ids = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        ids = cache.get(PROPERTY_IDS_CACHE_KEY)
+        if ids is None:
+            from .models import Property
+            ids = frozenset(Property.objects.values_list('id', flat=True))
+            cache.set(PROPERTY_IDS_CACHE_KEY, ids, self.ttl)
+        self._ids = ids
+        self._loaded_at = time.monotonic()
+
+    def contains(self, property_id):
+        with self._lock:
+            age = time.monotonic() - self._loaded_at
+            if self._ids is None or age > self.ttl:
+                self._load()
+            elif property_id not in self._ids and age > self.miss_refresh_interval:
+                # The listing may have been created by another process
+                self._load()
+            return property_id in self._ids
+
+    def invalidate(self):
+        cache.delete(PROPERTY_IDS_CACHE_KEY)
+        with self._lock:
+            self._ids = None
+
+
+class InteractionBuffer:
+    """
+    Thread-safe ring buffer of pending PropertyInteraction rows.
+    When full, the oldest events are dropped rather than blocking requests.
+    """
+
+    def __init__(self, max_size=10000, batch_size=500, flush_interval=5, max_retries=3):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.dropped = 0
+        self.discarded = 0
+        self._failures = 0
+        self._events = deque(maxlen=max_size)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._events)
+
+    def append(self, event):
+        with self._lock:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            pending = len(self._events)
+            self._ensure_flusher()
+
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write every buffered event to the database. Returns rows written."""
+        written = 0
+        while True:
+            batch = self._take(self.batch_size)
+            if not batch:
+                return written
+            try:
+                written += self._write(batch)
+                self._failures = 0
+            except Exception:
+                self._failures += 1
+                if self._failures < self.max_retries:
+                    # Put the batch back so the next cycle can retry it
+                    with self._lock:
+                        self._events.extendleft(reversed(batch))
+                    raise
+                self._failures = 0
+                written += self._write_isolating(batch)
+
+    def _write_isolating(self, batch):
+        """Write a batch that keeps failing half by half, dropping rows that fail alone"""
+        try:
+            return self._write(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                self.discarded += 1
+                logger.error(f"Discarding interaction {batch[0]}: {str(e)}")
+                return 0
+        middle = len(batch) // 2
+        return self._write_isolating(batch[:middle]) + self._write_isolating(batch[middle:])
+
+    def _take(self, limit):
+        with self._lock:
+            count = min(limit, len(self._events))
+            return [self._events.popleft() for _ in range(count)]
+
+    def _write(self, batch):
+        from django.contrib.auth.models import User
+        from .models import Property, PropertyInteraction
+
+        # Listings and users deleted since the event was queued would fail
+        # the whole batch; their interactions would have been deleted too
+        property_ids = {event['property_id'] for event in batch}
+        existing = set(
+            Property.objects.filter(id__in=property_ids).values_list('id', flat=True)
+        )
+        user_ids = {event['user_id'] for event in batch} - {None}
+        users = set(
+            User.objects.filter(id__in=user_ids).values_list('id', flat=True)
+        ) if user_ids else set()
+        events = [
+            event for event in batch
+            if event['property_id'] in existing
+            and (event['user_id'] is None or event['user_id'] in users)
+        ]
+        rows = [PropertyInteraction(**event) for event in events]
+        PropertyInteraction.objects.bulk_create(rows, batch_size=self.batch_size)
+        if get_redis_connection_or_none() is None:
+            # No live counters in Redis; count the batch straight into PropertyStat
+            live_stats.apply_counts(live_stats.count_interactions(events))
+        logger.debug(f"Flushed {len(rows)} interactions")
+        return len(rows)
+
+    def _ensure_flusher(self):
+        # Called with the lock held. Threads do not survive a fork, so this
+        # also restarts the flusher in forked worker processes.
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self._run, name='interaction-flusher', daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing interactions: {str(e)}")
+            finally:
+                connection.close()
+
+
+property_ids = PropertyIdCache(
+    ttl=getattr(settings, 'INTERACTION_PROPERTY_IDS_TTL', 300),
+)
+
+interaction_buffer = InteractionBuffer(
+    max_size=getattr(settings, 'INTERACTION_BUFFER_SIZE', 10000),
+    batch_size=getattr(settings, 'INTERACTION_FLUSH_BATCH_SIZE', 500),
+    flush_interval=getattr(settings, 'INTERACTION_FLUSH_INTERVAL', 5),
+    max_retries=getattr(settings, 'INTERACTION_FLUSH_MAX_RETRIES', 3),
+)
+
+
+def record_interaction(property_id, interaction_type, user=None, session_key=''):
+    """Queue a property interaction for batched insertion"""
+    live_stats.increment(property_id, interaction_type)
+    interaction_buffer.append({
+        'property_id': property_id,
+        'user_id': user.pk if user is not None else None,
+        'interaction_type': interaction_type,
+        'session_key': session_key or '',
+        'timestamp': timezone.now(),
+    })
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        interaction_buffer.flush()
+    except Exception as e:
+        logger.error(f"Error flushing interactions on exit: {str(e)}")
@@ -0,0 +1,163 @@
+# core/live_stats.py
+"""
+Live PropertyStat counters.
+
+record_interaction() increments one Redis hash per day, with a field per
+"<property_id>:<metric>", so today's counts are known the moment an
+interaction happens. flush_live_stats() runs every minute and moves the
+pending counts into PropertyStat with F() increments. The stats endpoints add
+whatever has not been flushed yet, so today's figures are exact without
+reading PropertyInteraction.
+
+Without Redis (e.g. local development) the interaction buffer applies the same
+increments to PropertyStat as it writes each batch. Either way the nightly
+aggregate_daily_stats recomputes the previous day from the raw rows.
+"""
+import logging
+import uuid
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .aggregation import INTERACTION_METRICS
+from .caching import get_redis_connection_or_none
+
+logger = logging.getLogger(__name__)
+
+DAYS_KEY = 'livestats:days'
+PENDING_TTL = 60 * 60 * 24 * 7
+
+# PropertyInteraction.interaction_type -> PropertyStat column
+METRIC_FOR_TYPE = {value: metric for metric, value in INTERACTION_METRICS.items()}
+
+
+def _pending_key(day):
+    return f'livestats:pending:{day.isoformat()}'
+
+
+def increment(property_id, interaction_type):
+    """
+    Count one interaction towards today's stats. Returns False when there is
+    no Redis to count it in, so the caller can fall back.
+    """
+    metric = METRIC_FOR_TYPE.get(interaction_type)
+    client = get_redis_connection_or_none()
+    if metric is None or client is None:
+        return False
+
+    day = timezone.localdate()
+    key = _pending_key(day)
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.hincrby(key, f'{property_id}:{metric}', 1)
+        pipe.expire(key, PENDING_TTL)
+        pipe.sadd(DAYS_KEY, day.isoformat())
+        pipe.execute()
+    except Exception as e:
+        # The nightly aggregation recounts the day from the raw rows
+        logger.error(f"Error incrementing live stats: {str(e)}")
+    return True
+
+
+def count_interactions(events):
+    """Group interaction dicts into {(property_id, date): {metric: n}}"""
+    counts = defaultdict(lambda: defaultdict(int))
+    for event in events:
+        metric = METRIC_FOR_TYPE.get(event['interaction_type'])
+        if metric is not None:
+            day = timezone.localdate(event['timestamp'])
+            counts[(event['property_id'], day)][metric] += 1
+    return counts
+
+
+def apply_counts(counts):
+    """Add counts to PropertyStat rows, creating missing rows first"""
+    from .models import Property, PropertyStat
+
+    property_ids = {property_id for property_id, day in counts}
+    existing = set(
+        Property.objects.filter(id__in=property_ids).values_list('id', flat=True)
+    )
+    counts = {key: metrics for key, metrics in counts.items() if key[0] in existing}
+    if not counts:
+        return 0
+
+    with transaction.atomic():
+        PropertyStat.objects.bulk_create(
+            [PropertyStat(property_id=property_id, date=day) for property_id, day in counts],
+            ignore_conflicts=True,
+        )
+        for (property_id, day), metrics in counts.items():
+            PropertyStat.objects.filter(property_id=property_id, date=day).update(
+                **{metric: F(metric) + value for metric, value in metrics.items()}
+            )
+    return len(counts)
+
+
+def _parse(raw):
+    counts = defaultdict(dict)
+    for field, value in raw.items():
+        property_id, metric = field.decode().split(':')
+        counts[int(property_id)][metric] = int(value)
+    return counts
+
+
+def flush_live_stats():
+    """Move pending Redis counts into PropertyStat. Returns rows touched."""
+    from redis.exceptions import ResponseError
+
+    client = get_redis_connection_or_none()
+    if client is None:
+        return 0
+
+    flushed = 0
+    for raw_day in sorted(client.smembers(DAYS_KEY)):
+        day = date.fromisoformat(raw_day.decode())
+        # Drop the marker first: an increment racing the rename re-adds it
+        client.srem(DAYS_KEY, raw_day)
+        flushing = f'livestats:flushing:{day.isoformat()}:{uuid.uuid4().hex}'
+        try:
+            client.rename(_pending_key(day), flushing)
+        except ResponseError:
+            continue  # Nothing pending for this day
+
+        raw = client.hgetall(flushing)
+        counts = {
+            (property_id, day): metrics
+            for property_id, metrics in _parse(raw).items()
+        }
+        try:
+            flushed += apply_counts(counts)
+        except Exception:
+            # Hand the counts back so the next flush retries them
+            pipe = client.pipeline(transaction=False)
+            for field, value in raw.items():
+                pipe.hincrby(_pending_key(day), field, int(value))
+            pipe.expire(_pending_key(day), PENDING_TTL)
+            pipe.sadd(DAYS_KEY, raw_day)
+            pipe.execute()
+            raise
+        finally:
+            client.delete(flushing)
+    return flushed
+
+
+def pending_counts(property_id, day=None):
+    """Today's counts for one property that are not yet in PropertyStat"""
+    counts = dict.fromkeys(INTERACTION_METRICS, 0)
+    client = get_redis_connection_or_none()
+    if client is None:
+        return counts
+
+    fields = [f'{property_id}:{metric}' for metric in INTERACTION_METRICS]
+    try:
+        values = client.hmget(_pending_key(day or timezone.localdate()), fields)
+    except Exception as e:
+        logger.error(f"Error reading live stats: {str(e)}")
+        return counts
+    for metric, value in zip(INTERACTION_METRICS, values):
+        counts[metric] = int(value or 0)
+    return counts
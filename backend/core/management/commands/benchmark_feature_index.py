@@ -0,0 +1,132 @@
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.caching import FEATURE_INDEX, namespace_version
+from core.feature_index import FeatureIndex
+from core.models import Property, PropertyFeature
+
+TAGS = [
+    'pool', 'borehole', 'solar', 'garden', 'garage', 'electric fence', 'staff quarters',
+    'alarm', 'fibre', 'gym', 'jacuzzi', 'cottage', 'study', 'walk-in closet', 'fireplace',
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return {
+        'p50': latencies[len(latencies) // 2],
+        'p99': latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)],
+        'max': latencies[-1],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the feature index over N synthetic listings and time the full "
+        "load, single queries, queries answered while a load is running, and "
+        "an incremental sync. Everything runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=100000, help='Synthetic listings')
+        parser.add_argument('--queries', type=int, default=1000, help='Timed nearest() calls')
+        parser.add_argument('--changed', type=int, default=100, help='Listings changed before the sync')
+
+    def create_listings(self, count):
+        rng = random.Random(42)
+        types = [value for value, label in Property.PROPERTY_TYPES]
+        categories = [value for value, label in Property.CATEGORY_TYPES]
+        Property.objects.bulk_create([
+            Property(
+                title=f'Benchmark {i}', location='Benchmark', is_published=True,
+                price=rng.randint(20, 2000) * 1000, beds=rng.randint(1, 6), baths=rng.randint(1, 4),
+                area_measurement=rng.randint(80, 4000), latitude=-17.8 + rng.uniform(-0.2, 0.2),
+                longitude=31.05 + rng.uniform(-0.2, 0.2),
+                property_type=rng.choice(types), category=rng.choice(categories),
+            )
+            for i in range(count)
+        ], batch_size=5000)
+        ids = list(Property.objects.filter(location='Benchmark').values_list('id', flat=True))
+        PropertyFeature.objects.bulk_create([
+            PropertyFeature(property_id=pk, feature=tag)
+            for pk in ids for tag in rng.sample(TAGS, rng.randint(0, 5))
+        ], batch_size=5000)
+        return ids
+
+    def time_queries(self, index, ids, count, rng):
+        latencies = []
+        for _ in range(count):
+            seed = rng.choice(ids)
+            started = time.perf_counter()
+            index.nearest([seed], limit=10)
+            latencies.append((time.perf_counter() - started) * 1000)
+        return latencies
+
+    def handle(self, *args, **options):
+        rng = random.Random(7)
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                ids = self.create_listings(options['listings'])
+                self.stdout.write(f"Created {len(ids)} listings in {time.perf_counter() - started:.1f}s")
+
+                index = FeatureIndex()
+                started = time.perf_counter()
+                index.load()
+                self.stdout.write(
+                    f"Full load: {time.perf_counter() - started:.2f}s for a "
+                    f"{index.matrix.shape[0]}x{index.matrix.shape[1]} matrix "
+                    f"({index.matrix.nbytes / 1e6:.1f}MB)"
+                )
+
+                result = percentiles(self.time_queries(index, ids, options['queries'], rng))
+                self.stdout.write(
+                    "Query: " + ", ".join(f"{key} {value:.2f}ms" for key, value in result.items())
+                )
+
+                # Queries from another thread while this one reloads. The load
+                # runs here because only this connection sees the listings.
+                during, loading = [], threading.Event()
+
+                def query_while_loading():
+                    loading.wait()
+                    while loading.is_set():
+                        during.extend(self.time_queries(index, ids, 10, rng))
+
+                thread = threading.Thread(target=query_while_loading)
+                thread.start()
+                loading.set()
+                started = time.perf_counter()
+                index.load()
+                elapsed = time.perf_counter() - started
+                loading.clear()
+                thread.join()
+                result = percentiles(during or [0.0])
+                self.stdout.write(
+                    f"During a {elapsed:.2f}s reload, {len(during)} queries: "
+                    + ", ".join(f"{key} {value:.2f}ms" for key, value in result.items())
+                )
+
+                changed = rng.sample(ids, min(options['changed'], len(ids)))
+                Property.objects.filter(pk__in=changed).update(
+                    price=1234000, updated_at=timezone.now()
+                )
+                index.version = namespace_version(FEATURE_INDEX) - 1  # As if a save had bumped it
+                started = time.perf_counter()
+                index.sync()
+                self.stdout.write(
+                    f"Sync of {len(changed)} changed listings: "
+                    f"{(time.perf_counter() - started) * 1000:.1f}ms"
+                )
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,57 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from core.models import Property
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare payload size and latency of the /properties/ listing grid "
+        "with full nested properties and with lightweight cards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per run')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests before each run')
+        parser.add_argument('--page-sizes', default='12,50,100', help='Page sizes, comma separated')
+
+    def run(self, client, params, requests, warmup):
+        for _ in range(warmup):
+            client.get('/properties/', params)
+        latencies = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = client.get('/properties/', params)
+            latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise CommandError(f"/properties/ returned {response.status_code}")
+        latencies.sort()
+        return len(response.content), len(response.data['results']), {
+            'mean': statistics.fmean(latencies),
+            'p50': latencies[len(latencies) // 2],
+            'p95': latencies[int(len(latencies) * 0.95)],
+        }
+
+    def handle(self, *args, **options):
+        published = Property.objects.filter(is_published=True).count()
+        if not published:
+            raise CommandError("No published listings to list")
+        self.stdout.write(f"{published} published listings, {options['requests']} requests per run")
+
+        with override_settings(ALLOWED_HOSTS=['*']):
+            client = Client()
+            for page_size in (int(size) for size in options['page_sizes'].split(',')):
+                for view in ('full', 'card'):
+                    size, rows, result = self.run(
+                        client, {'view': view, 'page_size': page_size},
+                        options['requests'], options['warmup'],
+                    )
+                    self.stdout.write(
+                        f"page_size {page_size:>3} {view:>4}: {rows} rows, {size / 1024:.1f}KB "
+                        f"({size / max(rows, 1) / 1024:.2f}KB per row), "
+                        + ", ".join(f"{key} {value:.2f}ms" for key, value in result.items())
+                    )
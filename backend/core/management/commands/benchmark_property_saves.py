@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models.signals import pre_save
+
+from core.models import Property
+
+
+class Rollback(Exception):
+    pass
+
+
+def refetch_status(sender, instance, **kwargs):
+    # What property_status_change_notification did before the field tracker
+    if instance.pk:
+        Property.objects.get(pk=instance.pk).status
+
+
+class Command(BaseCommand):
+    help = (
+        "Save N listings and count the queries, with the field tracker and "
+        "with the old pre_save re-fetch. Everything runs in a transaction "
+        "that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000, help='Listings to save')
+
+    def save_all(self, properties):
+        queries = [0]
+
+        def count(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count):
+            for instance in properties:
+                instance.price += 1
+                instance.status = 'sold' if instance.status == 'available' else 'available'
+                instance.save()
+        return queries[0], time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        count = options['count']
+        results = {}
+        try:
+            with transaction.atomic():
+                Property.objects.bulk_create([
+                    Property(title=f'Benchmark {i}', price=100000 + i, location='Benchmark',
+                             property_type='house', status='available')
+                    for i in range(count)
+                ])
+                properties = list(Property.objects.filter(location='Benchmark', title__startswith='Benchmark '))
+
+                results['field tracker'] = self.save_all(properties)
+                pre_save.connect(refetch_status, sender=Property)
+                try:
+                    results['re-fetch in pre_save'] = self.save_all(properties)
+                finally:
+                    pre_save.disconnect(refetch_status, sender=Property)
+                raise Rollback
+        except Rollback:
+            pass
+
+        for label, (queries, seconds) in results.items():
+            self.stdout.write(
+                f"{label:>21}: {queries} queries for {count} saves "
+                f"({queries / count:.2f} per save), {seconds:.2f}s"
+            )
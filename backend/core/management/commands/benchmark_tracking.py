@@ -0,0 +1,59 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from core.interactions import interaction_buffer
+from core.models import Property
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the latency of /public/properties/<id>/ with interaction "
+        "tracking off and on. The tracked run records real view events, so "
+        "use a development database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Timed requests per run')
+        parser.add_argument('--warmup', type=int, default=50, help='Untimed requests before each run')
+        parser.add_argument('--property', type=int, help='Listing id (default: any published one)')
+
+    def run(self, url, enabled, requests, warmup):
+        # A new Client builds a new middleware chain, which reads the setting
+        with override_settings(INTERACTION_TRACKING_ENABLED=enabled, ALLOWED_HOSTS=['*']):
+            client = Client()
+            for _ in range(warmup):
+                client.get(url)
+            latencies = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                response = client.get(url)
+                latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f"{url} returned {response.status_code}")
+        latencies.sort()
+        return {
+            'mean': statistics.fmean(latencies),
+            'p50': latencies[len(latencies) // 2],
+            'p95': latencies[int(len(latencies) * 0.95)],
+            'p99': latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)],
+        }
+
+    def handle(self, *args, **options):
+        property_id = options['property'] or (
+            Property.objects.filter(is_published=True).values_list('id', flat=True).first()
+        )
+        if property_id is None:
+            raise CommandError("No published listing to request")
+        url = f'/public/properties/{property_id}/'
+
+        self.stdout.write(f"{options['requests']} requests to {url}")
+        for label, enabled in (('tracking off', False), ('tracking on', True)):
+            result = self.run(url, enabled, options['requests'], options['warmup'])
+            self.stdout.write(
+                f"{label:>13}: " + ", ".join(f"{key} {value:.2f}ms" for key, value in result.items())
+            )
+        self.stdout.write(f"Flushed {interaction_buffer.flush()} interactions still queued")
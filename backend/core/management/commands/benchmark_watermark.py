@@ -0,0 +1,76 @@
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+
+def measure(path, images):
+    """
+    Decode, watermark and encode the photo `images` times in this process.
+    Runs in a fresh interpreter so its peak RSS belongs to this run alone.
+    """
+    import django
+    django.setup()
+    from core.images import encode_image, watermarker
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+    for _ in range(images):
+        started = time.perf_counter()
+        with Image.open(path) as source:
+            source.load()
+            image = source if source.mode == 'RGB' else source.copy()
+        decoded = time.perf_counter()
+        image = watermarker.apply(image, position='center', size_ratio=0.20, opacity=0.55)
+        watermarked = time.perf_counter()
+        encode_image(image, 'JPEG')
+        encoded = time.perf_counter()
+        timings.append((decoded - started, watermarked - decoded, encoded - watermarked))
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return timings, (peak - baseline) // 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Time decoding, watermarking and encoding large synthetic photos, and "
+        "report the peak memory each source format needs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--width', type=int, default=6000, help='Photo width (default 24MP)')
+        parser.add_argument('--height', type=int, default=4000, help='Photo height')
+        parser.add_argument('--images', type=int, default=5, help='Photos processed per format')
+        parser.add_argument('--formats', default='JPEG,PNG', help='Source formats, comma separated')
+
+    def photo(self, path, format, size):
+        # Noise over a gradient compresses roughly like a real photo
+        gradient = Image.linear_gradient('L').resize(size)
+        noise = Image.effect_noise(size, 48)
+        Image.merge('RGB', (gradient, noise, Image.blend(gradient, noise, 0.5))).save(path, format)
+
+    def handle(self, *args, **options):
+        size = (options['width'], options['height'])
+        context = multiprocessing.get_context('spawn')
+        self.stdout.write(
+            f"{options['images']} photos of {size[0]}x{size[1]} "
+            f"({size[0] * size[1] / 1e6:.0f}MP) per format"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for format in options['formats'].upper().split(','):
+                path = os.path.join(directory, f'photo.{format.lower()}')
+                self.photo(path, format, size)
+                with context.Pool(1) as pool:
+                    timings, peak_mb = pool.apply(measure, (path, options['images']))
+
+                first, warm = timings[0], timings[1:] or timings
+                steps = [sum(step) / len(warm) for step in zip(*warm)]
+                self.stdout.write(
+                    f"{format:>5} ({os.path.getsize(path) / 1e6:.1f}MB): "
+                    f"decode {steps[0]:.3f}s, watermark {steps[1]:.3f}s "
+                    f"(first {first[1]:.3f}s, logo not cached), encode {steps[2]:.3f}s, "
+                    f"total {sum(steps):.3f}s per photo; peak memory +{peak_mb}MB"
+                )
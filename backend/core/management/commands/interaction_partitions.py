@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from core.partitions import ensure_partitions, is_partitioned, list_partitions, roll_off
+
+
+class Command(BaseCommand):
+    help = (
+        "Create upcoming monthly PropertyInteraction partitions and drop raw "
+        "partitions past the retention window once they are rolled up."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, help='Months to create ahead of the current one')
+        parser.add_argument('--retain-months', type=int, help='Months of raw interactions to keep')
+        parser.add_argument('--no-roll-off', action='store_true', help='Only create partitions')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be dropped')
+        parser.add_argument('--list', action='store_true', help='List the existing partitions')
+
+    def handle(self, *args, **options):
+        partitioned = is_partitioned()
+        if not partitioned:
+            self.stdout.write("PropertyInteraction is not partitioned on this database; "
+                              "retention deletes expired rows instead.")
+
+        if options['list']:
+            for month, name in sorted(list_partitions().items()) if partitioned else []:
+                self.stdout.write(f"{month:%Y-%m}  {name}")
+            return
+
+        if not options['dry_run']:
+            for name in ensure_partitions(options['months_ahead']):
+                self.stdout.write(self.style.SUCCESS(f"Created {name}"))
+
+        if not options['no_roll_off']:
+            removed = roll_off(options['retain_months'], dry_run=options['dry_run'])
+            verb = "Would remove" if options['dry_run'] else "Removed"
+            for name in removed:
+                self.stdout.write(f"{verb} {name}")
+            if not removed:
+                self.stdout.write("Nothing past the retention window")
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from core.media_sync import sync_media
+
+
+class Command(BaseCommand):
+    help = (
+        "Upload local media files to the media bucket. Only files missing from "
+        "the bucket or differing in size or ETag are sent; interrupted runs resume "
+        "from the manifest."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', help='Local media directory (default: MEDIA_ROOT_LOCAL)')
+        parser.add_argument('--prefix', default='media/', help='Key prefix in the bucket')
+        parser.add_argument('--workers', type=int, help='Parallel uploads (default: MEDIA_SYNC_WORKERS)')
+        parser.add_argument('--manifest', help='Manifest file (default: MEDIA_SYNC_MANIFEST)')
+        parser.add_argument('--size-only', action='store_true',
+                            help='Treat equal sizes as in sync without comparing ETags')
+        parser.add_argument('--dry-run', action='store_true', help='List what would be uploaded')
+
+    def handle(self, *args, **options):
+        report = sync_media(
+            media_root=options['source'],
+            prefix=options['prefix'],
+            workers=options['workers'],
+            manifest_path=options['manifest'],
+            checksum=not options['size_only'],
+            dry_run=options['dry_run'],
+            progress=self.stdout.write,
+        )
+
+        self.stdout.write(
+            f"{report['remote_objects']} objects in the bucket, "
+            f"{report['in_sync']} files in sync, {report['to_upload']} to upload"
+        )
+        for key in report['unverifiable']:
+            self.stdout.write(f"{key}: ETag made with another part size, uploading again")
+        if options['dry_run']:
+            for key in report['keys']:
+                self.stdout.write(f"Would upload {key}")
+            return
+
+        for error in report['errors']:
+            self.stderr.write(f"{error['key']}: {error['error']}")
+        style = self.style.ERROR if report['errors'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"Uploaded {report['uploaded']} files ({report['bytes']} bytes) in "
+            f"{report['seconds']}s: {report['files_per_second']} files/s, "
+            f"{report['bytes_per_second']} bytes/s, {len(report['errors'])} errors"
+        ))
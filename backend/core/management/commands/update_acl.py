@@ -1,16 +1,53 @@
-import boto3
+from django.core.management.base import BaseCommand
 
-# Initialize the S3 client
-s3 = boto3.client(
-    's3',
-    endpoint_url='https://cellar-c2.services.clever-cloud.com',
-    aws_access_key_id='Y8RA26DFTZA0AZDY2GR5',
-    aws_secret_access_key='0ZCeRndoyvHbJy46GS9G2ZCgJluJDH1KhbNeDwS6',
-)
+from core.media_metadata import update_objects
 
-# Open the file properly
-file_path = "C:/Users/PC/Documents/houseofstone/backend/media/property_images/about.png"
-with open(file_path, 'rb') as file:
-    s3.upload_fileobj(file, 'hsp1', 'media/property_images/about.png')
-print("File uploaded successfully.")
 
+class Command(BaseCommand):
+    help = (
+        "Set the ACL, Cache-Control and Content-Type of every object under a "
+        "prefix in the media bucket, with server-side copies."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='media/', help='Key prefix in the bucket')
+        parser.add_argument('--acl', help='Canned ACL (default: AWS_DEFAULT_ACL)')
+        parser.add_argument('--cache-control',
+                            help='Cache-Control header (default: AWS_S3_OBJECT_PARAMETERS)')
+        parser.add_argument('--content-type',
+                            help='Content-Type for every key (default: from each extension)')
+        parser.add_argument('--acl-only', action='store_true',
+                            help='Only set the ACL and leave the metadata as it is')
+        parser.add_argument('--workers', type=int, help='Parallel requests (default: MEDIA_UPDATE_WORKERS)')
+        parser.add_argument('--rate', type=float,
+                            help='Requests per second, 0 for no limit (default: MEDIA_UPDATE_RATE)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the keys')
+
+    def handle(self, *args, **options):
+        report = update_objects(
+            prefix=options['prefix'],
+            acl=options['acl'],
+            cache_control=options['cache_control'],
+            content_type_override=options['content_type'],
+            acl_only=options['acl_only'],
+            workers=options['workers'],
+            rate=options['rate'],
+            dry_run=options['dry_run'],
+            progress=self.stdout.write,
+        )
+
+        if options['dry_run']:
+            self.stdout.write(
+                f"Would update {report['listed'] - report['skipped']} of "
+                f"{report['listed']} objects under {options['prefix']}"
+            )
+            return
+
+        for error in report['errors']:
+            self.stderr.write(f"{error['key']}: {error['error']}")
+        style = self.style.ERROR if report['failed'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"Updated {report['updated']} of {report['listed']} objects in "
+            f"{report['seconds']}s ({report['keys_per_second']} keys/s), "
+            f"{report['skipped']} skipped, {report['failed']} failed"
+        ))
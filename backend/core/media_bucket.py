@@ -0,0 +1,100 @@
+# core/media_bucket.py
+"""
+Direct access to the media bucket behind dospace.storage.MediaStorage, for
+bulk maintenance that would be too slow through the storage API one file at
+a time. The client is built from the same AWS_* settings django-storages
+uses.
+"""
+import hashlib
+import mimetypes
+
+from django.conf import settings
+
+MEDIA_PREFIX = 'media/'
+
+# Types mimetypes gets wrong or does not know on some platforms
+CONTENT_TYPES = {
+    '.webp': 'image/webp',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.svg': 'image/svg+xml',
+    '.pdf': 'application/pdf',
+}
+
+MB = 1024 * 1024
+
+
+def media_bucket():
+    return settings.AWS_STORAGE_BUCKET_NAME
+
+
+def media_client(max_pool_connections=10):
+    """boto3 S3 client for the media bucket, sized for the given concurrency"""
+    import boto3
+    from botocore.config import Config
+
+    return boto3.session.Session().client(
+        's3',
+        region_name=settings.AWS_S3_REGION_NAME,
+        endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        config=Config(
+            max_pool_connections=max_pool_connections,
+            retries={'max_attempts': 10, 'mode': 'adaptive'},
+        ),
+    )
+
+
+def transfer_config(max_concurrency=4):
+    """Multipart settings shared by uploads and local ETag computation"""
+    from boto3.s3.transfer import TransferConfig
+
+    return TransferConfig(
+        multipart_threshold=getattr(settings, 'MEDIA_MULTIPART_THRESHOLD', 8 * MB),
+        multipart_chunksize=getattr(settings, 'MEDIA_MULTIPART_CHUNKSIZE', 8 * MB),
+        max_concurrency=max_concurrency,
+    )
+
+
+def known_content_type(name):
+    """Content-Type for the name's extension, or None when it is missing or unknown"""
+    extension = '.' + name.rsplit('.', 1)[-1].lower() if '.' in name.rsplit('/', 1)[-1] else ''
+    return CONTENT_TYPES.get(extension) or (mimetypes.guess_type(name)[0] if extension else None)
+
+
+def content_type(name):
+    return known_content_type(name) or 'application/octet-stream'
+
+
+def iter_objects(client, bucket, prefix=''):
+    """Every object under prefix, one page (up to 1000 keys) per request"""
+    paginator = client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        yield from page.get('Contents', [])
+
+
+def etag_matches(path, etag, config):
+    """
+    Whether a local file holds the content behind an S3 ETag: the MD5 of the
+    object for single-part uploads, the MD5 of the part MD5s plus
+    "-<parts>" for multipart ones. A multipart ETag made with a different
+    part size cannot be checked, and gives None rather than a match.
+    """
+    whole = hashlib.md5()
+    parts = []
+    with open(path, 'rb') as handle:
+        while True:
+            chunk = handle.read(config.multipart_chunksize)
+            if not chunk:
+                break
+            whole.update(chunk)
+            parts.append(hashlib.md5(chunk).digest())
+
+    if '-' not in etag:
+        return whole.hexdigest() == etag
+    if etag.rsplit('-', 1)[1] != str(len(parts)):
+        return None
+    return etag == f'{hashlib.md5(b"".join(parts)).hexdigest()}-{len(parts)}'
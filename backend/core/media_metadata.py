@@ -0,0 +1,138 @@
+# core/media_metadata.py
+"""
+Bulk ACL and metadata rewrite for objects in the media bucket.
+
+S3 metadata cannot be edited in place; each object is copied onto itself
+with MetadataDirective=REPLACE, which is a server-side copy and moves no
+data through this process. update_objects() streams the listing a page at a
+time and feeds the copies to a thread pool, at most MEDIA_UPDATE_RATE
+requests per second, so millions of keys never sit in memory and the
+provider's rate limits are respected.
+
+A REPLACE copy sets the object's metadata to exactly what is sent: ACL,
+Cache-Control, Content-Type and nothing else. That matches what
+MediaStorage writes on upload. Content-Type comes from the key's extension;
+keys without a known one keep their stored type, read with a HEAD request. With acl_only the objects are left alone and
+only their ACL is set, one cheaper request per key.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .media_bucket import MEDIA_PREFIX, iter_objects, known_content_type, media_bucket, media_client
+
+logger = logging.getLogger(__name__)
+
+# Objects above this need a multipart copy; media files never get near it
+MAX_COPY_SIZE = 5 * 1024 ** 3
+
+# Errors kept in the report; the rest are only counted and logged
+MAX_REPORTED_ERRORS = 100
+
+
+class RateLimiter:
+    """Spaces out calls from any number of threads to at most rate per second"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def default_cache_control():
+    return getattr(settings, 'AWS_S3_OBJECT_PARAMETERS', {}).get('CacheControl')
+
+
+def update_objects(prefix=MEDIA_PREFIX, acl=None, cache_control=None, content_type_override=None,
+                   acl_only=False, workers=None, rate=None, dry_run=False, client=None,
+                   bucket=None, progress=None):
+    """
+    Set the ACL and metadata of every object under prefix. The ACL defaults
+    to AWS_DEFAULT_ACL, Cache-Control to AWS_S3_OBJECT_PARAMETERS and
+    Content-Type to the type for each key's extension, or the object's
+    current type when the extension is missing or unknown. Returns counts and
+    throughput; progress, if given, is called with a message every 1000 keys.
+    """
+    workers = workers or getattr(settings, 'MEDIA_UPDATE_WORKERS', 16)
+    rate = rate if rate is not None else getattr(settings, 'MEDIA_UPDATE_RATE', 200)
+    acl = acl or getattr(settings, 'AWS_DEFAULT_ACL', 'public-read')
+    cache_control = cache_control or default_cache_control()
+    client = client or media_client(max_pool_connections=workers)
+    bucket = bucket or media_bucket()
+    limiter = RateLimiter(rate)
+    started = time.monotonic()
+
+    report = {'listed': 0, 'updated': 0, 'skipped': 0, 'failed': 0, 'errors': []}
+    lock = threading.Lock()
+    # Bounds the keys queued ahead of the workers
+    slots = threading.BoundedSemaphore(workers * 4)
+
+    def update(obj):
+        key = obj['Key']
+        limiter.wait()
+        if acl_only:
+            client.put_object_acl(Bucket=bucket, Key=key, ACL=acl)
+            return
+        params = {
+            'Bucket': bucket,
+            'Key': key,
+            'CopySource': {'Bucket': bucket, 'Key': key},
+            'MetadataDirective': 'REPLACE',
+            'ACL': acl,
+        }
+        stored_type = content_type_override or known_content_type(key)
+        if stored_type is None:
+            stored_type = client.head_object(Bucket=bucket, Key=key).get('ContentType')
+        if stored_type:
+            params['ContentType'] = stored_type
+        if cache_control:
+            params['CacheControl'] = cache_control
+        client.copy_object(**params)
+
+    def run(obj):
+        try:
+            update(obj)
+            with lock:
+                report['updated'] += 1
+        except Exception as e:
+            logger.error(f"Error updating {obj['Key']}: {str(e)}")
+            with lock:
+                report['failed'] += 1
+                if len(report['errors']) < MAX_REPORTED_ERRORS:
+                    report['errors'].append({'key': obj['Key'], 'error': str(e)})
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for obj in iter_objects(client, bucket, prefix):
+            report['listed'] += 1
+            if progress and report['listed'] % 1000 == 0:
+                progress(f"{report['listed']} keys listed, {report['updated']} updated")
+            if obj['Size'] > MAX_COPY_SIZE and not acl_only:
+                logger.warning(f"Skipping {obj['Key']}: too large to copy in one request")
+                report['skipped'] += 1
+                continue
+            if dry_run:
+                continue
+            slots.acquire()
+            executor.submit(run, obj)
+
+    elapsed = time.monotonic() - started
+    report.update(
+        seconds=round(elapsed, 2),
+        keys_per_second=round(report['updated'] / elapsed, 1) if elapsed else 0,
+    )
+    return report
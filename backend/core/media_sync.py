@@ -0,0 +1,169 @@
+# core/media_sync.py
+"""
+Bulk upload of local media files to the media bucket.
+
+sync_media() lists the bucket once into a key -> (size, ETag) map, walks the
+local media directory and uploads only files that are missing or differ,
+from a thread pool. Files at or above MEDIA_MULTIPART_THRESHOLD go up as
+multipart uploads.
+
+Progress is appended to a JSON lines manifest as each upload finishes. A
+rerun after an interruption trusts manifest entries whose size and mtime
+still match and whose key is in the bucket, so it neither re-uploads nor
+re-hashes them. Files whose multipart ETag was made with another part size
+cannot be compared, so they are uploaded again and counted as unverifiable.
+"""
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from django.conf import settings
+
+from .media_bucket import (
+    MEDIA_PREFIX, content_type, etag_matches, iter_objects, media_bucket,
+    media_client, transfer_config,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Manifest:
+    """Append-only record of files known to be in the bucket"""
+
+    def __init__(self, path):
+        self.path = Path(path).resolve()
+        self.entries = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path) as handle:
+                for line in handle:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Partly written line from an interrupted run
+                    self.entries[entry['key']] = entry
+        self._handle = None
+
+    def matches(self, key, size, mtime):
+        entry = self.entries.get(key)
+        return entry is not None and entry['size'] == size and entry['mtime'] == mtime
+
+    def record(self, key, size, mtime):
+        entry = {'key': key, 'size': size, 'mtime': mtime}
+        with self._lock:
+            if self._handle is None:
+                self._handle = open(self.path, 'a')
+            self._handle.write(json.dumps(entry) + '\n')
+            self._handle.flush()
+            self.entries[key] = entry
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+def plan_sync(media_root, remote, manifest, config, prefix=MEDIA_PREFIX, checksum=True):
+    """
+    Local files that need uploading, as (path, key, size, mtime) tuples,
+    the number of files already in the bucket, and the keys among the
+    uploads whose ETag could not be checked.
+    """
+    uploads = []
+    in_sync = 0
+    unverifiable = []
+    for path in sorted(Path(media_root).rglob('*')):
+        if not path.is_file() or path == manifest.path:
+            continue
+        key = prefix + path.relative_to(media_root).as_posix()
+        stat = path.stat()
+        size, mtime = stat.st_size, stat.st_mtime_ns
+        existing = remote.get(key)
+
+        if existing is not None and existing[0] == size:
+            if manifest.matches(key, size, mtime) or not checksum:
+                in_sync += 1
+                continue
+            matches = etag_matches(path, existing[1], config)
+            if matches:
+                manifest.record(key, size, mtime)
+                in_sync += 1
+                continue
+            if matches is None:
+                unverifiable.append(key)
+
+        uploads.append((path, key, size, mtime))
+    return uploads, in_sync, unverifiable
+
+
+def sync_media(media_root=None, prefix=MEDIA_PREFIX, workers=None, manifest_path=None,
+               checksum=True, dry_run=False, client=None, bucket=None, progress=None):
+    """
+    Upload media_root to the bucket under prefix. Returns counts and
+    throughput; progress, if given, is called with a message every 100 files.
+    """
+    media_root = Path(media_root or settings.MEDIA_ROOT_LOCAL).resolve()
+    workers = workers or getattr(settings, 'MEDIA_SYNC_WORKERS', 8)
+    manifest = Manifest(manifest_path or getattr(
+        settings, 'MEDIA_SYNC_MANIFEST', Path(settings.BASE_DIR) / '.media_sync_manifest.jsonl'
+    ))
+    config = transfer_config()
+    client = client or media_client(max_pool_connections=workers * config.max_concurrency)
+    bucket = bucket or media_bucket()
+    started = time.monotonic()
+
+    remote = {
+        obj['Key']: (obj['Size'], obj['ETag'].strip('"'))
+        for obj in iter_objects(client, bucket, prefix)
+    }
+    uploads, in_sync, unverifiable = plan_sync(media_root, remote, manifest, config, prefix, checksum)
+    report = {
+        'remote_objects': len(remote),
+        'in_sync': in_sync,
+        'to_upload': len(uploads),
+        'unverifiable': unverifiable,
+        'uploaded': 0,
+        'bytes': 0,
+        'errors': [],
+    }
+    if dry_run:
+        report['keys'] = [key for path, key, size, mtime in uploads]
+        manifest.close()
+        return report
+
+    object_parameters = getattr(settings, 'AWS_S3_OBJECT_PARAMETERS', {})
+    acl = getattr(settings, 'AWS_DEFAULT_ACL', 'public-read')
+
+    def upload(path, key, size, mtime):
+        extra = dict(object_parameters, ACL=acl, ContentType=content_type(key))
+        client.upload_file(str(path), bucket, key, ExtraArgs=extra, Config=config)
+        manifest.record(key, size, mtime)
+        return size
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(upload, *item): item for item in uploads}
+            for future in as_completed(futures):
+                path, key, size, mtime = futures[future]
+                try:
+                    report['bytes'] += future.result()
+                    report['uploaded'] += 1
+                except Exception as e:
+                    logger.error(f"Error uploading {key}: {str(e)}")
+                    report['errors'].append({'key': key, 'error': str(e)})
+                done = report['uploaded'] + len(report['errors'])
+                if progress and done % 100 == 0:
+                    progress(f"{done}/{len(uploads)} files")
+    finally:
+        manifest.close()
+
+    elapsed = time.monotonic() - started
+    report.update(
+        seconds=round(elapsed, 2),
+        files_per_second=round(report['uploaded'] / elapsed, 1) if elapsed else 0,
+        bytes_per_second=round(report['bytes'] / elapsed) if elapsed else 0,
+    )
+    return report
@@ -1,10 +1,12 @@
 # middleware.py
-from .models import PropertyInteraction, AdminActionLog
+from .models import AdminActionLog
 import logging
 from django.utils.deprecation import MiddlewareMixin
 from django.contrib.auth.models import User
 from django.db import connection, reset_queries
+from django.conf import settings
 from .db_utils import close_old_connections
+from .interactions import property_ids, record_interaction
 
 logger = logging.getLogger(__name__)
 
@@ -34,14 +36,21 @@ class InteractionTrackingMiddleware:
     - Shares (POST /properties/{id}/share/)
     - Inquiries (POST /properties/{id}/inquiry/)
     - Favorites (POST /favorites/)
+
+    Interactions are queued in core.interactions and written in batches,
+    so tracking adds no database round-trips to the request.
     """
 
     def __init__(self, get_response):
         self.get_response = get_response
+        self.enabled = getattr(settings, 'INTERACTION_TRACKING_ENABLED', True)
 
     def __call__(self, request):
         response = self.get_response(request)
 
+        if not self.enabled:
+            return response
+
         try:
             # Track property views
             if self._is_property_detail_view(request):
@@ -95,27 +104,25 @@ class InteractionTrackingMiddleware:
         return None
 
     def _record_interaction(self, request, property_id, interaction_type):
-        """Record the interaction in the database"""
-        from .models import Property
-
-        # Verify property exists
-        if not Property.objects.filter(id=property_id).exists():
+        """Queue the interaction for batched insertion"""
+        # Verify property exists against the cached id set
+        if not property_ids.contains(property_id):
             return
 
-        # Get session key, create session if needed
+        # Use the existing session key only. This runs after SessionMiddleware
+        # has written its cookie, so a session created here would never reach
+        # the client and would just cost an extra INSERT per view.
         session_key = ''
         if hasattr(request, 'session'):
-            if not request.session.session_key:
-                request.session.create()
             session_key = request.session.session_key or ''
 
-        PropertyInteraction.objects.create(
+        record_interaction(
+            property_id,
+            interaction_type,
             user=request.user if request.user.is_authenticated else None,
-            property_id=property_id,
-            interaction_type=interaction_type,
             session_key=session_key
         )
-        logger.debug(f"Recorded {interaction_type} interaction for property {property_id}")
+        logger.debug(f"Queued {interaction_type} interaction for property {property_id}")
 
 class AdminActionLoggingMiddleware(MiddlewareMixin):
     """
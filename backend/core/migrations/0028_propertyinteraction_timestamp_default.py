@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_add_agent_profile_image'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='propertyinteraction',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:09
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+def populate_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("""
+        UPDATE core_property SET search_vector =
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(location, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce((
+                SELECT string_agg(feature, ' ') FROM core_propertyfeature
+                WHERE core_propertyfeature.property_id = core_property.id
+            ), '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'C')
+    """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_property_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_proper_search__9ce275_gin'),
+        ),
+        migrations.RunPython(populate_search_vector, migrations.RunPython.noop),
+    ]
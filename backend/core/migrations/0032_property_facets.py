@@ -0,0 +1,55 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:11
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+def populate_facets(apps, schema_editor):
+    Property = apps.get_model('core', 'Property')
+    PropertyFacetCount = apps.get_model('core', 'PropertyFacetCount')
+    PropertyFacetRange = apps.get_model('core', 'PropertyFacetRange')
+
+    published = Property.objects.filter(is_published=True)
+    PropertyFacetCount.objects.bulk_create([
+        PropertyFacetCount(facet=facet, value=item[facet], count=item['count'])
+        for facet in ('property_type', 'category', 'status', 'location')
+        for item in published.order_by().values(facet).annotate(count=Count('id'))
+    ])
+    for field in ('price', 'beds', 'baths'):
+        stats = published.aggregate(low=Min(field), high=Max(field))
+        PropertyFacetRange.objects.create(
+            facet=field, min_value=stats['low'], max_value=stats['high']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_property_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyFacetRange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=30, unique=True)),
+                ('min_value', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('max_value', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PropertyFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=30)),
+                ('value', models.CharField(max_length=200)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['facet', 'value'],
+                'unique_together': {('facet', 'value')},
+            },
+        ),
+        migrations.RunPython(populate_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:15
+
+import django.core.serializers.json
+from collections import defaultdict
+from datetime import date
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def populate_rollup(apps, schema_editor):
+    DashboardRollup = apps.get_model('core', 'DashboardRollup')
+    PropertyStat = apps.get_model('core', 'PropertyStat')
+    Property = apps.get_model('core', 'Property')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    metrics = ('views', 'inquiries', 'favorites', 'shares')
+    days = defaultdict(dict)
+    for row in PropertyStat.objects.values('date').annotate(**{m: Sum(m) for m in metrics}):
+        days[row['date']].update({m: row[m] or 0 for m in metrics})
+    for row in User.objects.annotate(day=TruncDate('date_joined')).values('day').annotate(count=Count('id')):
+        days[row['day']]['new_users'] = row['count']
+    for row in Property.objects.annotate(day=TruncDate('created_at')).values('day').annotate(count=Count('id')):
+        days[row['day']]['new_properties'] = row['count']
+
+    DashboardRollup.objects.bulk_create([
+        DashboardRollup(period='day', date=day, **figures)
+        for day, figures in days.items() if day is not None
+    ], batch_size=500)
+
+    totals = PropertyStat.objects.aggregate(**{m: Sum(m) for m in metrics})
+    DashboardRollup.objects.create(
+        period='total',
+        date=max((day for day in days if day is not None), default=date.today()),
+        **{m: totals[m] or 0 for m in metrics}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0032_property_facets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('total', 'All time')], default='day', max_length=10)),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('inquiries', models.PositiveIntegerField(default=0)),
+                ('favorites', models.PositiveIntegerField(default=0)),
+                ('shares', models.PositiveIntegerField(default=0)),
+                ('new_users', models.PositiveIntegerField(default=0)),
+                ('new_properties', models.PositiveIntegerField(default=0)),
+                ('snapshot', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'constraints': [models.UniqueConstraint(fields=('period', 'date'), name='unique_dashboard_rollup_day'), models.UniqueConstraint(condition=models.Q(('period', 'total')), fields=('period',), name='unique_dashboard_rollup_total')],
+            },
+        ),
+        migrations.RunPython(populate_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:22
+
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def _add_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def partition_interactions(apps, schema_editor):
+    """
+    Rebuild core_propertyinteraction as a table partitioned by month on
+    timestamp. PostgreSQL only; other databases keep the plain table.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    PropertyInteraction = apps.get_model('core', 'PropertyInteraction')
+    Property = apps.get_model('core', 'Property')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    quote = schema_editor.quote_name
+    table = PropertyInteraction._meta.db_table
+    legacy = f'{table}_legacy'
+    sequence = f'{table}_id_seq'
+    execute = schema_editor.execute
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes "
+            "WHERE schemaname = current_schema() AND tablename = %s AND indexname NOT LIKE %s",
+            [table, '%pkey'],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(f"SELECT MIN(timestamp), MAX(id) FROM {quote(table)}")
+        first, max_id = cursor.fetchone()
+
+    execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(legacy)}")
+    # The partition key has to be part of the primary key
+    execute(
+        f"CREATE TABLE {quote(table)} (LIKE {quote(legacy)} INCLUDING DEFAULTS) "
+        f"PARTITION BY RANGE (timestamp)"
+    )
+    execute(f"CREATE SEQUENCE {quote(sequence + '_part')} OWNED BY {quote(table)}.id")
+    execute(
+        f"ALTER TABLE {quote(table)} ALTER COLUMN id "
+        f"SET DEFAULT nextval('{sequence}_part'), ADD PRIMARY KEY (id, timestamp)"
+    )
+    execute(
+        f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(table + '_property_fk')} "
+        f"FOREIGN KEY (property_id) REFERENCES {quote(Property._meta.db_table)} (id) "
+        f"DEFERRABLE INITIALLY DEFERRED"
+    )
+    execute(
+        f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(table + '_user_fk')} "
+        f"FOREIGN KEY (user_id) REFERENCES {quote(User._meta.db_table)} (id) "
+        f"DEFERRABLE INITIALLY DEFERRED"
+    )
+    for name, definition in indexes:
+        # Same names on the new parent; the definitions already name it
+        execute(f"DROP INDEX {quote(name)}")
+        execute(definition)
+
+    execute(f"CREATE TABLE {quote(table + '_default')} PARTITION OF {quote(table)} DEFAULT")
+    today = timezone.localdate()
+    month = (timezone.localdate(first) if first else today).replace(day=1)
+    last = _add_month(_add_month(today.replace(day=1)))
+    while month <= last:
+        following = _add_month(month)
+        # DDL takes no bind parameters; the bounds are generated dates
+        lower, upper = (
+            timezone.make_aware(datetime.combine(day, datetime.min.time())).isoformat()
+            for day in (month, following)
+        )
+        execute(
+            f"CREATE TABLE {quote(f'{table}_p{month:%Y%m}')} PARTITION OF {quote(table)} "
+            f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+        )
+        month = following
+
+    execute(f"INSERT INTO {quote(table)} SELECT * FROM {quote(legacy)}")
+    execute(f"DROP TABLE {quote(legacy)}")
+    if max_id:
+        execute(f"SELECT setval('{sequence}_part', %s)", [max_id])
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0034_backfill_checkpoints'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='propertyinteraction',
+            index=models.Index(fields=['timestamp'], name='core_interaction_ts_idx'),
+        ),
+        # Irreversible: unapplying cannot turn the partitioned table back
+        migrations.RunPython(partition_interactions),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0036_propertyimage_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('property_created', 'Property Created'), ('property_updated', 'Property Updated'), ('property_deleted', 'Property Deleted'), ('property_status', 'Property Status Changed'), ('agent_created', 'Agent Created'), ('agent_updated', 'Agent Updated'), ('agent_deleted', 'Agent Deleted'), ('user_created', 'User Registered'), ('user_updated', 'User Updated'), ('inquiry_received', 'Inquiry Received'), ('property_shared', 'Property Shared'), ('lead', 'New Lead'), ('property_match', 'Property Match'), ('alert', 'System Alert'), ('info', 'Information')], max_length=50),
+        ),
+        migrations.CreateModel(
+            name='AlertMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('notified_at', models.DateTimeField(blank=True, null=True)),
+                ('alert', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='core.propertyalert')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alert_matches', to='core.property')),
+                ('saved_search', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='core.savedsearch')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['notified_at', 'alert'], name='core_alertmatch_pending_idx')],
+                'constraints': [models.UniqueConstraint(fields=('alert', 'property'), name='core_alertmatch_alert_uniq'), models.UniqueConstraint(fields=('saved_search', 'property'), name='core_alertmatch_search_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_alert_matches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertySimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarities', to='core.property')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.property')),
+            ],
+            options={
+                'ordering': ['property', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('property', 'rank'), name='core_similarity_rank_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_property_similarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyPopularity',
+            fields=[
+                ('property', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='core.property')),
+                ('popularity_score', models.FloatField(default=0)),
+                ('trending_score', models.FloatField(default=0)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('inquiries', models.PositiveIntegerField(default=0)),
+                ('favorites', models.PositiveIntegerField(default=0)),
+                ('shares', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-popularity_score', 'property'], name='core_popularity_score_idx'), models.Index(fields=['-trending_score', 'property'], name='core_trending_score_idx')],
+            },
+        ),
+    ]
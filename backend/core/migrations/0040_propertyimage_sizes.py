@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0039_property_popularity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertyimage',
+            name='original_bytes',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='propertyimage',
+            name='stored_bytes',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,10 +1,75 @@
 import uuid
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Case, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Concat
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth.models import User  
 from decimal import Decimal
 from django.utils import timezone
-    
+
+
+class FieldTrackerMixin:
+    """
+    Snapshots tracked_fields when an instance is initialized (and again after
+    each save), so change detection needs no extra query:
+
+        if instance.has_changed('status'):
+            previous = instance.get_old('status')
+
+    Deferred fields are not snapshotted and never report a change.
+    """
+    tracked_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tracked_snapshot = {}
+        self._snapshot_tracked_fields(self.tracked_fields)
+
+    def _snapshot_tracked_fields(self, fields):
+        for name in fields:
+            attname = self._meta.get_field(name).attname
+            if attname in self.__dict__:
+                self._tracked_snapshot[name] = self.__dict__[attname]
+            else:
+                self._tracked_snapshot.pop(name, None)
+
+    def has_changed(self, field):
+        if field not in self._tracked_snapshot:
+            return False
+        attname = self._meta.get_field(field).attname
+        return getattr(self, attname) != self._tracked_snapshot[field]
+
+    def get_old(self, field):
+        return self._tracked_snapshot.get(field)
+
+    def changed_fields(self):
+        """Map of changed field name to its previous value"""
+        return {
+            name: self._tracked_snapshot[name]
+            for name in self.tracked_fields
+            if self.has_changed(name)
+        }
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            update_fields = self.tracked_fields
+        self._snapshot_tracked_fields(
+            [name for name in self.tracked_fields if name in update_fields]
+        )
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        fields = kwargs.get('fields') or self.tracked_fields
+        self._snapshot_tracked_fields(
+            [name for name in self.tracked_fields if name in fields]
+        )
+
+
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
     first_name = models.CharField(max_length=100, blank=True)
@@ -18,7 +83,7 @@ class Profile(models.Model):
     def __str__(self):
         return f"{self.user.username}'s Profile"
     
-class Agent(models.Model):
+class Agent(FieldTrackerMixin, models.Model):
     POSITION_CHOICES = [
         ('agency_admin', 'Agency Admin'),
         ('agent', 'Agent'),
@@ -30,6 +95,8 @@ class Agent(models.Model):
         ('delete', 'Delete'),
         ('view_only', 'View Only'),
     ]
+
+    tracked_fields = ('email', 'is_active', 'position', 'permissions')
     
     user = models.OneToOneField(
         User, 
@@ -72,7 +139,42 @@ class Agent(models.Model):
             return f"{self.first_name} {self.middle_name} {self.surname}"
         return f"{self.first_name} {self.surname}"
 
-class Property(models.Model):
+class PropertyQuerySet(models.QuerySet):
+    def with_list_annotations(self):
+        """
+        Annotate the primary image path and primary agent name so list
+        serializers need no per-row queries. Mirrors the fallbacks in
+        PropertyListSerializer: primary agent, then any agent, then the
+        owning user's username.
+        """
+        first_image = PropertyImage.objects.filter(
+            property=OuterRef('pk')
+        ).order_by('order', 'created_at', 'id')
+
+        agent_name = Case(
+            When(agent__middle_name='', then=Concat(
+                'agent__first_name', Value(' '), 'agent__surname'
+            )),
+            default=Concat(
+                'agent__first_name', Value(' '), 'agent__middle_name',
+                Value(' '), 'agent__surname'
+            ),
+            output_field=models.CharField(),
+        )
+        first_agent = PropertyAgent.objects.filter(
+            property=OuterRef('pk')
+        ).order_by('-is_primary', 'id').annotate(name=agent_name)
+
+        return self.annotate(
+            primary_image_name=Subquery(first_image.values('image')[:1]),
+            primary_agent_name=Coalesce(
+                Subquery(first_agent.values('name')[:1]),
+                F('user__username'),
+            ),
+        )
+
+
+class Property(FieldTrackerMixin, models.Model):
     AREA_UNIT_CHOICES = [
         ('sqm', 'Square Meters'),
         ('sqft', 'Square Feet'),
@@ -112,6 +214,10 @@ class Property(models.Model):
         ('off-market', 'Off Market'),
     ]
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='available', db_index=True)
+    tracked_fields = (
+        'status', 'is_published', 'title', 'location', 'description',
+        'property_type', 'category', 'price', 'beds', 'baths',
+    )
     beds = models.PositiveIntegerField(null=True, blank=True)
     baths = models.PositiveIntegerField(null=True, blank=True)
     kitchens = models.PositiveIntegerField(null=True, blank=True)
@@ -133,6 +239,11 @@ class Property(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Maintained by core.search; see update_search_vector
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = PropertyQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Property'
         verbose_name_plural = 'Properties'
@@ -154,6 +265,13 @@ class Property(models.Model):
             models.Index(fields=['baths']),
             models.Index(fields=['location']),
             models.Index(fields=['property_type', 'category', 'status']),
+
+            # Keyset pagination sorts
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['price', 'id']),
+
+            # Full-text search
+            GinIndex(fields=['search_vector']),
         ]
 
     def __str__(self):
@@ -166,6 +284,11 @@ class PropertyImage(models.Model):
     order = models.IntegerField(default=0) 
     created_at = models.DateTimeField(default=timezone.now)
     is_watermarked = models.BooleanField(default=False)  # Add this field
+    # {label: {name, width, height}} written by core.images
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
+    # Upload and shrunk master sizes, set once core.images has processed it
+    original_bytes = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    stored_bytes = models.PositiveIntegerField(null=True, blank=True, editable=False)
 
     
     class Meta:
@@ -280,13 +403,14 @@ class Neighborhood(models.Model):
     average_price = models.DecimalField(max_digits=12, decimal_places=2)
     school_rating = models.FloatField()
 
-class Inquiry(models.Model):
+class Inquiry(FieldTrackerMixin, models.Model):
     STATUS_CHOICES = [
         ('new', 'New'),
         ('contacted', 'Contacted'),
         ('responded', 'Responded'),
         ('closed', 'Closed'),
     ]
+    tracked_fields = ('status',)
 
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='inquiries')
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
@@ -325,6 +449,33 @@ class PropertyAlert(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+
+class AlertMatch(models.Model):
+    """
+    A listing that matched a PropertyAlert or a SavedSearch (see core.alerts).
+    notified_at stays empty until the alert's digest has been sent.
+    """
+    alert = models.ForeignKey(PropertyAlert, on_delete=models.CASCADE, null=True, blank=True,
+                              related_name='matches')
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, null=True, blank=True,
+                                     related_name='matches')
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='alert_matches')
+    created_at = models.DateTimeField(auto_now_add=True)
+    notified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['alert', 'property'], name='core_alertmatch_alert_uniq'),
+            models.UniqueConstraint(fields=['saved_search', 'property'], name='core_alertmatch_search_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['notified_at', 'alert'], name='core_alertmatch_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.alert or self.saved_search} matched {self.property_id}"
+
+
 class PropertyShare(models.Model):
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='shares')
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)  # Null for anonymous shares
@@ -344,9 +495,17 @@ class PropertyInteraction(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True)  # Null for anonymous
     property = models.ForeignKey(Property, on_delete=models.CASCADE)
     interaction_type = models.CharField(max_length=20, choices=INTERACTION_TYPES)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the event is recorded, not when the buffered row is flushed
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     session_key = models.CharField(max_length=40, blank=True)  # For anonymous users
 
+    class Meta:
+        # On PostgreSQL the table is partitioned by month on timestamp,
+        # see core.partitions
+        indexes = [
+            models.Index(fields=['timestamp'], name='core_interaction_ts_idx'),
+        ]
+
 class AdminActionLog(models.Model):
     ACTION_TYPES = [
         ('user_modified', 'User Modified'),
@@ -367,6 +526,52 @@ class AdminActionLog(models.Model):
         return f"{self.admin} performed {self.action_type} at {self.timestamp}"
 
 
+class PropertySimilarity(models.Model):
+    """
+    A listing's nearest neighbours by co-interaction, best first. Rebuilt
+    offline by core.recommendations.build_similarities.
+    """
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='similarities')
+    similar = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['property', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'rank'], name='core_similarity_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.property_id} -> {self.similar_id} ({self.score:.3f})"
+
+
+class PropertyPopularity(models.Model):
+    """
+    Time-decayed interaction scores of a listing, with its raw counts over
+    the same window. Refreshed from PropertyStat by
+    core.popularity.refresh_popularity.
+    """
+    property = models.OneToOneField(Property, on_delete=models.CASCADE, primary_key=True,
+                                    related_name='popularity')
+    popularity_score = models.FloatField(default=0)
+    trending_score = models.FloatField(default=0)
+    views = models.PositiveIntegerField(default=0)
+    inquiries = models.PositiveIntegerField(default=0)
+    favorites = models.PositiveIntegerField(default=0)
+    shares = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-popularity_score', 'property'], name='core_popularity_score_idx'),
+            models.Index(fields=['-trending_score', 'property'], name='core_trending_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.property_id}: {self.popularity_score:.1f} popular, {self.trending_score:.1f} trending"
+
+
 class Notification(models.Model):
     """
     System notifications for CRUD operations and user activity.
@@ -384,6 +589,7 @@ class Notification(models.Model):
         ('inquiry_received', 'Inquiry Received'),
         ('property_shared', 'Property Shared'),
         ('lead', 'New Lead'),
+        ('property_match', 'Property Match'),
         ('alert', 'System Alert'),
         ('info', 'Information'),
     ]
@@ -411,4 +617,155 @@ class Notification(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.notification_type}: {self.title}"
\ No newline at end of file
+        return f"{self.notification_type}: {self.title}"
+
+class EmailOutbox(models.Model):
+    """
+    Transactional outbox for notification emails. Rows are written by signal
+    handlers and delivered by the core.tasks.process_email_outbox consumer.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    template_name = models.CharField(max_length=100)
+    context = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    recipients = models.JSONField(default=list)
+    from_email = models.CharField(max_length=254, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Outbox Email'
+        verbose_name_plural = 'Email Outbox'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} ({self.status})"
+
+
+class PropertyFacetCount(models.Model):
+    """
+    Number of published properties per facet value (property_type, category,
+    status, location). Maintained incrementally by core.facets.
+    """
+    facet = models.CharField(max_length=30)
+    value = models.CharField(max_length=200)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['facet', 'value']
+        unique_together = ('facet', 'value')
+
+    def __str__(self):
+        return f"{self.facet}={self.value}: {self.count}"
+
+
+class PropertyFacetRange(models.Model):
+    """Min/max of a numeric facet (price, beds, baths) over published properties"""
+    facet = models.CharField(max_length=30, unique=True)
+    min_value = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    max_value = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.facet}: {self.min_value} - {self.max_value}"
+
+
+class DashboardRollup(models.Model):
+    """
+    Precomputed admin dashboard figures. One 'day' row per date, and a single
+    'total' row holding all-time sums plus a snapshot of the platform counts.
+    Maintained by core.aggregation.
+    """
+    PERIOD_CHOICES = [
+        ('day', 'Day'),
+        ('total', 'All time'),
+    ]
+
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES, default='day')
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    inquiries = models.PositiveIntegerField(default=0)
+    favorites = models.PositiveIntegerField(default=0)
+    shares = models.PositiveIntegerField(default=0)
+    new_users = models.PositiveIntegerField(default=0)
+    new_properties = models.PositiveIntegerField(default=0)
+    snapshot = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'date'], name='unique_dashboard_rollup_day'),
+            models.UniqueConstraint(
+                fields=['period'], condition=models.Q(period='total'),
+                name='unique_dashboard_rollup_total',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Dashboard {self.period} {self.date}"
+
+
+class BackfillRun(models.Model):
+    """A PropertyStat backfill split into BackfillChunk checkpoints"""
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    start_date = models.DateField()
+    end_date = models.DateField()
+    chunk_days = models.PositiveIntegerField(default=7)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Backfill {self.start_date} - {self.end_date} ({self.status})"
+
+
+class BackfillChunk(models.Model):
+    """A date range of a BackfillRun; done chunks are skipped when a run resumes"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    run = models.ForeignKey(BackfillRun, on_delete=models.CASCADE, related_name='chunks')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    rows = models.PositiveIntegerField(default=0)
+    seconds = models.FloatField(default=0)
+    last_error = models.TextField(blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['start_date']
+        unique_together = ('run', 'start_date')
+
+    @property
+    def days(self):
+        return (self.end_date - self.start_date).days + 1
+
+    def __str__(self):
+        return f"{self.start_date} - {self.end_date} ({self.status})"
@@ -0,0 +1,226 @@
+# core/notifications.py
+"""
+Transactional outbox for notification emails.
+
+Signal handlers call queue_email(), which writes an EmailOutbox row inside the
+current transaction and schedules delivery with transaction.on_commit. The
+Celery consumer (core.tasks.process_email_outbox) renders pending rows and
+sends them in batches over one SMTP connection, retrying failures with
+exponential backoff.
+"""
+import logging
+from datetime import date, datetime, timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import models, transaction
+from django.db.models import F
+from django.template import TemplateDoesNotExist
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.html import strip_tags
+
+logger = logging.getLogger(__name__)
+
+
+def encode_context(value):
+    """
+    Make a template context JSON-safe. Model instances and querysets are
+    stored as references and re-fetched when the email is rendered.
+    """
+    if isinstance(value, models.Model):
+        return {'__model__': value._meta.label_lower, 'pk': value.pk}
+    if isinstance(value, models.QuerySet):
+        return {
+            '__queryset__': value.model._meta.label_lower,
+            'pks': list(value.values_list('pk', flat=True)),
+        }
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, date):
+        return {'__date__': value.isoformat()}
+    if isinstance(value, dict):
+        return {key: encode_context(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode_context(item) for item in value]
+    return value
+
+
+def decode_context(value):
+    """Reverse encode_context, loading referenced objects from the database"""
+    if isinstance(value, list):
+        return [decode_context(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+
+    if '__model__' in value:
+        model = apps.get_model(value['__model__'])
+        return model._default_manager.filter(pk=value['pk']).first()
+    if '__queryset__' in value:
+        model = apps.get_model(value['__queryset__'])
+        return model._default_manager.filter(pk__in=value['pks'])
+    if '__datetime__' in value:
+        return parse_datetime(value['__datetime__'])
+    if '__date__' in value:
+        return parse_date(value['__date__'])
+    return {key: decode_context(item) for key, item in value.items()}
+
+
+def queue_email(subject, template_name, context, recipient_list, from_email=None):
+    """
+    Write an email to the outbox. Delivery is scheduled once the surrounding
+    transaction commits, so a rolled-back save never sends mail.
+    """
+    from .models import EmailOutbox
+
+    outbox = EmailOutbox.objects.create(
+        subject=subject[:255],
+        template_name=template_name,
+        context=encode_context(context),
+        recipients=list(recipient_list),
+        from_email=from_email or '',
+    )
+    transaction.on_commit(_schedule_delivery)
+    return outbox
+
+
+def _schedule_delivery():
+    from .tasks import process_email_outbox
+    try:
+        process_email_outbox.delay()
+    except Exception as e:
+        # The periodic outbox sweep will pick the row up instead
+        logger.error(f"Failed to queue outbox delivery: {str(e)}")
+
+
+def render_email(subject, template_name, context, recipient_list, from_email=None):
+    """Render an HTML email with a plain text fallback"""
+    html_content = render_to_string(f'emails/{template_name}.html', context)
+    msg = EmailMultiAlternatives(
+        subject=subject,
+        body=strip_tags(html_content),
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=recipient_list,
+    )
+    msg.attach_alternative(html_content, "text/html")
+    return msg
+
+
+def retry_delay(attempts):
+    """Backoff before the next delivery attempt"""
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 60)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), 6 * 60 * 60))
+
+
+def claim_batch(batch_size):
+    """
+    Lock up to batch_size due rows and mark them as sending. A claim expires
+    after EMAIL_OUTBOX_CLAIM_TIMEOUT, so rows held by a crashed worker are
+    picked up again.
+    """
+    from .models import EmailOutbox
+
+    now = timezone.now()
+    claim_timeout = getattr(settings, 'EMAIL_OUTBOX_CLAIM_TIMEOUT', 600)
+    with transaction.atomic():
+        ids = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status__in=['pending', 'sending'], next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        EmailOutbox.objects.filter(id__in=ids).update(
+            status='sending',
+            attempts=F('attempts') + 1,
+            next_attempt_at=now + timedelta(seconds=claim_timeout),
+        )
+    return list(EmailOutbox.objects.filter(id__in=ids).order_by('id'))
+
+
+def deliver_pending(batch_size=None):
+    """
+    Render and send one batch of outbox rows over a single SMTP connection.
+    Returns counts of claimed, sent, retried and failed rows.
+    """
+    from .models import EmailOutbox
+
+    batch_size = batch_size or getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    result = {'claimed': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+
+    rows = claim_batch(batch_size)
+    result['claimed'] = len(rows)
+    if not rows:
+        return result
+
+    sent_ids = []
+    errors = {}
+    permanent = set()
+
+    messages = []
+    for row in rows:
+        try:
+            messages.append((row, render_email(
+                row.subject,
+                row.template_name,
+                decode_context(row.context),
+                row.recipients,
+                row.from_email or None,
+            )))
+        except TemplateDoesNotExist as e:
+            errors[row.id] = f"Template not found: {e}"
+            permanent.add(row.id)
+        except Exception as e:
+            errors[row.id] = str(e)
+
+    if messages:
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+            for row, msg in messages:
+                try:
+                    connection.send_messages([msg])
+                    sent_ids.append(row.id)
+                except Exception as e:
+                    errors[row.id] = str(e)
+        except Exception as e:
+            # Could not reach the mail server at all; retry the whole batch
+            for row, msg in messages:
+                errors.setdefault(row.id, str(e))
+        finally:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    now = timezone.now()
+    if sent_ids:
+        EmailOutbox.objects.filter(id__in=sent_ids).update(
+            status='sent', sent_at=now, last_error=''
+        )
+        result['sent'] = len(sent_ids)
+
+    for row in rows:
+        if row.id not in errors:
+            continue
+        if row.id in permanent or row.attempts >= max_attempts:
+            row.status = 'failed'
+            result['failed'] += 1
+        else:
+            row.status = 'pending'
+            row.next_attempt_at = now + retry_delay(row.attempts)
+            result['retried'] += 1
+        row.last_error = errors[row.id][:2000]
+        row.save(update_fields=['status', 'next_attempt_at', 'last_error'])
+        logger.error(
+            f"Failed to send email {row.id}: {row.subject} "
+            f"(attempt {row.attempts}) - Error: {errors[row.id]}"
+        )
+
+    logger.info(
+        f"Outbox batch: {result['sent']} sent, {result['retried']} retried, "
+        f"{result['failed']} failed"
+    )
+    return result
@@ -0,0 +1,218 @@
+# core/pagination.py
+"""
+Pagination for property listings.
+
+PropertyCursorPagination is a keyset paginator: each page is fetched with
+WHERE (sort_value, id) beyond the last row seen, so deep pages cost the same
+as the first one. Totals come from cached_count(), which caches COUNT(*) per
+filtered query in a namespace invalidated whenever a property is saved or
+deleted.
+"""
+import base64
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .caching import cached, invalidate_namespace
+
+logger = logging.getLogger(__name__)
+
+COUNT_NAMESPACE = 'property_counts'
+
+
+def invalidate_property_counts():
+    """Drop every cached listing count"""
+    invalidate_namespace(COUNT_NAMESPACE)
+
+
+def cached_count(queryset):
+    """
+    COUNT(*) for a queryset, cached per SQL statement for
+    PROPERTY_COUNT_CACHE_TTL seconds.
+    """
+    queryset = queryset.order_by()
+    try:
+        sql = str(queryset.query)
+    except Exception:
+        # Some filters cannot be rendered without a database round trip
+        return queryset.count()
+
+    return cached(
+        hashlib.md5(sql.encode('utf-8')).hexdigest(),
+        queryset.count,
+        timeout=getattr(settings, 'PROPERTY_COUNT_CACHE_TTL', 60),
+        namespace=COUNT_NAMESPACE,
+    )
+
+
+class CachedCountPaginator(Paginator):
+    """Django paginator whose total comes from cached_count()"""
+
+    @cached_property
+    def count(self):
+        return cached_count(self.object_list)
+
+
+class PropertyCursorPagination(BasePagination):
+    """
+    Keyset pagination over (sort field, id). The sort is taken from the
+    ordering query parameter; sorts without a keyset fall back to newest.
+    """
+    cursor_query_param = 'cursor'
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    # ordering param -> (field, descending)
+    orderings = {
+        'newest': ('created_at', True),
+        '-created_at': ('created_at', True),
+        'oldest': ('created_at', False),
+        'created_at': ('created_at', False),
+        'price-low': ('price', False),
+        'price': ('price', False),
+        'price-high': ('price', True),
+        '-price': ('price', True),
+    }
+    default_ordering = 'newest'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(request)
+        self.count = cached_count(queryset)
+
+        cursor = self.decode_cursor(request)
+        backwards = bool(cursor and cursor.get('b'))
+
+        # Walking backwards reads the mirrored order and flips the page afterwards
+        descending = self.descending != backwards
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(f'{prefix}{self.field}', f'{prefix}id')
+
+        if cursor:
+            value = queryset.model._meta.get_field(self.field).to_python(cursor['v'])
+            op = 'lt' if descending else 'gt'
+            bound = 'lte' if descending else 'gte'
+            queryset = queryset.filter(**{f'{self.field}__{bound}': value}).filter(
+                Q(**{f'{self.field}__{op}': value}) |
+                Q(**{self.field: value, f'id__{op}': cursor['id']})
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if backwards:
+            results.reverse()
+
+        self.page = results
+        if backwards:
+            self.has_next = cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get('ordering', self.default_ordering)
+        if ordering not in self.orderings:
+            logger.info(f"Ordering '{ordering}' has no keyset, using {self.default_ordering}")
+            ordering = self.default_ordering
+        return self.orderings[ordering]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            cursor = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if cursor.get('f') != self.field:
+                # Cursor was issued for a different sort; restart from the top
+                return None
+            cursor['id'] = int(cursor['id'])
+            return cursor
+        except Exception:
+            raise NotFound('Invalid cursor')
+
+    def encode_cursor(self, obj, backwards=False):
+        cursor = {'f': self.field, 'v': str(getattr(obj, self.field)), 'id': obj.pk}
+        if backwards:
+            cursor['b'] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(cursor, separators=(',', ':')).encode('utf-8')
+        ).decode('ascii').rstrip('=')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], backwards=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('page_size', self.page_size),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer'},
+                'page_size': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CursorPaginationMixin:
+    """
+    Switches a viewset's list to cursor_pagination_class when the request
+    carries ?cursor=... or ?pagination=cursor.
+    """
+    cursor_pagination_class = PropertyCursorPagination
+
+    def use_cursor_pagination(self):
+        params = self.request.query_params
+        return 'cursor' in params or params.get('pagination') == 'cursor'
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.use_cursor_pagination():
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
@@ -0,0 +1,204 @@
+# core/partitions.py
+"""
+Monthly partitions and retention for PropertyInteraction.
+
+On PostgreSQL core_propertyinteraction is a declarative RANGE partitioned
+table on timestamp (migration 0035), with one partition per calendar month
+named core_propertyinteraction_pYYYYMM plus a DEFAULT partition. The
+timestamp ranges that aggregate_interactions() filters on touch one or two
+partitions, so daily aggregation stays flat as history grows.
+
+ensure_partitions() creates the months ahead before rows arrive.
+roll_off() drops raw partitions past INTERACTION_RETENTION_MONTHS, but only
+once every day in them has been rolled up into PropertyStat and
+DashboardRollup. Other databases have no partitions; roll_off() deletes the
+expired rows in batches there instead.
+"""
+import logging
+import re
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .aggregation import _day_start
+
+logger = logging.getLogger(__name__)
+
+PARTITION_SUFFIX = re.compile(r'_p(\d{4})(\d{2})$')
+
+
+def _table():
+    from .models import PropertyInteraction
+    return PropertyInteraction._meta.db_table
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{_table()}_p{month:%Y%m}'
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [_table()],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    """Monthly partitions as {month start: table name}"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [_table()],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        match = PARTITION_SUFFIX.search(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def ensure_partitions(months_ahead=None, start=None):
+    """Create monthly partitions from start (default: this month) to months_ahead"""
+    if months_ahead is None:
+        months_ahead = getattr(settings, 'INTERACTION_PARTITIONS_AHEAD', 2)
+    if not is_partitioned():
+        return []
+
+    existing = list_partitions()
+    today = timezone.localdate()
+    month = month_start(start or today)
+    last = add_months(month_start(today), months_ahead)
+    quote = connection.ops.quote_name
+    created = []
+    while month <= last:
+        if month not in existing:
+            name = partition_name(month)
+            try:
+                # DDL takes no bind parameters; the bounds are generated dates
+                lower = _day_start(month).isoformat()
+                upper = _day_start(add_months(month, 1)).isoformat()
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(
+                        f"CREATE TABLE {quote(name)} PARTITION OF {quote(_table())} "
+                        f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+                    )
+                created.append(name)
+            except Exception as e:
+                # Usually rows for this month already sit in the DEFAULT partition
+                logger.error(f"Error creating partition {name}: {str(e)}")
+        month = add_months(month, 1)
+    return created
+
+
+def is_rolled_up(start_date, end_date):
+    """
+    True when every day in the range was rolled up after it ended, i.e. its
+    PropertyStat rows came from complete interaction data. Days without
+    any raw interactions have nothing to lose and count as rolled up;
+    quiet days often have no DashboardRollup row at all.
+    """
+    from .models import DashboardRollup, PropertyInteraction
+
+    rolled_up = DashboardRollup.objects.filter(
+        period='day', date__gte=start_date, date__lte=end_date
+    ).values_list('date', 'updated_at')
+    complete = {
+        day for day, updated_at in rolled_up
+        if updated_at >= _day_start(day + timedelta(days=1))
+    }
+
+    day = start_date
+    while day <= end_date:
+        if day not in complete and PropertyInteraction.objects.filter(
+            timestamp__gte=_day_start(day), timestamp__lt=_day_start(day + timedelta(days=1))
+        ).exists():
+            return False
+        day += timedelta(days=1)
+    return True
+
+
+def retention_cutoff(retain_months=None):
+    """First month that must be kept"""
+    if retain_months is None:
+        retain_months = getattr(settings, 'INTERACTION_RETENTION_MONTHS', 13)
+    return add_months(month_start(timezone.localdate()), -retain_months)
+
+
+def roll_off(retain_months=None, dry_run=False):
+    """
+    Remove raw interactions older than the retention window that have been
+    rolled up. Returns the partitions (or months, without partitioning) removed.
+    """
+    cutoff = retention_cutoff(retain_months)
+    if is_partitioned():
+        return _drop_partitions(cutoff, dry_run)
+    return _delete_rows(cutoff, dry_run)
+
+
+def _drop_partitions(cutoff, dry_run):
+    quote = connection.ops.quote_name
+    dropped = []
+    for month, name in sorted(list_partitions().items()):
+        if month >= cutoff:
+            break
+        last_day = add_months(month, 1) - timedelta(days=1)
+        if not is_rolled_up(month, last_day):
+            logger.warning(f"Keeping partition {name}: not fully rolled up")
+            continue
+        if not dry_run:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f"ALTER TABLE {quote(_table())} DETACH PARTITION {quote(name)}")
+                cursor.execute(f"DROP TABLE {quote(name)}")
+        dropped.append(name)
+    return dropped
+
+
+def _delete_rows(cutoff, dry_run):
+    from .models import PropertyInteraction
+
+    batch_size = getattr(settings, 'INTERACTION_ROLL_OFF_BATCH_SIZE', 5000)
+    first = PropertyInteraction.objects.order_by('timestamp').values_list('timestamp', flat=True).first()
+    if first is None:
+        return []
+
+    removed = []
+    month = month_start(timezone.localdate(first))
+    while month < cutoff:
+        next_month = add_months(month, 1)
+        rows = PropertyInteraction.objects.filter(
+            timestamp__gte=_day_start(month), timestamp__lt=_day_start(next_month)
+        )
+        if not rows.exists():
+            pass
+        elif not is_rolled_up(month, next_month - timedelta(days=1)):
+            logger.warning(f"Keeping interactions for {month:%Y-%m}: not fully rolled up")
+        else:
+            if not dry_run:
+                while True:
+                    ids = list(rows.values_list('id', flat=True)[:batch_size])
+                    if not ids:
+                        break
+                    PropertyInteraction.objects.filter(id__in=ids).delete()
+            removed.append(f'{month:%Y-%m}')
+        month = next_month
+    return removed
@@ -0,0 +1,140 @@
+# core/popularity.py
+"""
+Maintained popularity and trending scores per listing.
+
+refresh_popularity() reads the last POPULARITY_WINDOW_DAYS of PropertyStat
+in one grouped query. It produces two exponentially time-decayed sums of
+the type-weighted daily counts:
+
+- popularity_score, with a half-life of POPULARITY_HALF_LIFE_DAYS;
+- trending_score, with the shorter TRENDING_HALF_LIFE_DAYS.
+
+The decay factor depends only on a row's date, so it is a CASE over the
+days in the window and the whole sum stays in SQL. The scores and the raw
+window totals are upserted into PropertyPopularity. Listings with no
+activity in the window are removed.
+
+Both score columns are indexed. "Popular", "trending", the global
+recommendations and the dashboard's popular listings are therefore top-K
+index reads, not aggregates over the interaction table.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Sum, Value, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+STAT_METRICS = ('views', 'inquiries', 'favorites', 'shares')
+
+# PropertyStat column -> weight of one event
+DEFAULT_WEIGHTS = {'views': 1.0, 'shares': 2.0, 'favorites': 3.0, 'inquiries': 4.0}
+
+# Query kind -> PropertyPopularity column
+SCORE_FIELDS = {'popular': 'popularity_score', 'trending': 'trending_score'}
+
+
+def _decayed(weighted, today, days, half_life):
+    """Sum of weighted counts, each day's halved every half_life days"""
+    return Sum(
+        weighted * Case(
+            *(
+                When(date=today - timedelta(days=age), then=Value(0.5 ** (age / half_life)))
+                for age in range(days)
+            ),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+        output_field=FloatField(),
+    )
+
+
+def refresh_popularity(today=None):
+    """Recompute every listing's scores; returns counts and timings"""
+    from .models import PropertyPopularity, PropertyStat
+
+    today = today or timezone.localdate()
+    days = getattr(settings, 'POPULARITY_WINDOW_DAYS', 30)
+    weights = dict(DEFAULT_WEIGHTS, **getattr(settings, 'POPULARITY_WEIGHTS', {}))
+    popular_half_life = getattr(settings, 'POPULARITY_HALF_LIFE_DAYS', 7)
+    trending_half_life = getattr(settings, 'TRENDING_HALF_LIFE_DAYS', 1)
+    batch_size = getattr(settings, 'STATS_AGGREGATION_BATCH_SIZE', 1000)
+    started = time.monotonic()
+    now = timezone.now()
+
+    weighted = F('views') * weights['views']
+    for metric in STAT_METRICS[1:]:
+        weighted = weighted + F(metric) * weights[metric]
+    rows = (
+        PropertyStat.objects.filter(date__gt=today - timedelta(days=days), date__lte=today)
+        .order_by()
+        .values('property_id')
+        .annotate(
+            popularity_score=_decayed(weighted, today, days, popular_half_life),
+            trending_score=_decayed(weighted, today, days, trending_half_life),
+            **{f'total_{metric}': Sum(metric) for metric in STAT_METRICS}
+        )
+    )
+    scores = [
+        PropertyPopularity(
+            property_id=row['property_id'],
+            popularity_score=row['popularity_score'] or 0.0,
+            trending_score=row['trending_score'] or 0.0,
+            updated_at=now,
+            **{metric: row[f'total_{metric}'] or 0 for metric in STAT_METRICS}
+        )
+        for row in rows
+    ]
+    computed = time.monotonic()
+
+    with transaction.atomic():
+        PropertyPopularity.objects.bulk_create(
+            scores,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['property'],
+            update_fields=['popularity_score', 'trending_score', 'updated_at', *STAT_METRICS],
+        )
+        removed, _ = PropertyPopularity.objects.filter(updated_at__lt=now).delete()
+
+    elapsed = time.monotonic() - started
+    return {
+        'rows': len(scores),
+        'removed': removed,
+        'compute_seconds': round(computed - started, 3),
+        'seconds': round(elapsed, 3),
+    }
+
+
+def top_property_ids(kind='popular', limit=10, published=True):
+    """Ids of the highest scoring listings, best first"""
+    from .models import PropertyPopularity
+
+    field = SCORE_FIELDS[kind]
+    scores = PropertyPopularity.objects.filter(**{f'{field}__gt': 0})
+    if published:
+        scores = scores.filter(property__is_published=True)
+    return list(scores.order_by(f'-{field}', 'property_id').values_list('property_id', flat=True)[:limit])
+
+
+def top_properties(kind='popular', limit=10, queryset=None):
+    """
+    Published listings for top_property_ids(), in ranked order, loaded from
+    queryset. Until the scores cover enough listings, the newest ones fill
+    the rest.
+    """
+    from .models import Property
+
+    queryset = queryset if queryset is not None else Property.objects.all()
+    ids = top_property_ids(kind, limit)
+    if len(ids) < limit:
+        ids += list(
+            Property.objects.filter(is_published=True).exclude(pk__in=ids)
+            .order_by('-created_at').values_list('id', flat=True)[:limit - len(ids)]
+        )
+    properties = queryset.filter(pk__in=ids).in_bulk()
+    return [properties[pk] for pk in ids if pk in properties]
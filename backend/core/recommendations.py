@@ -0,0 +1,178 @@
+# core/recommendations.py
+"""
+Item-to-item recommendations from co-interactions.
+
+build_similarities() runs offline in Celery. It reads the last
+RECOMMENDER_WINDOW_DAYS of PropertyInteraction once into a sparse
+visitor x listing matrix. Visitors are users or anonymous sessions. Each
+cell is the log-damped, type-weighted interaction count. Cosine similarity
+between listing columns comes from one sparse product, computed a block of
+columns at a time to bound memory. The RECOMMENDER_TOP_K best neighbours of
+every published listing replace the PropertySimilarity table in one
+transaction.
+
+Serving is then a single indexed lookup on (property, rank) for the
+listings a visitor has recently touched, with their neighbours' scores
+summed.
+"""
+import logging
+import math
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEIGHTS = {'view': 1.0, 'share': 2.0, 'favorite': 3.0, 'inquiry': 4.0}
+
+
+def interaction_matrix(since, weights=None):
+    """
+    Sparse CSR matrix of visitors x listings over published listings, plus
+    the listing id of each column.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    from .models import Property, PropertyInteraction
+
+    weights = weights or getattr(settings, 'RECOMMENDER_WEIGHTS', DEFAULT_WEIGHTS)
+    property_ids = np.array(
+        sorted(Property.objects.filter(is_published=True).values_list('id', flat=True)),
+        dtype=np.int64,
+    )
+    column = {pk: i for i, pk in enumerate(property_ids.tolist())}
+
+    visitors = {}
+    rows, cols, values = [], [], []
+    interactions = PropertyInteraction.objects.filter(timestamp__gte=since).values_list(
+        'user_id', 'session_key', 'property_id', 'interaction_type'
+    )
+    for user_id, session_key, property_id, interaction_type in interactions.iterator(chunk_size=10000):
+        col = column.get(property_id)
+        if col is None:
+            continue
+        visitor = ('u', user_id) if user_id else ('s', session_key)
+        if visitor == ('s', ''):
+            continue
+        rows.append(visitors.setdefault(visitor, len(visitors)))
+        cols.append(col)
+        values.append(weights.get(interaction_type, 1.0))
+
+    matrix = sparse.coo_matrix(
+        (np.array(values, dtype=np.float32), (np.array(rows, dtype=np.int32), np.array(cols, dtype=np.int32))),
+        shape=(len(visitors), len(property_ids)),
+    ).tocsr()  # Repeat interactions are summed
+    matrix.data = np.log1p(matrix.data)
+    return matrix, property_ids
+
+
+def top_neighbours(matrix, top_k, block_size=None):
+    """
+    Yield (column, neighbour columns, scores) with the top_k cosine
+    neighbours of each column, best first.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    block_size = block_size or getattr(settings, 'RECOMMENDER_BLOCK_SIZE', 2048)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    norms[norms == 0] = 1
+    normalised = (matrix @ sparse.diags(1 / norms)).tocsc()
+    transposed = normalised.T.tocsr()
+
+    for start in range(0, normalised.shape[1], block_size):
+        block = (transposed @ normalised[:, start:start + block_size]).tocsc()
+        for offset in range(block.shape[1]):
+            column = start + offset
+            lo, hi = block.indptr[offset], block.indptr[offset + 1]
+            neighbours = block.indices[lo:hi]
+            scores = block.data[lo:hi]
+            keep = (neighbours != column) & (scores > 0)
+            neighbours, scores = neighbours[keep], scores[keep]
+            if len(scores) > top_k:
+                best = np.argpartition(-scores, top_k)[:top_k]
+                neighbours, scores = neighbours[best], scores[best]
+            if len(scores):
+                order = np.argsort(-scores, kind='stable')
+                yield column, neighbours[order], scores[order]
+
+
+def build_similarities(window_days=None, top_k=None):
+    """Rebuild PropertySimilarity; returns counts and timings"""
+    from .models import PropertySimilarity
+
+    window_days = window_days or getattr(settings, 'RECOMMENDER_WINDOW_DAYS', 180)
+    top_k = top_k or getattr(settings, 'RECOMMENDER_TOP_K', 20)
+    batch_size = getattr(settings, 'RECOMMENDER_BATCH_SIZE', 5000)
+    started = time.monotonic()
+
+    matrix, property_ids = interaction_matrix(timezone.now() - timedelta(days=window_days))
+    loaded = time.monotonic()
+
+    # Readers keep seeing the previous table until the swap commits
+    written = 0
+    with transaction.atomic():
+        PropertySimilarity.objects.all().delete()
+        batch = []
+        for column, neighbours, scores in top_neighbours(matrix, top_k):
+            source = int(property_ids[column])
+            batch.extend(
+                PropertySimilarity(
+                    property_id=source, similar_id=int(property_ids[neighbour]),
+                    score=float(score), rank=rank,
+                )
+                for rank, (neighbour, score) in enumerate(zip(neighbours, scores), start=1)
+            )
+            if len(batch) >= batch_size:
+                PropertySimilarity.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        PropertySimilarity.objects.bulk_create(batch)
+        written += len(batch)
+
+    elapsed = time.monotonic() - started
+    return {
+        'visitors': matrix.shape[0],
+        'properties': matrix.shape[1],
+        'interactions': int(matrix.nnz),
+        'rows': written,
+        'load_seconds': round(loaded - started, 2),
+        'compute_seconds': round(elapsed - (loaded - started), 2),
+        'seconds': round(elapsed, 2),
+    }
+
+
+def similar_property_ids(seed_ids, limit=10, exclude=()):
+    """
+    Listings most similar to the seeds, best first. Seeds earlier in the
+    list (the most recent) count for more.
+    """
+    from .models import PropertySimilarity
+
+    seed_ids = list(dict.fromkeys(seed_ids))
+    if not seed_ids:
+        return []
+    recency = {pk: 1 / math.sqrt(i + 1) for i, pk in enumerate(seed_ids)}
+    excluded = set(seed_ids) | set(exclude)
+
+    scores = defaultdict(float)
+    for source, similar, score in PropertySimilarity.objects.filter(
+        property_id__in=seed_ids
+    ).values_list('property_id', 'similar_id', 'score'):
+        if similar not in excluded:
+            scores[similar] += score * recency[source]
+    return sorted(scores, key=lambda pk: -scores[pk])[:limit]
+
+
+def recommend(seed_ids, limit=10, exclude=()):
+    """Published listings for similar_property_ids(), in ranked order"""
+    from .models import Property
+
+    ids = similar_property_ids(seed_ids, limit=limit * 2, exclude=exclude)
+    properties = Property.objects.filter(pk__in=ids, is_published=True).in_bulk()
+    return [properties[pk] for pk in ids if pk in properties][:limit]
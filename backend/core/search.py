@@ -0,0 +1,101 @@
+# core/search.py
+"""
+Full-text search for property listings.
+
+On PostgreSQL every property carries a search_vector (tsvector) built from
+title (weight A), location and features (B) and description (C), backed by a
+GIN index. Each search term is prefix-matched so partial words typed into the
+search box already hit, and results are ranked with ts_rank. Other databases
+fall back to icontains matching.
+"""
+import logging
+import re
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import Exists, F, OuterRef, Q, Subquery, TextField
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'english'
+
+# Property fields that feed the search vector
+SEARCH_FIELDS = ('title', 'location', 'description')
+
+
+def _is_postgres(using):
+    return connections[using].vendor == 'postgresql'
+
+
+def property_search_vector():
+    """Expression that computes a property's search vector from its row"""
+    from .models import PropertyFeature
+
+    features = (
+        PropertyFeature.objects.filter(property=OuterRef('pk'))
+        .order_by()
+        .values('property')
+        .annotate(text=StringAgg('feature', delimiter=' '))
+        .values('text')
+    )
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('location', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(Subquery(features, output_field=TextField()), weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vector(property_ids):
+    """Recompute the stored search vector for the given properties"""
+    from .models import Property
+
+    queryset = Property.objects.filter(pk__in=property_ids)
+    if not _is_postgres(queryset.db):
+        return 0
+    return queryset.update(search_vector=property_search_vector())
+
+
+def build_search_query(term):
+    """
+    Turn free text into a prefix tsquery: "3 bed borr" matches
+    "3 bedroom house in Borrowdale". Returns None if nothing is searchable.
+    """
+    tokens = re.findall(r'\w+', term.lower())
+    if not tokens:
+        return None
+    raw = ' & '.join(f'{token}:*' for token in tokens)
+    return SearchQuery(raw, search_type='raw', config=SEARCH_CONFIG)
+
+
+def search_properties(queryset, term):
+    """
+    Filter a property queryset by a search term, ordered by relevance.
+    On PostgreSQL the rows are annotated with search_rank.
+    """
+    from .models import PropertyFeature
+
+    term = term.strip()
+    if not term:
+        return queryset
+
+    if _is_postgres(queryset.db):
+        query = build_search_query(term)
+        if query is None:
+            return queryset
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(search_rank=SearchRank(F('search_vector'), query))
+            .order_by('-search_rank', '-created_at')
+        )
+
+    has_feature = PropertyFeature.objects.filter(
+        property=OuterRef('pk'), feature__icontains=term
+    )
+    return queryset.filter(
+        Q(title__icontains=term) |
+        Q(location__icontains=term) |
+        Q(description__icontains=term) |
+        Exists(has_feature)
+    ).order_by('-created_at')
@@ -6,6 +6,7 @@ from django.contrib.auth import authenticate
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from decimal import Decimal
+from .search import update_search_vector
 
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -70,11 +71,29 @@ class ProfileSerializer(serializers.ModelSerializer):
     
     
 class PropertyImageSerializer(serializers.ModelSerializer):
+    derivatives = serializers.SerializerMethodField()
+    saved_bytes = serializers.SerializerMethodField()
+
     class Meta:
         model = PropertyImage
-        fields = ['id', 'image', 'caption', 'order', 'created_at']
+        fields = ['id', 'image', 'caption', 'order', 'created_at', 'derivatives',
+                  'original_bytes', 'stored_bytes', 'saved_bytes']
         read_only_fields = ['created_at']
 
+    def get_saved_bytes(self, obj):
+        """Bytes the image task saved on this upload; None until it has run"""
+        if obj.original_bytes is None or obj.stored_bytes is None:
+            return None
+        return obj.original_bytes - obj.stored_bytes
+
+    def get_derivatives(self, obj):
+        """URLs of the resized copies, e.g. {'thumb': ..., 'card': ..., 'hero': ...}"""
+        storage = obj.image.storage
+        return {
+            label: storage.url(derivative['name'])
+            for label, derivative in (obj.derivatives or {}).items()
+        }
+
 class PropertyFeatureSerializer(serializers.ModelSerializer):
     class Meta:
         model = PropertyFeature
@@ -98,8 +117,33 @@ class PropertyAgentSerializer(serializers.ModelSerializer):
         model = PropertyAgent
         fields = ['id', 'agent', 'agent_id', 'is_primary', 'assigned_date']
 
-class PropertyListSerializer(serializers.ModelSerializer):
-    """Lightweight serializer for list views"""
+class SparseFieldsMixin:
+    """
+    Lets read requests pick a subset of fields with ?fields=id,title,price.
+    Unknown names are ignored; writes always use the full field set.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        requested = request.query_params.get('fields')
+        if not requested:
+            return
+        wanted = {name.strip() for name in requested.split(',') if name.strip()}
+        if not wanted & set(self.fields):
+            return
+        for name in set(self.fields) - wanted:
+            self.fields.pop(name)
+
+
+class PropertyListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Lightweight serializer for list views. Pass a queryset built with
+    Property.objects.with_list_annotations() to serialize a page in a
+    constant number of queries; plain instances fall back to per-row lookups.
+    """
     primary_image = serializers.SerializerMethodField()
     agent_name = serializers.SerializerMethodField()  # Changed to SerializerMethodField
     
@@ -107,16 +151,24 @@ class PropertyListSerializer(serializers.ModelSerializer):
         model = Property
         fields = [
             'id', 'title', 'price', 'location', 'property_type', 'category',
-            'status', 'beds', 'baths', 'area_measurement', 'area_unit',
-            'primary_image', 'agent_name', 'created_at'
+            'status', 'beds', 'baths', 'area_measurement', 'area_unit', 'sqft',
+            'primary_image', 'agent_name', 'created_at', 'updated_at'
         ]
     
     def get_primary_image(self, obj):
+        if hasattr(obj, 'primary_image_name'):
+            if not obj.primary_image_name:
+                return None
+            return PropertyImage._meta.get_field('image').storage.url(obj.primary_image_name)
+
         # Get first image efficiently
         first_image = obj.images.first()
         return first_image.image.url if first_image else None
     
     def get_agent_name(self, obj):
+        if hasattr(obj, 'primary_agent_name'):
+            return obj.primary_agent_name
+
         # Get the primary agent's name if exists
         primary_agent = obj.property_agents.filter(is_primary=True).first()
         if primary_agent and primary_agent.agent:
@@ -143,7 +195,7 @@ class PropertyDetailSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Property
-        fields = '__all__'
+        exclude = ['search_vector']
         read_only_fields = ['created_at', 'updated_at', 'user']
     
     def get_agent_info(self, obj):
@@ -156,7 +208,7 @@ class PropertyDetailSerializer(serializers.ModelSerializer):
         return None
 
 
-class PropertySerializer(serializers.ModelSerializer):
+class PropertySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Standard serializer for create/update operations with enhanced image handling"""
     images = PropertyImageSerializer(many=True, required=False, read_only=True)
     features = PropertyFeatureSerializer(many=True, required=False, read_only=True)
@@ -164,13 +216,20 @@ class PropertySerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Property
-        fields = '__all__'
+        exclude = ['search_vector']
         read_only_fields = ['created_at', 'updated_at', 'user']
         extra_kwargs = {
             'features': {'required': False},
             'agents': {'required': False},
         }
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Set by _process_images when this request uploaded images
+        if getattr(self, 'upload_report', None):
+            data['upload_report'] = self.upload_report
+        return data
+
     def create(self, validated_data):
         from django.db import transaction
 
@@ -209,6 +268,7 @@ class PropertySerializer(serializers.ModelSerializer):
                         )
                 if features_to_create:
                     PropertyFeature.objects.bulk_create(features_to_create)
+                    update_search_vector([property_instance.pk])
 
             # Bulk create property agents
             if agents_data:
@@ -308,7 +368,9 @@ class PropertySerializer(serializers.ModelSerializer):
                             )
                     if features_to_create:
                         PropertyFeature.objects.bulk_create(features_to_create)
-            
+
+                update_search_vector([instance.pk])
+
             # Update agents - only if explicitly provided
             if 'agents' in request.data:  # Check if agents was in the request
                 # Delete existing agents
@@ -382,6 +444,17 @@ class PropertySerializer(serializers.ModelSerializer):
             # Save new images
             for img in images_to_create:
                 img.save()
+
+            # The photos are shrunk by the image task after this request;
+            # each image reports stored_bytes and saved_bytes once it has run
+            self.upload_report = {
+                'files': [
+                    {'id': img.id, 'name': image_data.name, 'original_bytes': image_data.size}
+                    for img, image_data in zip(images_to_create, images_data)
+                ],
+                'original_bytes': sum(image_data.size for image_data in images_data),
+                'status': 'processing',
+            }
         
         # Update existing image captions and order
         for caption_data in image_captions:
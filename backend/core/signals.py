@@ -1,80 +1,187 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
 from django.conf import settings
 from .models import Profile
 from django.db import transaction
 from django.contrib.auth.models import User  
-from django.db.models.signals import post_save, post_delete, pre_save
+from django.db.models.signals import post_init, post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from django.core.mail import send_mail, EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from django.core.mail import send_mail
 from django.conf import settings
 from django.urls import reverse
 from django.utils import timezone
-from datetime import datetime
+from django.core.cache import cache
+from datetime import datetime, timedelta
 from .models import (
     Property, Agent, PropertyShare, Profile,
-    PropertyAgent, Inquiry, AdminActionLog, Notification
+    PropertyAgent, Inquiry, AdminActionLog, Notification, PropertyAlert, SavedSearch,
+    PropertyFeature,
 )
+import hashlib
 import logging
+import time
 logger = logging.getLogger(__name__)
-from django.core.files.base import ContentFile
 from .models import PropertyImage
-from .utils import apply_watermark
-import os
+from .images import delete_derivatives
+from .interactions import property_ids
+from .pagination import invalidate_property_counts
+from .search import SEARCH_FIELDS, update_search_vector
+from .alerts import MATCH_FIELDS
+from .caching import AGENT_STATS, ALERT_INDEX, FEATURE_INDEX, PROPERTY_FACETS, invalidate_namespace
+from .facets import FACET_FIELDS, RANGE_FIELDS, published_values, record_property_change
+from .feature_index import record_tag_change
+
+FACET_SOURCE_FIELDS = {'is_published', *FACET_FIELDS, *RANGE_FIELDS}
+from .notifications import queue_email
 from django.conf import settings
 
 ADMIN_EMAILS = ['admin@zim-rec.co.zw','simbamtombe@gmail.com']
 
-# Email template rendering helper
+# Email helper
 def send_notification_email(subject, template_name, context, recipient_list, from_email=None):
     """
-    Send HTML email with fallback to plain text
+    Queue an HTML email in the outbox. It is rendered and sent by the
+    process_email_outbox Celery task after the current transaction commits,
+    so saves never wait on the mail server.
     """
     try:
-        if not from_email:
-            from_email = settings.DEFAULT_FROM_EMAIL
-        
-        # Render HTML template
-        html_content = render_to_string(f'emails/{template_name}.html', context)
-        text_content = strip_tags(html_content)
-        
-        # Create email message
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=from_email,
-            to=recipient_list
-        )
-        msg.attach_alternative(html_content, "text/html")
-        msg.send()
-        
-        logger.info(f"Email sent successfully: {subject} to {recipient_list}")
+        queue_email(subject, template_name, context, recipient_list, from_email)
+        logger.info(f"Email queued: {subject} to {recipient_list}")
         return True
-        
+
     except Exception as e:
-        logger.error(f"Failed to send email: {subject} - Error: {str(e)}")
+        logger.error(f"Failed to queue email: {subject} - Error: {str(e)}")
         return False
 
-# Get admin emails for notifications
-def get_admin_emails():
-    """Get list of admin email addresses"""
+# Admin recipient registry. get_admin_emails() is called several times per
+# save, so the list is memoized per process and shared through the cache.
+# Entries are keyed by a digest of settings.ADMINS, so changing ADMINS
+# starts a fresh entry, and refresh_admin_emails() drops them when a User
+# change affects the superuser list.
+ADMIN_EMAILS_CACHE_TIMEOUT = 60 * 60 * 24
+_admin_emails_local = {}
+
+def _admin_emails_cache_key():
+    digest = hashlib.md5(repr(settings.ADMINS).encode()).hexdigest()[:12]
+    return f'admin_emails:{digest}'
+
+def _load_admin_emails():
     admin_emails = []
     for name, email in settings.ADMINS:
         admin_emails.append(email)
-    
+
     # Also get superuser emails
-    superusers = User.objects.filter(is_superuser=True, is_active=True)
-    for user in superusers:
-        if user.email and user.email not in admin_emails:
-            admin_emails.append(user.email)
-    
+    superusers = User.objects.filter(
+        is_superuser=True, is_active=True
+    ).exclude(email='').values_list('email', flat=True)
+    for email in superusers:
+        if email not in admin_emails:
+            admin_emails.append(email)
+
     return admin_emails
 
+# Avoided queries are counted in process and added to the shared hourly
+# counter in batches, so a memo hit costs no cache round trip.
+_saved_queries = {'pending': 0, 'flushed_at': time.monotonic()}
+
+def _saved_queries_key(moment):
+    return f"admin_emails:saved:{moment:%Y%m%d%H}"
+
+def flush_saved_queries():
+    pending = _saved_queries['pending']
+    _saved_queries['pending'] = 0
+    _saved_queries['flushed_at'] = time.monotonic()
+    if not pending:
+        return
+    key = _saved_queries_key(timezone.now())
+    if not cache.add(key, pending, 60 * 60 * 48):
+        try:
+            cache.incr(key, pending)
+        except ValueError:
+            pass
+
+def _count_saved_query():
+    _saved_queries['pending'] += 1
+    interval = getattr(settings, 'ADMIN_EMAILS_SAVED_FLUSH_INTERVAL', 60)
+    if time.monotonic() - _saved_queries['flushed_at'] >= interval:
+        flush_saved_queries()
+
+def admin_email_queries_saved(hours=24):
+    """Database queries avoided by the recipient cache, per hour"""
+    flush_saved_queries()
+    now = timezone.now()
+    hours_list = [now - timedelta(hours=offset) for offset in range(hours)]
+    keys = {_saved_queries_key(hour): hour for hour in hours_list}
+    counts = cache.get_many(list(keys))
+    return [
+        {'hour': hour.strftime('%Y-%m-%dT%H:00'), 'saved': counts.get(key, 0)}
+        for key, hour in keys.items()
+    ]
+
+def invalidate_admin_emails():
+    cache.delete(_admin_emails_cache_key())
+    _admin_emails_local.clear()
+
+# Get admin emails for notifications
+def get_admin_emails():
+    """Get list of admin email addresses"""
+    key = _admin_emails_cache_key()
+    local_ttl = getattr(settings, 'ADMIN_EMAILS_LOCAL_TTL', 60)
+
+    entry = _admin_emails_local.get(key)
+    if entry and time.monotonic() - entry[0] < local_ttl:
+        _count_saved_query()
+        return list(entry[1])
+
+    admin_emails = cache.get(key)
+    if admin_emails is None:
+        admin_emails = _load_admin_emails()
+        cache.set(key, admin_emails, ADMIN_EMAILS_CACHE_TIMEOUT)
+    else:
+        _count_saved_query()
+
+    _admin_emails_local[key] = (time.monotonic(), admin_emails)
+    # Callers may mutate the list (see admin_action_notification)
+    return list(admin_emails)
+
+# User fields that decide whether someone is on the recipient list
+ADMIN_RECIPIENT_FIELDS = ('email', 'is_superuser', 'is_staff', 'is_active')
+
+def _snapshot_admin_fields(instance):
+    # Same idea as FieldTrackerMixin: loaded values, deferred fields skipped
+    instance._admin_snapshot = {
+        name: instance.__dict__[name]
+        for name in ADMIN_RECIPIENT_FIELDS if name in instance.__dict__
+    }
+
+@receiver(post_init, sender=User)
+def track_admin_fields(sender, instance, **kwargs):
+    _snapshot_admin_fields(instance)
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def refresh_admin_emails(sender, instance, created=False, **kwargs):
+    """Drop the cached recipient list when a staff or superuser account changes"""
+    previous = getattr(instance, '_admin_snapshot', {})
+    _snapshot_admin_fields(instance)
+
+    update_fields = kwargs.get('update_fields')
+    if update_fields and not set(ADMIN_RECIPIENT_FIELDS) & set(update_fields):
+        return
+
+    privileged = (
+        instance.is_superuser or instance.is_staff or
+        previous.get('is_superuser') or previous.get('is_staff')
+    )
+    if not privileged:
+        return
+    changed = created or kwargs.get('signal') is post_delete or any(
+        getattr(instance, name) != value for name, value in previous.items()
+    )
+    if changed:
+        transaction.on_commit(invalidate_admin_emails)
+
 # PROPERTY SIGNALS
 
 @receiver(post_save, sender=Property)
@@ -127,39 +234,37 @@ def property_created_notification(sender, instance, created, **kwargs):
 @receiver(pre_save, sender=Property)
 def property_status_change_notification(sender, instance, **kwargs):
     """Send notification when property status changes"""
-    if instance.pk:  # Only for existing properties
-        try:
-            old_instance = Property.objects.get(pk=instance.pk)
-            if old_instance.status != instance.status:
-                context = {
-                    'property': instance,
-                    'old_status': old_instance.get_status_display(),
-                    'new_status': instance.get_status_display(),
-                    'site_name': settings.SITE_NAME,
-                    'property_url': f"{settings.FRONTEND_URL}/properties/{instance.id}",
-                    'timestamp': timezone.now()
-                }
-                
-                # Notify admins
-                admin_emails = get_admin_emails()
-                if admin_emails:
-                    send_notification_email(
-                        subject=f"Property Status Changed: {instance.title}",
-                        template_name='property_status_changed',
-                        context=context,
-                        recipient_list=admin_emails
-                    )
-                
-                # Notify agent
-                if instance.user and instance.user.email:
-                    send_notification_email(
-                        subject=f"Your Property Status Updated: {instance.title}",
-                        template_name='property_status_changed_agent',
-                        context=context,
-                        recipient_list=[instance.user.email]
-                    )
-        except Property.DoesNotExist:
-            pass
+    # Only for existing properties; the old value comes from the field
+    # tracker snapshot instead of re-fetching the row
+    if instance.pk and instance.has_changed('status'):
+        old_status = instance.get_old('status')
+        context = {
+            'property': instance,
+            'old_status': dict(Property.STATUS_CHOICES).get(old_status, old_status),
+            'new_status': instance.get_status_display(),
+            'site_name': settings.SITE_NAME,
+            'property_url': f"{settings.FRONTEND_URL}/properties/{instance.id}",
+            'timestamp': timezone.now()
+        }
+
+        # Notify admins
+        admin_emails = get_admin_emails()
+        if admin_emails:
+            send_notification_email(
+                subject=f"Property Status Changed: {instance.title}",
+                template_name='property_status_changed',
+                context=context,
+                recipient_list=admin_emails
+            )
+
+        # Notify agent
+        if instance.user and instance.user.email:
+            send_notification_email(
+                subject=f"Your Property Status Updated: {instance.title}",
+                template_name='property_status_changed_agent',
+                context=context,
+                recipient_list=[instance.user.email]
+            )
 
 @receiver(post_save, sender=Property)
 def property_updated_notification(sender, instance, created, **kwargs):
@@ -196,6 +301,91 @@ def property_updated_notification(sender, instance, created, **kwargs):
                 recipient_list=admin_emails
             )
 
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def refresh_tracked_property_ids(sender, instance, created=False, **kwargs):
+    """Keep the interaction tracker's cached id set in step with listings"""
+    if created or kwargs.get('signal') is post_delete:
+        transaction.on_commit(property_ids.invalidate)
+
+
+@receiver(post_save, sender=Property)
+def refresh_property_search_vector(sender, instance, created, **kwargs):
+    """Rebuild the search vector when searchable text changes"""
+    if created or any(instance.has_changed(field) for field in SEARCH_FIELDS):
+        update_search_vector([instance.pk])
+
+
+@receiver(post_save, sender=Property)
+def update_property_facets(sender, instance, created, update_fields=None, **kwargs):
+    """Move the listing's facet contribution from its old values to its new ones"""
+    if update_fields is not None and not set(update_fields) & FACET_SOURCE_FIELDS:
+        return
+    old = None if created else published_values(instance, old=True)
+    record_property_change(old, published_values(instance))
+
+
+@receiver(post_delete, sender=Property)
+def remove_property_facets(sender, instance, **kwargs):
+    record_property_change(published_values(instance, old=True), None)
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_property_caches(sender, instance, created=False, **kwargs):
+    """Cached facets and agent figures derive from listings"""
+    namespaces = [PROPERTY_FACETS]
+    if created or kwargs.get('signal') is post_delete or instance.has_changed('status'):
+        namespaces.append(AGENT_STATS)
+    transaction.on_commit(lambda: [invalidate_namespace(ns) for ns in namespaces])
+
+
+@receiver(post_save, sender=PropertyAgent)
+@receiver(post_delete, sender=PropertyAgent)
+def invalidate_agent_stats(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_namespace(AGENT_STATS))
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def refresh_property_counts(sender, instance, **kwargs):
+    """Any save can move a listing in or out of a filtered count"""
+    transaction.on_commit(invalidate_property_counts)
+
+
+@receiver(post_save, sender=Property)
+def queue_alert_matching(sender, instance, created, **kwargs):
+    """Test new listings, and changes that could make one match, against alerts"""
+    if not instance.is_published:
+        return
+    if created or any(instance.has_changed(field) for field in MATCH_FIELDS):
+        from .tasks import match_property_alerts
+        property_id = instance.pk
+        transaction.on_commit(lambda: match_property_alerts.delay(property_id))
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def refresh_feature_index(sender, instance, **kwargs):
+    """Processes re-read listings updated since their last feature index sync"""
+    transaction.on_commit(lambda: invalidate_namespace(FEATURE_INDEX))
+
+
+@receiver(post_save, sender=PropertyFeature)
+@receiver(post_delete, sender=PropertyFeature)
+def refresh_feature_tags(sender, instance, **kwargs):
+    """Tags are part of the listing's vector, so the next sync re-reads it"""
+    property_id = instance.property_id
+    transaction.on_commit(lambda: record_tag_change(property_id))
+
+
+@receiver(post_save, sender=PropertyAlert)
+@receiver(post_delete, sender=PropertyAlert)
+@receiver(post_save, sender=SavedSearch)
+@receiver(post_delete, sender=SavedSearch)
+def invalidate_alert_index(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_namespace(ALERT_INDEX))
+
 # USER REGISTRATION SIGNALS
 
 @receiver(post_save, sender=User)
@@ -553,57 +743,6 @@ def admin_action_notification(sender, instance, created, **kwargs):
                 recipient_list=admin_emails
             )
 
-# BULK NOTIFICATION HELPERS
-
-def send_property_alerts():
-    """
-    Function to send property alerts to users (can be called by Celery task)
-    """
-    from .models import PropertyAlert
-    
-    active_alerts = PropertyAlert.objects.filter(is_active=True)
-    
-    for alert in active_alerts:
-        # Get matching properties based on search parameters
-        # This would need to be implemented based on your search logic
-        matching_properties = get_matching_properties(alert.search_parameters)
-        
-        if matching_properties.exists():
-            context = {
-                'user': alert.user,
-                'properties': matching_properties[:5],  # Limit to 5 properties
-                'alert': alert,
-                'site_name': settings.SITE_NAME,
-                'timestamp': timezone.now()
-            }
-            
-            send_notification_email(
-                subject=f"New Properties Match Your Alert",
-                template_name='property_alert',
-                context=context,
-                recipient_list=[alert.user.email]
-            )
-
-def get_matching_properties(search_parameters):
-    """
-    Helper function to get properties matching alert parameters
-    This should be implemented based on your search logic
-    """
-    # Placeholder implementation
-    from .models import Property
-    queryset = Property.objects.filter(is_published=True, status='available')
-    
-    # Add your filtering logic based on search_parameters
-    # Example:
-    if 'price_min' in search_parameters:
-        queryset = queryset.filter(price__gte=search_parameters['price_min'])
-    if 'price_max' in search_parameters:
-        queryset = queryset.filter(price__lte=search_parameters['price_max'])
-    if 'location' in search_parameters:
-        queryset = queryset.filter(location__icontains=search_parameters['location'])
-    
-    return queryset
-
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
@@ -619,98 +758,19 @@ def save_user_profile(sender, instance, **kwargs):
 @receiver(post_save, sender=PropertyImage)
 def add_watermark_to_image(sender, instance, created, **kwargs):
     """
-    Signal to add watermark to property images after they're saved.
-    Uses Django's file handling to properly save the watermarked image.
+    Queue watermarking and derivative sizes for new property images. The
+    work runs in Celery after the upload commits, so requests never wait on it.
     """
-    # Only process newly created images that haven't been watermarked yet
     if not created or not instance.image:
         return
-    
-    # Prevent recursive signal calls
-    if hasattr(instance, '_watermarking'):
-        return
-    
-    # Check if already watermarked (if field exists)
-    if hasattr(instance, 'is_watermarked') and instance.is_watermarked:
-        print(f"DEBUG: Image {instance.id} already watermarked, skipping")
-        logger.info(f"Image {instance.id} already watermarked, skipping")
-        return
-    
-    try:
-        # Skip watermarking for cloud storage (DigitalOcean Spaces, S3, etc.)
-        # Cloud storage doesn't support local file paths
-        from django.core.files.storage import default_storage
-        if not hasattr(default_storage, 'path') or 'S3' in default_storage.__class__.__name__ or 'Boto' in default_storage.__class__.__name__:
-            logger.info(f"Skipping watermark for image {instance.id} - using cloud storage")
-            return
-
-        # Try to get the path - this will fail for cloud storage
-        try:
-            image_path = instance.image.path
-        except NotImplementedError:
-            logger.info(f"Skipping watermark for image {instance.id} - cloud storage detected")
-            return
-
-        print(f"DEBUG: Signal triggered for PropertyImage ID: {instance.id}")
-        print(f"DEBUG: Image path: {image_path}")
-
-        # Check if image exists
-        if not os.path.exists(image_path):
-            print(f"ERROR: Image file does not exist at {image_path}")
-            logger.error(f"Image file not found: {image_path}")
-            return
-        
-        watermark_path = os.path.join(settings.MEDIA_ROOT, 'logo', 'logo2.webp')
-        print(f"DEBUG: Watermark path: {watermark_path}")
-        
-        # Check if watermark exists
-        if not os.path.exists(watermark_path):
-            logger.error(f"Watermark not found at: {watermark_path}")
-            print(f"ERROR: Watermark not found at {watermark_path}")
-            return
-        
-        # Get the original filename
-        original_name = instance.image.name
-        
-        # Apply watermark and get bytes
-        watermarked_bytes = apply_watermark(
-            image_path=image_path,
-            watermark_path=watermark_path,
-            position='center',
-            size_ratio=0.20,
-            opacity=0.55
-        )
-        
-        if watermarked_bytes:
-            # Set flag to prevent recursive signal
-            instance._watermarking = True
-            
-            # Delete the old file
-            old_file = instance.image
-            old_file.delete(save=False)
-            
-            # Save the watermarked image through Django's file system
-            instance.image.save(
-                original_name,
-                ContentFile(watermarked_bytes),
-                save=False
-            )
-            
-            # Mark as watermarked if field exists
-            if hasattr(instance, 'is_watermarked'):
-                instance.is_watermarked = True
-                instance.save(update_fields=['image', 'is_watermarked'])
-            else:
-                instance.save(update_fields=['image'])
-            
-            print(f"SUCCESS: Watermark applied to PropertyImage ID: {instance.id}")
-            logger.info(f"Watermark applied successfully to image {instance.id}")
-        else:
-            print(f"FAILED: Could not apply watermark to PropertyImage ID: {instance.id}")
-            logger.error(f"Watermarking failed for image {instance.id}")
-            
-    except Exception as e:
-        logger.exception(f"Error in watermark signal for image {instance.id}: {str(e)}")
-        print(f"ERROR in signal: {e}")
-        import traceback
-        traceback.print_exc()
\ No newline at end of file
+
+    from .tasks import process_property_image
+    image_id = instance.pk
+    transaction.on_commit(lambda: process_property_image.delay(image_id))
+
+
+@receiver(post_delete, sender=PropertyImage)
+def delete_image_derivatives(sender, instance, **kwargs):
+    derivatives = instance.derivatives
+    if derivatives:
+        transaction.on_commit(lambda: delete_derivatives(derivatives))
\ No newline at end of file
@@ -1,38 +1,18 @@
 from celery import shared_task
 from django.core.mail import send_mail
-from .models import Property, PropertyAlert, PropertyImage
+from .models import PropertyImage
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
-from django.db.models import Count
+from .aggregation import (
+    aggregate_interactions, backfill_progress, plan_backfill,
+    refresh_dashboard_snapshot, rollup_day,
+)
+from .live_stats import flush_live_stats
 import logging
 
 logger = logging.getLogger(__name__)
 
-@shared_task
-def check_property_alerts():
-    from django.utils import timezone
-    from datetime import timedelta
-    
-    # Get all active alerts
-    alerts = PropertyAlert.objects.filter(is_active=True)
-    
-    for alert in alerts:
-        # Find matching properties from last 24 hours
-        new_properties = Property.objects.filter(
-            created_at__gte=timezone.now() - timedelta(hours=24),
-            **alert.search_parameters
-        )
-        
-        if new_properties.exists():
-            send_mail(
-                'New Properties Matching Your Search',
-                f'Found {new_properties.count()} new properties. Visit our site to view them!',
-                'sales@hsp.co.zw',
-                [alert.user.email],
-                fail_silently=False,
-            )
-
 @shared_task
 def send_email_notification(subject, message, recipient_list, from_email=None):
     """
@@ -56,15 +36,57 @@ def send_email_notification(subject, message, recipient_list, from_email=None):
         return False
 
 @shared_task
-def check_property_alerts():
+def process_email_outbox(batch_size=None):
+    """
+    Deliver pending outbox emails in batches until the due queue is drained.
+    Triggered on commit by queue_email and swept periodically by beat.
+    """
+    from .notifications import deliver_pending
+
+    batch_size = batch_size or getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+    totals = {'sent': 0, 'retried': 0, 'failed': 0}
+    while True:
+        result = deliver_pending(batch_size)
+        for key in totals:
+            totals[key] += result[key]
+        if result['claimed'] < batch_size:
+            break
+    return totals
+
+@shared_task
+def cleanup_email_outbox(days=30):
     """
-    Celery task to check and send property alerts
-    This should be scheduled to run daily or weekly
+    Delete delivered outbox emails older than the given number of days
     """
-    from .signals import send_property_alerts
+    from .models import EmailOutbox
     try:
-        send_property_alerts()
-        logger.info("Property alerts check completed successfully")
+        cutoff = timezone.now() - timedelta(days=days)
+        count, _ = EmailOutbox.objects.filter(status='sent', sent_at__lt=cutoff).delete()
+        logger.info(f"Cleaned up {count} sent outbox emails")
+    except Exception as e:
+        logger.error(f"Error cleaning up email outbox: {str(e)}")
+
+@shared_task
+def match_property_alerts(property_id):
+    """
+    Match a new or changed listing against alerts and saved searches.
+    Queued on commit by core.signals.
+    """
+    from .alerts import match_property
+    try:
+        return match_property(property_id)
+    except Exception as e:
+        logger.error(f"Error matching alerts for property {property_id}: {str(e)}")
+
+@shared_task
+def check_property_alerts(frequency='daily'):
+    """
+    Email daily or weekly alerts the listings they matched since their last
+    digest. Matching itself happens as listings are saved.
+    """
+    from .digests import send_alert_digests
+    try:
+        return send_alert_digests(frequency)
     except Exception as e:
         logger.error(f"Error checking property alerts: {str(e)}")
 
@@ -87,63 +109,11 @@ def send_weekly_summary():
     """
     Send weekly summary to admins
     """
-    from .models import Property, Agent, User, Inquiry
-    from django.core.mail import EmailMultiAlternatives
-    from django.template.loader import render_to_string
-    
+    from .digests import send_weekly_summary as deliver_weekly_summary
     try:
-        # Get statistics for the past week
-        one_week_ago = timezone.now() - timedelta(days=7)
-        
-        stats = {
-            'new_properties': Property.objects.filter(created_at__gte=one_week_ago).count(),
-            'new_users': User.objects.filter(date_joined__gte=one_week_ago).count(),
-            'new_agents': Agent.objects.filter(created_at__gte=one_week_ago).count(),
-            'new_inquiries': Inquiry.objects.filter(created_at__gte=one_week_ago).count(),
-            'total_properties': Property.objects.count(),
-            'total_users': User.objects.count(),
-            'total_agents': Agent.objects.count(),
-        }
-        
-        # Get admin emails
-        admin_emails = []
-        for name, email in settings.ADMINS:
-            admin_emails.append(email)
-        
-        if admin_emails:
-            context = {
-                'stats': stats,
-                'site_name': settings.SITE_NAME,
-                'week_start': one_week_ago.strftime('%B %d, %Y'),
-                'week_end': timezone.now().strftime('%B %d, %Y')
-            }
-            
-            html_content = render_to_string('emails/weekly_summary.html', context)
-            text_content = f"""
-            Weekly Summary for {settings.SITE_NAME}
-            
-            Statistics for {context['week_start']} - {context['week_end']}:
-            - New Properties: {stats['new_properties']}
-            - New Users: {stats['new_users']}
-            - New Agents: {stats['new_agents']}
-            - New Inquiries: {stats['new_inquiries']}
-            
-            Total Counts:
-            - Total Properties: {stats['total_properties']}
-            - Total Users: {stats['total_users']}
-            - Total Agents: {stats['total_agents']}
-            """
-            
-            msg = EmailMultiAlternatives(
-                subject=f"Weekly Summary - {settings.SITE_NAME}",
-                body=text_content,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=admin_emails
-            )
-            msg.attach_alternative(html_content, "text/html")
-            msg.send()
-            
-            logger.info("Weekly summary sent successfully")
+        stats = deliver_weekly_summary()
+        logger.info(f"Weekly summary sent: {stats}")
+        return stats
     except Exception as e:
         logger.error(f"Error sending weekly summary: {str(e)}")
 
@@ -153,145 +123,213 @@ def aggregate_daily_stats():
     Aggregate PropertyInteraction records into PropertyStat for efficient dashboard queries.
     Runs daily at 1 AM to aggregate the previous day's interactions.
     """
-    from .models import PropertyInteraction, PropertyStat
     from datetime import date
 
     try:
+        # Land pending live counters first so the recount replaces them
+        flush_live_stats()
+
         # Aggregate yesterday's interactions
         yesterday = date.today() - timedelta(days=1)
+        result = aggregate_interactions(yesterday, yesterday)
 
-        # Get all interactions from yesterday grouped by property and type
-        interactions = PropertyInteraction.objects.filter(
-            timestamp__date=yesterday
-        ).values('property_id', 'interaction_type').annotate(
-            count=Count('id')
-        )
-
-        # Group by property
-        property_stats = {}
-        for interaction in interactions:
-            prop_id = interaction['property_id']
-            if prop_id not in property_stats:
-                property_stats[prop_id] = {
-                    'views': 0,
-                    'inquiries': 0,
-                    'favorites': 0,
-                    'shares': 0
-                }
-
-            interaction_type = interaction['interaction_type']
-            count = interaction['count']
-
-            if interaction_type == 'view':
-                property_stats[prop_id]['views'] = count
-            elif interaction_type == 'inquiry':
-                property_stats[prop_id]['inquiries'] = count
-            elif interaction_type == 'favorite':
-                property_stats[prop_id]['favorites'] = count
-            elif interaction_type == 'share':
-                property_stats[prop_id]['shares'] = count
-
-        # Create or update PropertyStat records
-        created_count = 0
-        updated_count = 0
-
-        for prop_id, stats in property_stats.items():
-            stat, created = PropertyStat.objects.update_or_create(
-                property_id=prop_id,
-                date=yesterday,
-                defaults=stats
-            )
-            if created:
-                created_count += 1
-            else:
-                updated_count += 1
+        # Fold the day into the dashboard rollup
+        rollup_day(yesterday)
+        refresh_dashboard_snapshot()
 
         logger.info(
-            f"Daily stats aggregation completed: {created_count} created, "
-            f"{updated_count} updated for {yesterday}"
+            f"Daily stats aggregation completed: {result['rows']} rows for {yesterday} "
+            f"({result['rows_per_second']} rows/s)"
         )
-        return {
-            'date': str(yesterday),
-            'created': created_count,
-            'updated': updated_count
-        }
+        return result
 
     except Exception as e:
         logger.error(f"Error aggregating daily stats: {str(e)}")
         raise
 
 @shared_task
-def backfill_property_stats(days=30):
+def flush_live_property_stats():
+    """Move today's live Redis counters into PropertyStat"""
+    try:
+        flushed = flush_live_stats()
+        if flushed:
+            logger.info(f"Flushed live stats for {flushed} property days")
+        return flushed
+    except Exception as e:
+        logger.error(f"Error flushing live stats: {str(e)}")
+        raise
+
+@shared_task
+def backfill_property_stats(days=30, chunk_days=None, run_id=None):
     """
-    One-time task to backfill PropertyStat from historical PropertyInteraction data.
+    Backfill PropertyStat from historical PropertyInteraction data. The range
+    is split into checkpointed chunks that run in parallel as a chord; pass
+    run_id to resume a run, skipping chunks that are already done.
     Run manually: celery call core.tasks.backfill_property_stats --args='[30]'
     """
-    from .models import PropertyInteraction, PropertyStat
+    from celery import chord
     from datetime import date
+    from .models import BackfillRun
 
     try:
-        end_date = date.today() - timedelta(days=1)
-        start_date = end_date - timedelta(days=days)
-
-        total_created = 0
-        total_updated = 0
-
-        # Process each day
-        current_date = start_date
-        while current_date <= end_date:
-            interactions = PropertyInteraction.objects.filter(
-                timestamp__date=current_date
-            ).values('property_id', 'interaction_type').annotate(
-                count=Count('id')
+        if run_id:
+            run = BackfillRun.objects.get(pk=run_id)
+        else:
+            end_date = date.today() - timedelta(days=1)
+            start_date = end_date - timedelta(days=days)
+            run = plan_backfill(start_date, end_date, chunk_days)
+
+        pending = list(run.chunks.exclude(status='done').values_list('id', flat=True))
+        run.chunks.filter(id__in=pending).update(status='pending', last_error='')
+        BackfillRun.objects.filter(pk=run.pk).update(status='running', finished_at=None)
+
+        logger.info(f"Backfill run {run.id}: dispatching {len(pending)} chunks")
+        if pending:
+            chord(backfill_stats_chunk.s(chunk_id) for chunk_id in pending)(
+                finish_backfill_run.s(run.id)
             )
+        else:
+            finish_backfill_run.delay([], run.id)
+        return {'run_id': run.id, 'chunks': len(pending)}
 
-            property_stats = {}
-            for interaction in interactions:
-                prop_id = interaction['property_id']
-                if prop_id not in property_stats:
-                    property_stats[prop_id] = {
-                        'views': 0,
-                        'inquiries': 0,
-                        'favorites': 0,
-                        'shares': 0
-                    }
-
-                interaction_type = interaction['interaction_type']
-                count = interaction['count']
-
-                if interaction_type == 'view':
-                    property_stats[prop_id]['views'] = count
-                elif interaction_type == 'inquiry':
-                    property_stats[prop_id]['inquiries'] = count
-                elif interaction_type == 'favorite':
-                    property_stats[prop_id]['favorites'] = count
-                elif interaction_type == 'share':
-                    property_stats[prop_id]['shares'] = count
-
-            for prop_id, stats in property_stats.items():
-                stat, created = PropertyStat.objects.update_or_create(
-                    property_id=prop_id,
-                    date=current_date,
-                    defaults=stats
-                )
-                if created:
-                    total_created += 1
-                else:
-                    total_updated += 1
-
-            current_date += timedelta(days=1)
+    except Exception as e:
+        logger.error(f"Error backfilling property stats: {str(e)}")
+        raise
 
-        logger.info(
-            f"Backfill completed: {total_created} created, {total_updated} updated "
-            f"from {start_date} to {end_date}"
+
+@shared_task(bind=True, max_retries=3)
+def backfill_stats_chunk(self, chunk_id):
+    """Aggregate one checkpoint chunk of a backfill run"""
+    from django.db.models import F
+    from .models import BackfillChunk
+
+    chunk = BackfillChunk.objects.get(pk=chunk_id)
+    if chunk.status == 'done':
+        return {'chunk': chunk_id, 'status': 'done', 'rows': chunk.rows}
+
+    BackfillChunk.objects.filter(pk=chunk_id).update(
+        status='running', attempts=F('attempts') + 1
+    )
+    try:
+        result = aggregate_interactions(chunk.start_date, chunk.end_date)
+        day = chunk.start_date
+        while day <= chunk.end_date:
+            rollup_day(day)
+            day += timedelta(days=1)
+
+        BackfillChunk.objects.filter(pk=chunk_id).update(
+            status='done', rows=result['rows'], seconds=result['seconds'],
+            last_error='', finished_at=timezone.now(),
         )
-        return {
-            'start_date': str(start_date),
-            'end_date': str(end_date),
-            'created': total_created,
-            'updated': total_updated
-        }
+        return {'chunk': chunk_id, 'status': 'done', 'rows': result['rows']}
 
     except Exception as e:
-        logger.error(f"Error backfilling property stats: {str(e)}")
-        raise
\ No newline at end of file
+        logger.error(f"Error backfilling chunk {chunk_id}: {str(e)}")
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=30 * 2 ** self.request.retries)
+        # Record the failure and let the chord finish; a resume picks it up
+        BackfillChunk.objects.filter(pk=chunk_id).update(
+            status='failed', last_error=str(e)[:2000]
+        )
+        return {'chunk': chunk_id, 'status': 'failed', 'rows': 0}
+
+
+@shared_task
+def finish_backfill_run(results, run_id):
+    """Chord callback: close the run and refresh the dashboard rollup"""
+    from .models import BackfillRun
+
+    run = BackfillRun.objects.get(pk=run_id)
+    failed = run.chunks.exclude(status='done').count()
+    run.status = 'failed' if failed else 'completed'
+    run.finished_at = timezone.now()
+    run.save(update_fields=['status', 'finished_at'])
+    refresh_dashboard_snapshot()
+
+    progress = backfill_progress(run)
+    logger.info(
+        f"Backfill run {run.id} {run.status}: {progress['rows']} rows, "
+        f"{progress['days_done']}/{progress['days_total']} days "
+        f"({progress['rows_per_second']} rows/s)"
+    )
+    return {'run_id': run.id, 'status': run.status, 'rows': progress['rows']}
+
+
+@shared_task
+def maintain_interaction_partitions():
+    """
+    Create next months' PropertyInteraction partitions and roll off the
+    expired ones. Same as manage.py interaction_partitions.
+    """
+    from .partitions import ensure_partitions, roll_off
+
+    try:
+        created = ensure_partitions()
+        removed = roll_off()
+        logger.info(f"Interaction partitions: created {created}, removed {removed}")
+        return {'created': created, 'removed': removed}
+    except Exception as e:
+        logger.error(f"Error maintaining interaction partitions: {str(e)}")
+        raise
+
+@shared_task(bind=True, max_retries=3)
+def process_property_image(self, image_id):
+    """Watermark an uploaded property image and write its derivative sizes"""
+    from .images import process_image
+
+    try:
+        return process_image(image_id)
+    except Exception as e:
+        logger.error(f"Error processing image {image_id}: {str(e)}")
+        raise self.retry(exc=e, countdown=60 * 2 ** self.request.retries)
+
+@shared_task
+def refresh_dashboard_rollup():
+    """Refresh today's dashboard row and the platform counts snapshot"""
+    try:
+        refresh_dashboard_snapshot()
+        logger.info("Dashboard rollup refreshed")
+    except Exception as e:
+        logger.error(f"Error refreshing dashboard rollup: {str(e)}")
+        raise
+
+
+@shared_task
+def rebuild_property_facets():
+    """Recompute filter facet counts and ranges to correct any drift"""
+    from .facets import rebuild_facets
+    try:
+        rows = rebuild_facets()
+        logger.info(f"Rebuilt property facets: {rows} facet values")
+        return rows
+    except Exception as e:
+        logger.error(f"Error rebuilding property facets: {str(e)}")
+        raise
+
+@shared_task
+def build_property_similarities():
+    """
+    Rebuild the item-item PropertySimilarity table from recent interactions.
+    Runs nightly after the daily stats aggregation.
+    """
+    from .recommendations import build_similarities
+    try:
+        result = build_similarities()
+        logger.info(f"Built property similarities: {result}")
+        return result
+    except Exception as e:
+        logger.error(f"Error building property similarities: {str(e)}")
+        raise
+
+
+@shared_task
+def refresh_property_popularity():
+    """Recompute the popularity and trending scores from PropertyStat"""
+    from .popularity import refresh_popularity
+    try:
+        result = refresh_popularity()
+        logger.info(f"Refreshed property popularity: {result}")
+        return result
+    except Exception as e:
+        logger.error(f"Error refreshing property popularity: {str(e)}")
+        raise
@@ -1,3 +1,982 @@
-from django.test import TestCase
+import os
+import random
+import smtplib
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import boto3
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends import locmem
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+try:
+    from moto import mock_aws
+except ImportError:  # requirements-dev.txt
+    mock_aws = None
+
+try:
+    import fakeredis
+except ImportError:  # requirements-dev.txt
+    fakeredis = None
+
+from .alerts import AlertIndex, build_index, match_property
+from .digests import DigestBatch, send_alert_digests
+from .feature_index import FeatureIndex
+from .interactions import InteractionBuffer, record_interaction
+from .live_stats import flush_live_stats
+from .media_bucket import MB, etag_matches, transfer_config
+from .media_metadata import update_objects
+from .media_sync import Manifest, plan_sync, sync_media
+from .models import (
+    Agent, AlertMatch, DashboardRollup, EmailOutbox, Notification, Property, PropertyAgent,
+    PropertyAlert, PropertyFeature, PropertyImage, PropertyInteraction, PropertyPopularity,
+    PropertySimilarity, PropertyStat, SavedSearch,
+)
+from .partitions import (
+    add_months, ensure_partitions, is_partitioned, is_rolled_up, list_partitions, month_start,
+    partition_name, roll_off,
+)
+from .popularity import DEFAULT_WEIGHTS, refresh_popularity
+from .recommendations import similar_property_ids, top_neighbours
+from .serializers import PropertyImageSerializer, PropertyListSerializer
+from .views import AdminPropertyViewSet
+from . import interactions, signals
+
+
+class QueryCounter:
+    """
+    Counts queries through an execute wrapper. CaptureQueriesContext reads
+    connection.queries, which DatabaseOptimizationMiddleware resets.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class PropertyListQueryCountTests(TestCase):
+    """Listing cards are serialized in a constant number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username='owner')
+        agents = Agent.objects.bulk_create([
+            Agent(first_name='Tendai', surname='Moyo', cell_number='1', email='t@example.com', position='agent'),
+            Agent(first_name='Rudo', middle_name='N', surname='Dube', cell_number='2', email='r@example.com',
+                  position='agent'),
+        ])
+        # Bulk inserts skip the save signals, which are not under test here
+        properties = Property.objects.bulk_create([
+            Property(title=f'Listing {i}', price=Decimal(100000 + i), location='Harare',
+                     property_type='house', user=owner)
+            for i in range(30)
+        ])
+        PropertyImage.objects.bulk_create([
+            PropertyImage(property=p, image=f'property_images/{p.pk}-{order}.jpg', order=order)
+            for p in properties[::2] for order in (1, 0)
+        ])
+        PropertyAgent.objects.bulk_create(
+            [PropertyAgent(property=p, agent=agents[0]) for p in properties[::3]] +
+            [PropertyAgent(property=p, agent=agents[1], is_primary=True) for p in properties[::5]]
+        )
+
+    def serialize(self, size):
+        queryset = Property.objects.with_list_annotations().order_by('id')[:size]
+        return PropertyListSerializer(queryset, many=True).data
+
+    def test_annotated_queryset_is_one_query_at_any_page_size(self):
+        for size in (1, 10, 30):
+            with self.assertNumQueries(1):
+                data = self.serialize(size)
+            self.assertEqual(len(data), size)
+
+    def test_annotations_match_per_row_lookups(self):
+        annotated = self.serialize(30)
+        plain = PropertyListSerializer(Property.objects.order_by('id'), many=True).data
+        for fast, slow in zip(annotated, plain):
+            self.assertEqual(fast['primary_image'], slow['primary_image'])
+            self.assertEqual(fast['agent_name'], slow['agent_name'])
+        self.assertIn('Rudo N Dube', [row['agent_name'] for row in annotated])
+        self.assertIn('owner', [row['agent_name'] for row in annotated])
+
+    def test_card_list_endpoint_queries_do_not_grow_with_page_size(self):
+        # The first request also fills the cached total
+        self.client.get('/properties/', {'view': 'card'})
+        counts = []
+        for size in (5, 25):
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                response = self.client.get('/properties/', {'view': 'card', 'page_size': size})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), size)
+            counts.append(counter.count)
+        self.assertEqual(counts[0], counts[1])
+
+
+@skipUnless(mock_aws, 'moto is not installed')
+class MediaBucketTestCase(SimpleTestCase):
+    """A moto bucket and a temporary media directory"""
+
+    bucket = 'test-media'
+
+    def setUp(self):
+        mocked = mock_aws()
+        mocked.start()
+        self.addCleanup(mocked.stop)
+        self.client = boto3.client('s3', region_name='us-east-1')
+        self.client.create_bucket(Bucket=self.bucket)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+
+    def write(self, name, data):
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return path
+
+    def remote(self, prefix='media/'):
+        listing = self.client.list_objects_v2(Bucket=self.bucket, Prefix=prefix)
+        return {
+            obj['Key']: (obj['Size'], obj['ETag'].strip('"'))
+            for obj in listing.get('Contents', [])
+        }
+
+
+# Parts of 5MB, the smallest S3 allows, keep the multipart files small
+@override_settings(MEDIA_MULTIPART_THRESHOLD=5 * MB, MEDIA_MULTIPART_CHUNKSIZE=5 * MB)
+class MediaSyncTests(MediaBucketTestCase):
+
+    def upload(self, path, key):
+        self.client.upload_file(str(path), self.bucket, key, Config=transfer_config())
+        return self.remote()[key][1]
+
+    def test_etag_matches_single_part_file(self):
+        path = self.write('photo.jpg', b'jpeg' * 1000)
+        etag = self.upload(path, 'media/photo.jpg')
+        self.assertNotIn('-', etag)
+        self.assertIs(etag_matches(path, etag, transfer_config()), True)
+        path.write_bytes(b'JPEG' * 1000)
+        self.assertIs(etag_matches(path, etag, transfer_config()), False)
+
+    def test_etag_matches_multipart_file(self):
+        path = self.write('tour.mp4', os.urandom(11 * MB))
+        etag = self.upload(path, 'media/tour.mp4')
+        self.assertTrue(etag.endswith('-3'))
+        self.assertIs(etag_matches(path, etag, transfer_config()), True)
+
+        with open(path, 'r+b') as handle:
+            handle.seek(7 * MB)
+            handle.write(b'changed')
+        self.assertIs(etag_matches(path, etag, transfer_config()), False)
+
+    def test_multipart_etag_with_other_part_size_is_unverifiable(self):
+        path = self.write('tour.mp4', os.urandom(11 * MB))
+        etag = self.upload(path, 'media/tour.mp4')
+        with override_settings(MEDIA_MULTIPART_CHUNKSIZE=6 * MB):
+            config = transfer_config()
+        self.assertIsNone(etag_matches(path, etag, config))
+
+        manifest = Manifest(self.root / 'manifest.jsonl')
+        uploads, in_sync, unverifiable = plan_sync(self.root, self.remote(), manifest, config)
+        self.assertEqual([key for path, key, size, mtime in uploads], ['media/tour.mp4'])
+        self.assertEqual(unverifiable, ['media/tour.mp4'])
+        self.assertEqual(in_sync, 0)
+
+    def test_plan_sync_uses_manifest_and_etags(self):
+        same = self.write('same.jpg', b'a' * 100)
+        self.write('changed.jpg', b'b' * 100)
+        self.write('missing.jpg', b'c' * 100)
+        for name in ('same.jpg', 'changed.jpg'):
+            self.upload(same, f'media/{name}')
+        manifest = Manifest(self.root / 'manifest.jsonl')
+
+        uploads, in_sync, unverifiable = plan_sync(self.root, self.remote(), manifest, transfer_config())
+        self.assertEqual(
+            [key for path, key, size, mtime in uploads], ['media/changed.jpg', 'media/missing.jpg']
+        )
+        self.assertEqual((in_sync, unverifiable), (1, []))
+        # The ETag check was recorded, so the next plan does not hash the file
+        self.assertTrue(manifest.matches('media/same.jpg', 100, same.stat().st_mtime_ns))
+        with mock.patch('core.media_sync.etag_matches') as checked:
+            plan_sync(self.root, self.remote(), manifest, transfer_config())
+        self.assertEqual(
+            sorted(call.args[0].name for call in checked.call_args_list), ['changed.jpg']
+        )
+        manifest.close()
+
+    def test_rerun_resumes_after_partial_failure(self):
+        for index in range(5):
+            self.write(f'property_images/{index}.jpg', bytes([index]) * 100)
+        manifest_path = self.root.parent / f'{self.root.name}.manifest.jsonl'
+        self.addCleanup(manifest_path.unlink, missing_ok=True)
+        upload_file = self.client.upload_file
+
+        def flaky_upload(path, bucket, key, **kwargs):
+            if key == 'media/property_images/3.jpg':
+                raise ConnectionError('connection reset')
+            return upload_file(path, bucket, key, **kwargs)
+
+        with mock.patch.object(self.client, 'upload_file', side_effect=flaky_upload):
+            first = sync_media(self.root, workers=2, manifest_path=manifest_path,
+                               client=self.client, bucket=self.bucket)
+        self.assertEqual(first['uploaded'], 4)
+        self.assertEqual([error['key'] for error in first['errors']], ['media/property_images/3.jpg'])
+
+        with mock.patch('core.media_sync.etag_matches') as checked:
+            second = sync_media(self.root, workers=2, manifest_path=manifest_path,
+                                client=self.client, bucket=self.bucket)
+        checked.assert_not_called()
+        self.assertEqual((second['in_sync'], second['uploaded'], second['errors']), (4, 1, []))
+        self.assertEqual(len(self.remote()), 5)
+
+
+class MediaMetadataTests(MediaBucketTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.put('media/property_images/a.jpg', ContentType='binary/octet-stream')
+        self.put('media/property_images/b.webp', ContentType='binary/octet-stream',
+                 Metadata={'stale': 'yes'})
+        self.put('media/agents/c.png')
+        # Share the prefix text but sit outside media/
+        self.put('media-old/d.jpg')
+        self.put('mediafile.jpg')
+
+    def put(self, key, **kwargs):
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=b'data', ACL='private', **kwargs)
+
+    def update(self, **kwargs):
+        return update_objects(client=self.client, bucket=self.bucket, workers=2, rate=0, **kwargs)
+
+    def is_public(self, key):
+        grants = self.client.get_object_acl(Bucket=self.bucket, Key=key)['Grants']
+        return any(
+            grant['Grantee'].get('URI', '').endswith('/AllUsers') and grant['Permission'] == 'READ'
+            for grant in grants
+        )
+
+    def head(self, key):
+        return self.client.head_object(Bucket=self.bucket, Key=key)
+
+    def test_dry_run_counts_without_changing_objects(self):
+        report = self.update(dry_run=True)
+        self.assertEqual((report['listed'], report['updated'], report['failed']), (3, 0, 0))
+        self.assertFalse(self.is_public('media/property_images/a.jpg'))
+        self.assertEqual(self.head('media/property_images/a.jpg')['ContentType'], 'binary/octet-stream')
+
+    def test_replace_sets_acl_and_exactly_the_sent_metadata(self):
+        report = self.update(acl='public-read', cache_control='max-age=86400')
+        self.assertEqual((report['listed'], report['updated'], report['failed']), (3, 3, 0))
+
+        head = self.head('media/property_images/b.webp')
+        self.assertEqual(head['ContentType'], 'image/webp')
+        self.assertEqual(head['CacheControl'], 'max-age=86400')
+        self.assertEqual(head['Metadata'], {})
+        self.assertEqual(self.head('media/property_images/a.jpg')['ContentType'], 'image/jpeg')
+        self.assertEqual(self.head('media/agents/c.png')['ContentType'], 'image/png')
+        self.assertTrue(self.is_public('media/agents/c.png'))
+
+    def test_keys_without_a_known_extension_keep_their_content_type(self):
+        self.put('media/property_images/scan', ContentType='image/jpeg')
+        self.put('media/documents/floorplan.unknownext', ContentType='application/pdf')
+        report = self.update(acl='public-read')
+        self.assertEqual((report['updated'], report['failed']), (5, 0))
+
+        self.assertEqual(self.head('media/property_images/scan')['ContentType'], 'image/jpeg')
+        self.assertEqual(self.head('media/documents/floorplan.unknownext')['ContentType'], 'application/pdf')
+        self.assertTrue(self.is_public('media/property_images/scan'))
+
+    def test_content_type_override_applies_to_every_key(self):
+        self.put('media/property_images/scan', ContentType='image/jpeg')
+        self.update(prefix='media/property_images/', content_type_override='image/webp')
+        self.assertEqual(self.head('media/property_images/scan')['ContentType'], 'image/webp')
+        self.assertEqual(self.head('media/property_images/a.jpg')['ContentType'], 'image/webp')
+
+    def test_acl_only_leaves_metadata_alone(self):
+        report = self.update(acl='public-read', cache_control='max-age=86400', acl_only=True)
+        self.assertEqual(report['updated'], 3)
+
+        head = self.head('media/property_images/b.webp')
+        self.assertTrue(self.is_public('media/property_images/b.webp'))
+        self.assertEqual(head['ContentType'], 'binary/octet-stream')
+        self.assertEqual(head['Metadata'], {'stale': 'yes'})
+        self.assertNotIn('CacheControl', head)
+
+    def test_keys_outside_the_prefix_are_untouched(self):
+        self.update(acl='public-read')
+        self.assertFalse(self.is_public('media-old/d.jpg'))
+        self.assertFalse(self.is_public('mediafile.jpg'))
+
+        report = self.update(prefix='media/agents/', acl='public-read', dry_run=True)
+        self.assertEqual(report['listed'], 1)
+
+
+REFUSED = 'refused@example.com'
+
+
+class RefusingEmailBackend(locmem.EmailBackend):
+    """
+    Refuses mail to REFUSED the way the SMTP backend does: the messages
+    ahead of it in the call are delivered, then it raises.
+    """
+
+    def send_messages(self, messages):
+        sent = 0
+        for message in messages:
+            if REFUSED in message.to:
+                raise smtplib.SMTPRecipientsRefused({REFUSED: (550, b'No such user')})
+            sent += super().send_messages([message])
+        return sent
+
+
+@override_settings(EMAIL_BACKEND='core.tests.RefusingEmailBackend')
+class DigestBatchTests(TestCase):
+
+    def batch(self, addresses, chunk_size=2):
+        batch = DigestBatch(chunk_size)
+        for address in addresses:
+            batch.add('weekly_summary', 'Summary', {'stats': {}}, [address], key=address)
+        return batch
+
+    def delivered(self):
+        return [address for message in mail.outbox for address in message.to]
+
+    def test_messages_go_out_in_chunks(self):
+        addresses = [f'user{i}@example.com' for i in range(5)]
+        stats = self.batch(addresses).send()
+        self.assertEqual((stats['messages'], stats['sent'], stats['failed'], stats['chunks']), (5, 5, 0, 3))
+        self.assertEqual(self.delivered(), addresses)
+
+    def test_refused_message_fails_alone_and_nothing_is_sent_twice(self):
+        addresses = ['a@example.com', 'b@example.com', REFUSED, 'c@example.com', 'd@example.com']
+        batch = self.batch(addresses, chunk_size=5)
+        stats = batch.send()
+        self.assertEqual((stats['sent'], stats['failed']), (4, 1))
+        self.assertEqual(batch.failed_keys, [REFUSED])
+        self.assertEqual(self.delivered(), [a for a in addresses if a != REFUSED])
+
+    def test_unreachable_server_fails_every_message(self):
+        batch = self.batch(['a@example.com', 'b@example.com'])
+        with mock.patch.object(RefusingEmailBackend, 'open', side_effect=ConnectionRefusedError):
+            stats = batch.send()
+        self.assertEqual((stats['sent'], stats['failed']), (0, 2))
+        self.assertEqual(batch.failed_keys, ['a@example.com', 'b@example.com'])
+        self.assertEqual(mail.outbox, [])
+
+    def test_matches_stay_pending_when_their_digest_fails(self):
+        listing = Property.objects.bulk_create([
+            Property(title='Villa', price=Decimal(250000), location='Harare', property_type='villa')
+        ])[0]
+        alerts = {}
+        for email in ('buyer@example.com', REFUSED):
+            user = User.objects.create(username=email, email=email)
+            alerts[email] = PropertyAlert.objects.create(user=user, search_parameters={}, frequency='daily')
+            AlertMatch.objects.create(alert=alerts[email], property=listing)
+
+        stats = send_alert_digests('daily')
+        self.assertEqual((stats['sent'], stats['failed']), (1, 1))
+        self.assertEqual(self.delivered(), ['buyer@example.com'])
+        self.assertIsNotNone(AlertMatch.objects.get(alert=alerts['buyer@example.com']).notified_at)
+        self.assertIsNone(AlertMatch.objects.get(alert=alerts[REFUSED]).notified_at)
+
+        # The next run retries only the pending match
+        User.objects.filter(email=REFUSED).update(email='fixed@example.com')
+        mail.outbox = []
+        send_alert_digests('daily')
+        self.assertEqual(self.delivered(), ['fixed@example.com'])
+        self.assertFalse(AlertMatch.objects.filter(notified_at__isnull=True).exists())
+
+
+@override_settings(FEATURE_INDEX_LOAD_IN_BACKGROUND=False)
+class FeatureIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.listings = Property.objects.bulk_create([
+            Property(title=f'Listing {i}', price=Decimal(100000 + i * 1000), location='Harare',
+                     property_type='house', beds=3, is_published=True)
+            for i in range(5)
+        ])
+        PropertyFeature.objects.create(property=cls.listings[0], feature='Pool')
+        # Older than any sync overlap, so only a recorded change re-reads them
+        cls.last_week = timezone.now() - timedelta(days=7)
+        Property.objects.update(updated_at=cls.last_week)
+
+    def loaded_index(self):
+        index = FeatureIndex()
+        index.load()
+        return index
+
+    def has_tag(self, index, listing, tag):
+        column = index.offsets['tags'] + index.tags[tag]
+        return index.matrix[index.rows[listing.pk], column] > 0
+
+    def test_tag_change_is_synced_without_touching_the_listing(self):
+        index = self.loaded_index()
+        listing = self.listings[3]
+        self.assertFalse(self.has_tag(index, listing, 'pool'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PropertyFeature.objects.create(property=listing, feature='pool')
+        index.sync()
+        self.assertTrue(self.has_tag(index, listing, 'pool'))
+        listing.refresh_from_db()
+        self.assertEqual(listing.updated_at, self.last_week)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PropertyFeature.objects.filter(property=listing).delete()
+        index.sync()
+        self.assertFalse(self.has_tag(index, listing, 'pool'))
+
+    @override_settings(FEATURE_INDEX_LOAD_IN_BACKGROUND=True)
+    def test_queries_never_load_the_index_inline(self):
+        index = FeatureIndex()
+        with mock.patch.object(index, 'load_in_background') as load_in_background, \
+                mock.patch.object(index, 'load') as load:
+            self.assertEqual(index.nearest([self.listings[0].pk]), [])
+        load_in_background.assert_called_once()
+        load.assert_not_called()
+
+        index = self.loaded_index()
+        index.loaded_at -= timedelta(days=1)
+        with mock.patch.object(index, 'load_in_background') as load_in_background, \
+                mock.patch.object(index, 'load') as load:
+            nearest = index.nearest([self.listings[0].pk], limit=2)
+        # A stale index still answers while the reload runs in the background
+        self.assertEqual(len(nearest), 2)
+        load_in_background.assert_called_once()
+        load.assert_not_called()
+
+
+class InteractionRetentionTestCase(TestCase):
+    """Two expired months of interactions, only the first of them rolled up"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.listing = Property.objects.create(
+            title='Retention', price=Decimal(100000), location='Harare', property_type='house'
+        )
+        this_month = month_start(timezone.localdate())
+        cls.rolled_up_month = add_months(this_month, -20)
+        cls.pending_month = add_months(this_month, -19)
+
+    def setUp(self):
+        ensure_partitions(start=self.rolled_up_month)
+        for month in (self.rolled_up_month, self.pending_month):
+            for day in (month.replace(day=3), month.replace(day=17)):
+                self.interact(day)
+        # Quiet days in between have no rollup row at all
+        for day in (self.rolled_up_month.replace(day=3), self.rolled_up_month.replace(day=17)):
+            DashboardRollup.objects.create(period='day', date=day, views=1)
+
+    def interact(self, day):
+        timestamp = timezone.make_aware(datetime.combine(day, datetime.min.time())) + timedelta(hours=12)
+        PropertyInteraction.objects.create(property=self.listing, interaction_type='view', timestamp=timestamp)
+
+    def months_with_rows(self):
+        return {
+            month_start(timezone.localdate(timestamp))
+            for timestamp in PropertyInteraction.objects.values_list('timestamp', flat=True)
+        }
+
+
+class InteractionRetentionTests(InteractionRetentionTestCase):
+
+    def test_is_rolled_up_needs_a_rollup_after_each_active_day(self):
+        month = self.rolled_up_month
+        last_day = add_months(month, 1) - timedelta(days=1)
+        self.assertTrue(is_rolled_up(month, last_day))
+        self.assertFalse(is_rolled_up(self.pending_month, add_months(self.pending_month, 1) - timedelta(days=1)))
+
+        # A rollup written before its day ended came from partial data
+        DashboardRollup.objects.filter(date=month.replace(day=17)).update(
+            updated_at=timezone.make_aware(datetime.combine(month.replace(day=17), datetime.min.time()))
+        )
+        self.assertFalse(is_rolled_up(month, last_day))
+
+    def test_roll_off_removes_only_rolled_up_months(self):
+        self.assertEqual(roll_off(retain_months=13, dry_run=True), self.expected_removed())
+        self.assertEqual(self.months_with_rows(), {self.rolled_up_month, self.pending_month})
+
+        self.assertEqual(roll_off(retain_months=13), self.expected_removed())
+        self.assertEqual(self.months_with_rows(), {self.pending_month})
+
+    def expected_removed(self):
+        if is_partitioned():
+            return [partition_name(self.rolled_up_month)]
+        return [f'{self.rolled_up_month:%Y-%m}']
+
+    def test_recent_months_are_kept(self):
+        self.assertEqual(roll_off(retain_months=24), [])
+        self.assertEqual(self.months_with_rows(), {self.rolled_up_month, self.pending_month})
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Partitions need PostgreSQL')
+class InteractionPartitionTests(InteractionRetentionTestCase):
+
+    def test_migration_partitions_the_table(self):
+        self.assertTrue(is_partitioned())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = %s::regclass",
+                [PropertyInteraction._meta.db_table],
+            )
+            names = {row[0] for row in cursor.fetchall()}
+        self.assertIn(f'{PropertyInteraction._meta.db_table}_default', names)
+
+    def test_ensure_creates_each_month_ahead(self):
+        this_month = month_start(timezone.localdate())
+        ensure_partitions(months_ahead=4)
+        partitions = list_partitions()
+        for offset in range(5):
+            self.assertIn(add_months(this_month, offset), partitions)
+        self.assertEqual(ensure_partitions(months_ahead=4), [])
+
+    def test_rows_land_in_their_month_partition(self):
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {quote(partition_name(self.pending_month))}")
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+    def test_roll_off_drops_only_rolled_up_partitions(self):
+        roll_off(retain_months=13)
+        partitions = list_partitions()
+        self.assertNotIn(self.rolled_up_month, partitions)
+        self.assertIn(self.pending_month, partitions)
+
+
+class AlertMatchingTests(TestCase):
+
+    LOCATIONS = ['Borrowdale', 'Mount Pleasant', 'Avondale', 'Borrowdale Brooke', 'Greendale']
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(3)
+        types = [value for value, label in Property.PROPERTY_TYPES]
+        statuses = ['available', 'sold', 'rented']
+        cls.listings = Property.objects.bulk_create([
+            Property(
+                title=f'Listing {i}', price=Decimal(rng.randint(5, 80) * 10000), location=rng.choice(cls.LOCATIONS),
+                property_type=rng.choice(types[:4]), category=rng.choice(['sale', 'rental']),
+                status=rng.choice(statuses), beds=rng.choice([None, 1, 2, 3, 4, 5]), baths=rng.randint(1, 3),
+                is_published=True,
+            )
+            for i in range(60)
+        ])
+
+        user = User.objects.create(username='subscriber', email='subscriber@example.com')
+        cls.criteria = []
+        for i in range(80):
+            params = {}
+            if rng.random() < 0.6:
+                params['property_type'] = ','.join(rng.sample(types[:4], rng.randint(1, 2)))
+            if rng.random() < 0.4:
+                params['category'] = rng.choice(['sale', 'rental', 'all'])
+            if rng.random() < 0.3:
+                params['status'] = rng.choice(statuses)
+            if rng.random() < 0.6:
+                params['price_min'] = rng.randint(5, 50) * 10000
+            if rng.random() < 0.6:
+                params['max_price'] = rng.randint(30, 90) * 10000
+            if rng.random() < 0.4:
+                params['beds'] = rng.randint(1, 5)
+            elif rng.random() < 0.4:
+                params['beds__gte'] = rng.randint(1, 4)
+            if rng.random() < 0.5:
+                params['location'] = rng.choice(['borrow', 'dale', 'Mount', 'av', 'brooke', 'Harare'])
+            cls.criteria.append(params)
+        PropertyAlert.objects.bulk_create([
+            PropertyAlert(user=user, search_parameters=params, frequency='daily') for params in cls.criteria
+        ])
+
+    def brute_force(self, params):
+        """Listings a subscription matches, by filtering the table directly"""
+        queryset = Property.objects.filter(status=params.get('status', 'available'))
+        for field in ('property_type', 'category'):
+            values = [v for v in params.get(field, '').split(',') if v and v != 'all']
+            if values:
+                queryset = queryset.filter(**{f'{field}__in': values})
+        for key, lookup in (('price_min', 'price__gte'), ('max_price', 'price__lte'),
+                            ('beds', 'beds'), ('beds__gte', 'beds__gte')):
+            if key in params:
+                queryset = queryset.filter(**{lookup: params[key]})
+        if 'location' in params:
+            queryset = queryset.filter(location__icontains=params['location'])
+        return set(queryset.values_list('id', flat=True))
+
+    def assert_index_matches_brute_force(self):
+        index = build_index()
+        alerts = dict(PropertyAlert.objects.values_list('id', 'search_parameters'))
+        expected = {alert_id: self.brute_force(params) for alert_id, params in alerts.items()}
+        for listing in self.listings:
+            matched = {key_id for kind, key_id in index.match(
+                {field: getattr(listing, field) for field in
+                 ('is_published', 'property_type', 'category', 'status', 'price', 'beds', 'baths', 'location')}
+            )}
+            self.assertEqual(
+                matched, {alert_id for alert_id, ids in expected.items() if listing.id in ids},
+                f'listing {listing.id}',
+            )
+
+    def test_index_matches_brute_force_filter(self):
+        self.assert_index_matches_brute_force()
+
+    def test_interval_index_matches_brute_force_filter(self):
+        # Force the bisect path, normally taken only above 256 candidates
+        with mock.patch('core.alerts.INTERVAL_SCAN_THRESHOLD', 0):
+            self.assert_index_matches_brute_force()
+
+    def test_empty_index_matches_nothing(self):
+        self.assertEqual(AlertIndex({}).match({'property_type': 'house', 'price': 1}), set())
+
+    def test_listing_is_announced_once(self):
+        user = User.objects.create(username='instant', email='instant@example.com')
+        listing = self.listings[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            PropertyAlert.objects.create(
+                user=user, search_parameters={'location': listing.location}, frequency='instant'
+            )
+            SavedSearch.objects.create(user=user, filters={})
+        Property.objects.filter(pk=listing.pk).update(status='available')
+
+        first = match_property(listing.id)
+        self.assertGreaterEqual(first, 2)
+        notifications = Notification.objects.filter(notification_type='property_match').count()
+        emails = EmailOutbox.objects.count()
+
+        # A second task for the same listing finds the recorded matches
+        self.assertEqual(match_property(listing.id), 0)
+        self.assertEqual(Notification.objects.filter(notification_type='property_match').count(), notifications)
+        self.assertEqual(EmailOutbox.objects.count(), emails)
+
+
+class InteractionBufferTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.listing = Property.objects.create(
+            title='Tracked', price=Decimal(100000), location='Harare', property_type='house'
+        )
+        cls.visitor = User.objects.create(username='visitor')
+
+    def setUp(self):
+        # Flushed by hand; no background flusher thread
+        patcher = mock.patch.object(InteractionBuffer, '_ensure_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.buffer = InteractionBuffer(batch_size=10, max_retries=2)
+
+    def event(self, **overrides):
+        return dict({
+            'property_id': self.listing.pk, 'user_id': None, 'interaction_type': 'view',
+            'session_key': '', 'timestamp': timezone.now(),
+        }, **overrides)
+
+    def test_events_of_deleted_users_and_listings_are_skipped(self):
+        gone = User.objects.create(username='gone')
+        gone_id = gone.pk
+        gone.delete()
+        for event in (self.event(user_id=self.visitor.pk), self.event(user_id=gone_id),
+                      self.event(property_id=self.listing.pk + 1000), self.event()):
+            self.buffer.append(event)
+
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(
+            sorted(PropertyInteraction.objects.values_list('user_id', flat=True), key=str),
+            [self.visitor.pk, None],
+        )
+
+    def test_a_bad_row_is_dropped_after_the_retries(self):
+        for index in range(5):
+            self.buffer.append(self.event(unknown_field=True) if index == 2 else self.event())
+
+        with self.assertRaises(TypeError):
+            self.buffer.flush()
+        self.assertEqual(len(self.buffer), 5)
+
+        # The last retry splits the batch and drops only the bad row
+        self.assertEqual(self.buffer.flush(), 4)
+        self.assertEqual(self.buffer.discarded, 1)
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(PropertyInteraction.objects.count(), 4)
+
+        self.buffer.append(self.event())
+        self.assertEqual(self.buffer.flush(), 1)
+
+
+class RecommendationTests(TestCase):
+
+    def test_top_neighbours_match_dense_cosine(self):
+        import numpy as np
+        from scipy import sparse
+
+        rng = np.random.default_rng(5)
+        dense = rng.random((40, 25)) * (rng.random((40, 25)) < 0.2)
+        dense[:, 7] = 0  # A listing nobody touched has no neighbours
+        top_k = 4
+
+        norms = np.linalg.norm(dense, axis=0)
+        norms[norms == 0] = 1
+        cosine = (dense.T @ dense) / np.outer(norms, norms)
+
+        found = {
+            column: (neighbours.tolist(), scores)
+            for column, neighbours, scores in top_neighbours(
+                sparse.csr_matrix(dense.astype(np.float32)), top_k, block_size=6
+            )
+        }
+        for column in range(dense.shape[1]):
+            candidates = [(score, other) for other, score in enumerate(cosine[column])
+                          if other != column and score > 0]
+            expected = sorted(candidates, reverse=True)[:top_k]
+            if not expected:
+                self.assertNotIn(column, found)
+                continue
+            neighbours, scores = found[column]
+            self.assertEqual(neighbours, [other for score, other in expected])
+            np.testing.assert_allclose(scores, [score for score, other in expected], rtol=1e-5)
+
+    def test_similar_property_ids_weights_recent_seeds(self):
+        listings = Property.objects.bulk_create([
+            Property(title=f'Listing {i}', price=Decimal(100000), location='Harare', property_type='house')
+            for i in range(6)
+        ])
+        a, b, c, d, e, f = [listing.pk for listing in listings]
+        PropertySimilarity.objects.bulk_create([
+            PropertySimilarity(property_id=a, similar_id=c, score=0.5, rank=1),
+            PropertySimilarity(property_id=a, similar_id=d, score=0.4, rank=2),
+            PropertySimilarity(property_id=a, similar_id=b, score=0.9, rank=3),
+            PropertySimilarity(property_id=b, similar_id=d, score=0.3, rank=1),
+            PropertySimilarity(property_id=b, similar_id=e, score=0.6, rank=2),
+            PropertySimilarity(property_id=b, similar_id=f, score=0.2, rank=3),
+        ])
+
+        # Scores for [a, b]: c 0.5, d 0.4 + 0.3/sqrt(2), e 0.6/sqrt(2), f 0.2/sqrt(2); seeds left out
+        self.assertEqual(similar_property_ids([a, b, a]), [d, c, e, f])
+        self.assertEqual(similar_property_ids([a, b], limit=2, exclude=[d]), [c, e])
+        self.assertEqual(similar_property_ids([b, a]), [e, d, c, f])
+        self.assertEqual(similar_property_ids([]), [])
+
+
+class PropertyImageSerializerTests(TestCase):
+
+    def test_saved_bytes_appear_once_the_image_is_processed(self):
+        listing = Property.objects.create(
+            title='Photos', price=Decimal(100000), location='Harare', property_type='house'
+        )
+        image = PropertyImage.objects.bulk_create([
+            PropertyImage(property=listing, image='property_images/upload.jpg')
+        ])[0]
+        self.assertIsNone(PropertyImageSerializer(image).data['saved_bytes'])
+
+        image.original_bytes, image.stored_bytes = 5_000_000, 1_200_000
+        data = PropertyImageSerializer(image).data
+        self.assertEqual(
+            (data['original_bytes'], data['stored_bytes'], data['saved_bytes']),
+            (5_000_000, 1_200_000, 3_800_000),
+        )
+
+
+@override_settings(ADMINS=[('Ops', 'ops@example.com')], ADMIN_EMAILS_SAVED_FLUSH_INTERVAL=3600)
+class AdminEmailCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        signals.invalidate_admin_emails()
+        signals.flush_saved_queries()
+        self.addCleanup(signals.invalidate_admin_emails)
+
+    def saved_this_hour(self):
+        return signals.admin_email_queries_saved(hours=1)[0]['saved']
+
+    def test_memo_hits_are_counted_in_process_and_flushed_in_batches(self):
+        key = signals._saved_queries_key(timezone.now())
+        signals.get_admin_emails()  # Loads from the database
+        for _ in range(5):
+            self.assertEqual(signals.get_admin_emails(), ['ops@example.com'])
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(self.saved_this_hour(), 5)
+
+        signals._admin_emails_local.clear()  # Another process: the shared cache answers
+        signals.get_admin_emails()
+        self.assertEqual(self.saved_this_hour(), 6)
+
+    def test_admin_dashboard_reports_saved_queries(self):
+        admin = User.objects.create_superuser('boss', 'boss@example.com', 'pw')
+        signals.get_admin_emails()
+        signals.get_admin_emails()
+        client = APIClient()
+        client.force_authenticate(admin)
+        with override_settings(ALLOWED_HOSTS=['*']):
+            response = client.get('/dashboard/admin/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['admin_email_queries_saved']), 24)
+        # The request itself may look the recipients up again
+        self.assertGreaterEqual(response.data['admin_email_queries_saved'][0]['saved'], 1)
+        self.assertEqual(
+            response.data['admin_email_queries_saved'][0]['saved'], self.saved_this_hour()
+        )
+
+
+@skipUnless(fakeredis, 'fakeredis is not installed')
+class LiveStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.listing = Property.objects.create(
+            title='Counted', price=Decimal(100000), location='Harare', property_type='house',
+            is_published=True,
+        )
+        cls.admin = User.objects.create_superuser('stats-admin', 'stats@example.com', 'pw')
+        today = timezone.localdate()
+        PropertyStat.objects.create(property=cls.listing, date=today - timedelta(days=1),
+                                    views=10, inquiries=1)
+        PropertyStat.objects.create(property=cls.listing, date=today, views=2)
+
+    def setUp(self):
+        redis = fakeredis.FakeRedis()
+        for target in ('core.live_stats.get_redis_connection_or_none',
+                       'core.interactions.get_redis_connection_or_none'):
+            patcher = mock.patch(target, return_value=redis)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(InteractionBuffer, '_ensure_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.buffer = InteractionBuffer(batch_size=10)
+        patcher = mock.patch.object(interactions, 'interaction_buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def record(self, **counts):
+        for interaction_type, count in counts.items():
+            for _ in range(count):
+                record_interaction(self.listing.pk, interaction_type)
+
+    def totals(self):
+        with override_settings(ALLOWED_HOSTS=['*']):
+            detail = self.client.get(f'/property-stats/{self.listing.pk}/').data
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, self.admin)
+        view = AdminPropertyViewSet.as_view({'get': 'stats'})
+        summary = view(request, pk=self.listing.pk).data
+        self.assertEqual(summary['total_views'], detail['all_time_totals']['views'])
+        return detail['period_totals'], detail['all_time_totals']
+
+    def test_totals_are_exact_before_and_after_a_flush(self):
+        self.record(view=3, inquiry=1, share=2)
+        expected = {'views': 15, 'inquiries': 2, 'favorites': 0, 'shares': 2}
+        self.assertEqual(self.totals(), (expected, expected))
+
+        # Raw rows are written; with Redis the counts are left to the flush
+        self.assertEqual(self.buffer.flush(), 6)
+        self.assertEqual(PropertyStat.objects.get(date=timezone.localdate()).views, 2)
+        self.assertEqual(self.totals(), (expected, expected))
+
+        self.assertEqual(flush_live_stats(), 1)
+        today = PropertyStat.objects.get(date=timezone.localdate())
+        self.assertEqual((today.views, today.inquiries, today.shares), (5, 1, 2))
+        self.assertEqual(self.totals(), (expected, expected))
+
+        # Counts after the flush are neither lost nor counted twice
+        self.record(view=1, favorite=1)
+        expected = dict(expected, views=16, favorites=1)
+        self.assertEqual(self.totals(), (expected, expected))
+        self.assertEqual(flush_live_stats(), 1)
+        self.assertEqual(flush_live_stats(), 0)
+        self.assertEqual(self.totals(), (expected, expected))
+
+
+class PopularityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.listings = [
+            Property.objects.create(
+                title=f'Listing {index}', price=Decimal(100000), location='Harare',
+                property_type='house', is_published=index != 3,
+            )
+            for index in range(5)
+        ]
+        # Distinct creation times, newest last
+        started = timezone.now() - timedelta(days=10)
+        for index, listing in enumerate(cls.listings):
+            Property.objects.filter(pk=listing.pk).update(created_at=started + timedelta(hours=index))
+
+    def get(self, path):
+        with override_settings(ALLOWED_HOSTS=['*']):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data]
+
+    def test_refresh_matches_a_python_reference(self):
+        rng = random.Random(3)
+        today = timezone.localdate()
+        stats = [
+            PropertyStat(
+                property=listing, date=today - timedelta(days=age),
+                views=rng.randint(0, 50), inquiries=rng.randint(0, 3),
+                favorites=rng.randint(0, 5), shares=rng.randint(0, 4),
+            )
+            for listing in self.listings[:4]
+            for age in rng.sample(range(-1, 35), 12)  # Some outside the window
+        ]
+        PropertyStat.objects.bulk_create(stats)
+        stale = self.listings[4]
+        PropertyPopularity.objects.create(property=stale, popularity_score=9.0, updated_at=timezone.now())
+
+        with override_settings(POPULARITY_WINDOW_DAYS=30, POPULARITY_HALF_LIFE_DAYS=7,
+                               TRENDING_HALF_LIFE_DAYS=1, POPULARITY_WEIGHTS={}):
+            result = refresh_popularity()
+
+        expected = {}
+        for stat in stats:
+            age = (today - stat.date).days
+            if not 0 <= age < 30:
+                continue
+            weighted = sum(getattr(stat, metric) * weight for metric, weight in DEFAULT_WEIGHTS.items())
+            scores = expected.setdefault(stat.property_id, {'popular': 0.0, 'trending': 0.0, 'views': 0})
+            scores['popular'] += weighted * 0.5 ** (age / 7)
+            scores['trending'] += weighted * 0.5 ** age
+            scores['views'] += stat.views
+
+        self.assertEqual(result['rows'], len(expected))
+        self.assertEqual(result['removed'], 1)
+        rows = {row.property_id: row for row in PropertyPopularity.objects.all()}
+        self.assertEqual(set(rows), set(expected))
+        for property_id, scores in expected.items():
+            self.assertAlmostEqual(rows[property_id].popularity_score, scores['popular'], places=6)
+            self.assertAlmostEqual(rows[property_id].trending_score, scores['trending'], places=6)
+            self.assertEqual(rows[property_id].views, scores['views'])
+
+    def test_ranked_actions_fall_back_to_the_newest_listings(self):
+        newest = [listing.pk for listing in reversed(self.listings) if listing.is_published]
+        self.assertEqual(self.get('/properties/popular/'), newest)
+        self.assertEqual(self.get('/properties/trending/?limit=2'), newest[:2])
+
+        # Scored listings come first; the newest fill the rest
+        oldest = self.listings[0]
+        hidden = self.listings[3]
+        PropertyPopularity.objects.create(property=oldest, popularity_score=5.0, updated_at=timezone.now())
+        PropertyPopularity.objects.create(property=hidden, popularity_score=9.0, updated_at=timezone.now())
+        self.assertEqual(
+            self.get('/properties/popular/?limit=3'),
+            [oldest.pk] + [pk for pk in newest if pk != oldest.pk][:2],
+        )
+        self.assertEqual(self.get('/properties/trending/?limit=3'), newest[:3])
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
-from .views import PublicPropertyListView, PublicPropertyDetailView, RegisterView,UserViewSet,PropertyLeadViewSet, LeadSourceViewSet , CustomTokenObtainPairView, ProfileView, PropertyViewSet, NeighborhoodViewSet, SavedSearchViewSet, FavoritePropertyViewSet, InquiryViewSet, MortgageCalculatorView, BlogPostViewSet, PropertyShareView, PropertyShareRedirect, PropertyInquiryView, PropertyFilterOptionsView, AdminDashboardView, UserDashboardView, PropertyStatsView, AdminUserManagementViewSet, AdminActionLogViewSet, AgentViewSet, NotificationViewSet
+from .views import PublicPropertyListView, PublicPropertyDetailView, RegisterView,UserViewSet,PropertyLeadViewSet, LeadSourceViewSet , CustomTokenObtainPairView, ProfileView, PropertyViewSet, NeighborhoodViewSet, SavedSearchViewSet, FavoritePropertyViewSet, InquiryViewSet, MortgageCalculatorView, BlogPostViewSet, PropertyShareView, PropertyShareRedirect, PropertyInquiryView, PropertyFilterOptionsView, AdminDashboardView, StatsBackfillView, UserDashboardView, PropertyStatsView, AdminUserManagementViewSet, AdminActionLogViewSet, AgentViewSet, NotificationViewSet, PropertyRecommendationView
 
 router = DefaultRouter()
 router.register(r'properties', PropertyViewSet, basename='property')
@@ -22,6 +22,7 @@ router.register(r'notifications', NotificationViewSet, basename='notification')
 urlpatterns = [
     # Specific property paths MUST come before router to avoid conflicts
     path('properties/filter-options/', PropertyFilterOptionsView.as_view(), name='property-filter-options'),
+    path('properties/recommendations/', PropertyRecommendationView.as_view(), name='property-recommendations'),
     path('properties/<int:pk>/share/', PropertyShareView.as_view()),
     path('properties/<int:pk>/inquiry/', PropertyInquiryView.as_view(), name='property-inquiry'),
     path('properties/<int:pk>/stats/', PropertyViewSet.as_view({'get': 'stats'}), name='property-stats'),
@@ -45,6 +46,8 @@ urlpatterns = [
     path('agent-properties/', PropertyViewSet.as_view({'get': 'list'}), name='agent-properties'),
     path('property-stats/<int:pk>/', PropertyStatsView.as_view()),
     path('dashboard/admin/', AdminDashboardView.as_view()),
+    path('stats/backfills/', StatsBackfillView.as_view()),
+    path('stats/backfills/<int:pk>/', StatsBackfillView.as_view()),
     path('admin/actions/', AdminActionLogViewSet.as_view({'get': 'list'})),
     path('dashboard/user/', UserDashboardView.as_view()),
 ]
\ No newline at end of file
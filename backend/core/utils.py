@@ -1,5 +1,6 @@
 # core/utils.py
-from PIL import Image, ImageEnhance
+from functools import lru_cache
+from PIL import Image
 import os
 from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
@@ -78,101 +79,98 @@ class EmailNotificationService:
 Utility functions for image processing
 """
 
+class Watermarker:
+    """
+    Composites a logo onto images. The logo is decoded once and each scaled
+    copy, keyed by (width, opacity), is kept in an LRU cache, so a batch of
+    photos of the same size reuses one prepared logo.
+    """
+
+    POSITIONS = ('center', 'bottom_right', 'bottom_left', 'top_right', 'top_left')
+
+    def __init__(self, load_logo, cache_size=16):
+        self._load_logo = load_logo
+        self._logo = None
+        self.scaled = lru_cache(maxsize=cache_size)(self._scale)
+
+    @property
+    def logo(self):
+        if self._logo is None:
+            self._logo = self._load_logo().convert('RGBA')
+        return self._logo
+
+    def _scale(self, width, opacity):
+        logo = self.logo
+        if opacity < 1.0:
+            # Same as ImageEnhance.Brightness on the alpha band
+            logo = logo.copy()
+            logo.putalpha(logo.getchannel('A').point(lambda value: int(value * opacity)))
+        height = max(1, int(logo.height * (width / logo.width)))
+        return logo.resize((width, height), Image.Resampling.LANCZOS)
+
+    def apply(self, base_image, position='center', size_ratio=0.15, opacity=0.7):
+        """
+        Return base_image watermarked, as RGB. RGB images (e.g. decoded JPEGs)
+        are modified in place; only the logo's bounding box is touched.
+        """
+        if position not in self.POSITIONS:
+            raise ValueError(f"Invalid position '{position}'. Must be one of: {list(self.POSITIONS)}")
+
+        image = base_image if base_image.mode == 'RGB' else base_image.convert('RGB')
+        img_width, img_height = image.size
+        logo = self.scaled(max(1, int(img_width * size_ratio)), opacity)
+        wm_width, wm_height = logo.size
+        margin = int(img_width * 0.02)  # 2% margin
+
+        pos = {
+            'bottom_right': (img_width - wm_width - margin, img_height - wm_height - margin),
+            'bottom_left': (margin, img_height - wm_height - margin),
+            'top_right': (img_width - wm_width - margin, margin),
+            'top_left': (margin, margin),
+            'center': (int((img_width - wm_width) / 2), int((img_height - wm_height) / 2)),
+        }[position]
+
+        # Pasting through the logo's alpha blends it like alpha_composite over an opaque base
+        image.paste(logo, pos, mask=logo)
+        return image
+
+
+@lru_cache(maxsize=4)
+def _file_watermarker(watermark_path):
+    return Watermarker(lambda: Image.open(watermark_path))
+
+
 def apply_watermark(image_path, watermark_path, position='center', size_ratio=0.15, opacity=0.7):
     """
-    Applies a watermark to an image and returns the watermarked image as bytes.
-    
+    Applies a watermark to an image file and returns the watermarked image as bytes.
+
     Args:
         image_path (str): Path to the base image
         watermark_path (str): Path to the watermark image
-        position (str): Position of watermark ('center', 'bottom_right', 'bottom_left', 'top_right', 'top_left')
-        size_ratio (float): Size of watermark relative to base image (0.0 to 1.0)
-        opacity (float): Opacity of watermark (0.0 to 1.0)
-    
+        position, size_ratio, opacity: see Watermarker.apply()
+
     Returns:
         bytes: Watermarked image as JPEG bytes, or None if error occurs
     """
     try:
-        logger.info(f"Starting watermark process for {image_path}")
-        print(f"DEBUG: Opening base image from {image_path}")
-        print(f"DEBUG: Opening watermark from {watermark_path}")
-        
         # Check file existence
         if not os.path.exists(image_path):
-            print(f"ERROR: Base image not found at {image_path}")
             logger.error(f"Base image not found: {image_path}")
             return None
-            
+
         if not os.path.exists(watermark_path):
-            print(f"ERROR: Watermark not found at {watermark_path}")
             logger.error(f"Watermark not found: {watermark_path}")
             return None
-        
-        # Open images
-        base_image = Image.open(image_path).convert('RGBA')
-        watermark = Image.open(watermark_path).convert('RGBA')
-        
-        print(f"DEBUG: Base image size: {base_image.size}")
-        print(f"DEBUG: Watermark original size: {watermark.size}")
 
-        # --- Opacity Control ---
-        if opacity < 1.0:
-            alpha = watermark.split()[3]
-            alpha = ImageEnhance.Brightness(alpha).enhance(opacity)
-            watermark.putalpha(alpha)
-            print(f"DEBUG: Applied opacity {opacity}")
-
-        # --- Sizing ---
-        img_width, img_height = base_image.size
-        wm_original_width, wm_original_height = watermark.size
-
-        # Calculate new watermark dimensions maintaining aspect ratio
-        new_wm_width = int(img_width * size_ratio)
-        new_wm_height = int(wm_original_height * (new_wm_width / wm_original_width))
-        
-        print(f"DEBUG: Resizing watermark to {new_wm_width}x{new_wm_height}")
-        watermark = watermark.resize((new_wm_width, new_wm_height), Image.Resampling.LANCZOS)
-
-        # --- Positioning ---
-        margin = int(img_width * 0.02)  # 2% margin
-        
-        position_map = {
-            'bottom_right': (img_width - new_wm_width - margin, img_height - new_wm_height - margin),
-            'bottom_left': (margin, img_height - new_wm_height - margin),
-            'top_right': (img_width - new_wm_width - margin, margin),
-            'top_left': (margin, margin),
-            'center': (int((img_width - new_wm_width) / 2), int((img_height - new_wm_height) / 2))
-        }
-        
-        pos = position_map.get(position)
-        if pos is None:
-            raise ValueError(f"Invalid position '{position}'. Must be one of: {list(position_map.keys())}")
-            
-        print(f"DEBUG: Watermark position: {pos}")
-
-        # --- Apply Watermark ---
-        # Create transparent layer
-        transparent_layer = Image.new('RGBA', base_image.size, (0, 0, 0, 0))
-        transparent_layer.paste(watermark, pos)
-
-        # Composite the watermark onto the base image
-        watermarked_image = Image.alpha_composite(base_image, transparent_layer)
-        
-        # Convert to RGB for JPEG (removes transparency)
-        final_image = watermarked_image.convert('RGB')
-        
-        # Save to BytesIO instead of file
         output = BytesIO()
-        final_image.save(output, format='JPEG', quality=95, optimize=True)
-        output.seek(0)
-        
-        print(f"SUCCESS: Watermark applied successfully")
+        with Image.open(image_path) as base_image:
+            final_image = _file_watermarker(watermark_path).apply(
+                base_image, position, size_ratio, opacity
+            )
+            final_image.save(output, format='JPEG', quality=95)
         logger.info(f"Watermark applied successfully to {image_path}")
-        return output.read()
+        return output.getvalue()
 
     except Exception as e:
         logger.exception(f"Watermark failed for {image_path}: {str(e)}")
-        print(f"ERROR: An unexpected error occurred: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
\ No newline at end of file
+        return None
@@ -6,7 +6,7 @@ from django.contrib.auth.hashers import make_password
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.permissions import AllowAny, IsAuthenticatedOrReadOnly
-from django.db.models import Avg, Count, Sum, Min, Max
+from django.db.models import Avg, Count, Sum
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
@@ -20,7 +20,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from django.db import transaction
 from rest_framework import viewsets
 from .models import Property, PropertyImage, SavedSearch, FavoriteProperty, Neighborhood, Inquiry, PropertyInteraction, AdminActionLog, Notification
-from django.db.models import Q, F
+from django.db.models import Q
 from django.db.models.functions import TruncHour
 from django.db.models import CharField, Value, Case, When
 from .serializers import PropertySerializer, NeighborhoodSerializer, SavedSearchSerializer, FavoritePropertySerializer, InquirySerializer
@@ -34,6 +34,17 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework import filters
 from .models import Agent
 from .serializers import AgentSerializer
+from .interactions import record_interaction
+from .live_stats import pending_counts
+from .signals import admin_email_queries_saved
+from .pagination import CachedCountPaginator, CursorPaginationMixin
+from .feature_index import similar_properties
+from .popularity import top_properties
+from .recommendations import recommend
+from .search import search_properties
+from .facets import apply_property_filters, facet_snapshot, filtered_facets, has_property_filters
+from .aggregation import backfill_progress, dashboard_stats, plan_backfill
+from .caching import ADMIN_DASHBOARD, AGENT_STATS, PROPERTY_FACETS, cached, hashed_key
 from datetime import datetime
 import logging
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -123,11 +134,48 @@ class ProfileView(APIView):
 from rest_framework.pagination import PageNumberPagination
 
 class PropertyPagination(PageNumberPagination):
+    django_paginator_class = CachedCountPaginator
     page_size = 12
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class PropertyViewSet(viewsets.ModelViewSet):
+
+# Model columns read by PropertyListSerializer; everything else stays deferred
+PROPERTY_CARD_FIELDS = (
+    'id', 'title', 'price', 'location', 'property_type', 'category',
+    'status', 'beds', 'baths', 'area_measurement', 'area_unit', 'sqft', 'created_at',
+    'updated_at',
+)
+
+
+def card_queryset(queryset):
+    """Project a property queryset down to what a listing card needs"""
+    return (
+        queryset.select_related(None)
+        .prefetch_related(None)
+        .only(*PROPERTY_CARD_FIELDS)
+        .with_list_annotations()
+    )
+
+
+class PropertyCardListMixin:
+    """
+    List actions return lightweight cards (PropertyListSerializer) instead of
+    full nested properties when ?view=card is passed, or by default when
+    card_list_default is set. ?view=full forces the full representation.
+    """
+    card_list_default = False
+
+    def use_card_list(self):
+        if self.action != 'list':
+            return False
+        view = self.request.query_params.get('view')
+        if view in ('card', 'full'):
+            return view == 'card'
+        return self.card_list_default
+
+
+class PropertyViewSet(CursorPaginationMixin, PropertyCardListMixin, viewsets.ModelViewSet):
     serializer_class = PropertySerializer
     pagination_class = PropertyPagination  # ADD THIS LINE
     
@@ -159,10 +207,48 @@ class PropertyViewSet(viewsets.ModelViewSet):
                 'leads__source'
             )
         elif self.action == 'list':
+            if self.use_card_list():
+                return card_queryset(base_queryset)
             return base_queryset.select_related('user').prefetch_related('images')
         
         return base_queryset
 
+    def get_serializer_class(self):
+        if self.use_card_list():
+            return PropertyListSerializer
+        return PropertySerializer
+
+    def ranked_limit(self):
+        try:
+            return min(max(int(self.request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            return 10
+
+    def ranked_cards(self, properties):
+        serializer = PropertyListSerializer(properties, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """More like this: the nearest listings by price, size, place, type and features"""
+        ids = [p.id for p in similar_properties([self.get_object().pk], limit=self.ranked_limit())]
+        properties = card_queryset(Property.objects.filter(pk__in=ids)).in_bulk()
+        return self.ranked_cards([properties[pk] for pk in ids if pk in properties])
+
+    @action(detail=False, methods=['get'])
+    def popular(self, request):
+        """Most engaged-with listings over the last few weeks, from PropertyPopularity"""
+        return self.ranked_cards(top_properties(
+            'popular', limit=self.ranked_limit(), queryset=card_queryset(Property.objects.all())
+        ))
+
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """Listings with the most engagement in the last day or two"""
+        return self.ranked_cards(top_properties(
+            'trending', limit=self.ranked_limit(), queryset=card_queryset(Property.objects.all())
+        ))
+
     def list(self, request, *args, **kwargs):
         """Override list to add custom response metadata"""
         queryset = self.filter_queryset(self.get_queryset())
@@ -170,15 +256,14 @@ class PropertyViewSet(viewsets.ModelViewSet):
         # Apply additional filters
         search_term = request.query_params.get('search')
         if search_term:
-            queryset = queryset.filter(
-                Q(title__icontains=search_term) |
-                Q(location__icontains=search_term) |
-                Q(description__icontains=search_term)
-            )
+            queryset = search_properties(queryset, search_term)
         
-        # Sorting
-        ordering = request.query_params.get('ordering', '-created_at')
-        queryset = queryset.order_by(ordering)
+        # Sorting (search results default to relevance)
+        ordering = request.query_params.get('ordering')
+        if ordering and ordering != 'relevance':
+            queryset = queryset.order_by(ordering)
+        elif not search_term:
+            queryset = queryset.order_by('-created_at')
         
         # Paginate
         page = self.paginate_queryset(queryset)
@@ -187,8 +272,9 @@ class PropertyViewSet(viewsets.ModelViewSet):
             response = self.get_paginated_response(serializer.data)
             
             # Add custom metadata
-            response.data['current_page'] = int(request.query_params.get('page', 1))
-            response.data['page_size'] = self.paginator.get_page_size(request)
+            if isinstance(self.paginator, PageNumberPagination):
+                response.data['current_page'] = int(request.query_params.get('page', 1))
+                response.data['page_size'] = self.paginator.get_page_size(request)
             
             return response
         
@@ -196,6 +282,7 @@ class PropertyViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 class AdminPropertyPagination(PageNumberPagination):
+    django_paginator_class = CachedCountPaginator
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
@@ -211,7 +298,7 @@ class AdminPropertyPagination(PageNumberPagination):
             'results': data
         })
 
-class AdminPropertyViewSet(viewsets.ModelViewSet):
+class AdminPropertyViewSet(CursorPaginationMixin, PropertyCardListMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticatedOrReadOnly]  # Changed this
     serializer_class = PropertySerializer
     pagination_class = AdminPropertyPagination  # Enable pagination
@@ -256,7 +343,9 @@ class AdminPropertyViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         """Use different serializers for different actions"""
         if self.action == 'list':
-            return PropertySerializer  # Lighter serializer for list view
+            if self.use_card_list():
+                return PropertyListSerializer  # Lighter serializer for list view
+            return PropertySerializer
         elif self.action == 'retrieve':
             return PropertyDetailSerializer  # Full serializer for detail view
         return PropertySerializer
@@ -286,55 +375,16 @@ class AdminPropertyViewSet(viewsets.ModelViewSet):
             base_queryset = Property.objects.filter(is_published=True).select_related('user').prefetch_related('images')
     
         # Apply filters from query parameters
-        filters = {}
-    
-        # Price range filter
-        price_min = request.query_params.get('price_min')
-        price_max = request.query_params.get('price_max')
-        if price_min:
-            filters['price__gte'] = price_min
-        if price_max:
-            filters['price__lte'] = price_max
-    
-        # Property type filter
-        property_type = request.query_params.get('property_type')
-        if property_type and property_type != 'all':
-            filters['property_type'] = property_type
-    
-        # Category filter
-        category = request.query_params.get('category')
-        if category and category != 'all':
-            filters['category'] = category
-    
-        # Status filter
-        status = request.query_params.get('status')
-        if status and status != 'all':
-            filters['status'] = status
-    
-        # Bedrooms filter
-        beds_min = request.query_params.get('beds_min')
-        if beds_min:
-            filters['beds__gte'] = beds_min
-    
-        # Bathrooms filter
-        baths_min = request.query_params.get('baths_min')
-        if baths_min:
-            filters['baths__gte'] = baths_min
-    
-        # Apply filters to queryset
-        if filters:
-            base_queryset = base_queryset.filter(**filters)
+        base_queryset = apply_property_filters(base_queryset, request.query_params)
     
         # Handle search parameter
         search_term = request.query_params.get('search')
         if search_term:
-            base_queryset = base_queryset.filter(
-                Q(title__icontains=search_term) |
-                Q(location__icontains=search_term) |
-                Q(description__icontains=search_term)
-            )
+            base_queryset = search_properties(base_queryset, search_term)
         
-        ordering_param = request.query_params.get('ordering', '-created_at')
+        # Search results default to relevance order
+        default_ordering = 'relevance' if search_term else '-created_at'
+        ordering_param = request.query_params.get('ordering', default_ordering)
     
         # Map frontend sorting options to actual model fields
         ordering_map = {
@@ -350,12 +400,17 @@ class AdminPropertyViewSet(viewsets.ModelViewSet):
         ordering = ordering_map.get(ordering_param, ordering_param)
         valid_fields = [f.name for f in Property._meta.get_fields()]
         valid_fields += ['-' + f for f in valid_fields]  
-        if ordering in valid_fields:
+        if ordering == 'relevance' and search_term:
+            pass  # search_properties already ordered by rank
+        elif ordering in valid_fields:
             base_queryset = base_queryset.order_by(ordering)
         else:
         # Fall back to default ordering if invalid
             base_queryset = base_queryset.order_by('-created_at')
-        logger.info(f"Final queryset has {base_queryset.count()} properties after filtering and ordering")
+        logger.info(f"Listing properties ordered by {base_queryset.query.order_by}")
+
+        if self.use_card_list():
+            base_queryset = card_queryset(base_queryset)
 
         # Use pagination
         page = self.paginate_queryset(base_queryset)
@@ -373,9 +428,6 @@ class AdminPropertyViewSet(viewsets.ModelViewSet):
     def stats(self, request, pk=None):
         property = self.get_object()
         
-        # Use aggregation and annotation for better performance
-        from django.db.models import Sum, Count, F
-        
         # Get stats in a single query with annotations
         stats_data = property.stats.aggregate(
             total_views=Sum('views'),
@@ -396,19 +448,34 @@ class AdminPropertyViewSet(viewsets.ModelViewSet):
         # Total leads count
         total_leads = property.leads.count()
         
+        # Add today's views that are still in the live counters
+        live_views = pending_counts(property.pk)['views']
+        recent_stats = list(recent_stats)
+        if live_views:
+            today = timezone.localdate()
+            today_row = next((row for row in recent_stats if row['date'] == today), None)
+            if today_row is None:
+                recent_stats.append({'date': today, 'views': live_views})
+            else:
+                today_row['views'] += live_views
+        
         return Response({
-            'total_views': stats_data['total_views'] or 0,
+            'total_views': (stats_data['total_views'] or 0) + live_views,
             'avg_daily_views': stats_data['avg_daily_views'] or 0,
             'total_leads': total_leads,
-            'recent_stats': list(recent_stats),
+            'recent_stats': recent_stats,
             'lead_sources': list(lead_sources)
         })
 
 class PublicPropertyListView(AdminPropertyViewSet):
     permission_classes = [AllowAny]
+    card_list_default = True
     
     def get_queryset(self):
-        return Property.objects.filter(is_published=True).select_related('user').prefetch_related('images')
+        queryset = Property.objects.filter(is_published=True)
+        if self.use_card_list():
+            return card_queryset(queryset)
+        return queryset.select_related('user').prefetch_related('images')
 
 class PublicPropertyDetailView(generics.RetrieveAPIView):
     """Public endpoint for property details - no authentication required"""
@@ -544,91 +611,27 @@ class PropertyAlertViewSet(viewsets.ModelViewSet):
 class PropertyFilterOptionsView(APIView):
     """
     Returns available filter options for property searches.
-    Cached for 1 hour to reduce database queries.
+    Unfiltered options come from the maintained facet tables; with filters
+    or a search applied, counts are computed for the matching listings.
     """
     permission_classes = [AllowAny]
 
     def get(self, request):
-        from django.core.cache import cache
-
-        cache_key = 'property_filter_options'
-        cached_data = cache.get(cache_key)
-
-        if cached_data:
-            return Response(cached_data)
-
-        # Get unique locations
-        locations = Property.objects.filter(
-            is_published=True
-        ).values_list('location', flat=True).distinct().order_by('location')
-
-        # Get price range
-        price_stats = Property.objects.filter(
-            is_published=True
-        ).aggregate(
-            min_price=Min('price'),
-            max_price=Max('price')
+        params = request.query_params
+        search_term = params.get('search', '').strip()
+        if not search_term and not has_property_filters(params):
+            return Response(cached('snapshot', facet_snapshot, timeout=300, namespace=PROPERTY_FACETS))
+
+        def compute():
+            queryset = Property.objects.filter(is_published=True)
+            if search_term:
+                queryset = search_properties(queryset, search_term)
+            return filtered_facets(queryset, params)
+
+        data = cached(
+            hashed_key(sorted(params.lists())), compute,
+            timeout=60, namespace=PROPERTY_FACETS,
         )
-
-        # Get property types with counts
-        property_types = Property.objects.filter(
-            is_published=True
-        ).values('property_type').annotate(
-            count=Count('id')
-        ).order_by('property_type')
-
-        # Get categories with counts
-        categories = Property.objects.filter(
-            is_published=True
-        ).values('category').annotate(
-            count=Count('id')
-        ).order_by('category')
-
-        # Get status options with counts
-        statuses = Property.objects.filter(
-            is_published=True
-        ).values('status').annotate(
-            count=Count('id')
-        ).order_by('status')
-
-        # Get bedroom range
-        bed_stats = Property.objects.filter(
-            is_published=True
-        ).aggregate(
-            min_beds=Min('beds'),
-            max_beds=Max('beds')
-        )
-
-        # Get bathroom range
-        bath_stats = Property.objects.filter(
-            is_published=True
-        ).aggregate(
-            min_baths=Min('baths'),
-            max_baths=Max('baths')
-        )
-
-        data = {
-            'locations': list(locations),
-            'price_range': {
-                'min': price_stats['min_price'] or 0,
-                'max': price_stats['max_price'] or 0,
-            },
-            'property_types': list(property_types),
-            'categories': list(categories),
-            'statuses': list(statuses),
-            'bed_range': {
-                'min': bed_stats['min_beds'] or 0,
-                'max': bed_stats['max_beds'] or 10,
-            },
-            'bath_range': {
-                'min': bath_stats['min_baths'] or 0,
-                'max': bath_stats['max_baths'] or 10,
-            },
-        }
-
-        # Cache for 1 hour
-        cache.set(cache_key, data, 60 * 60)
-
         return Response(data)
 
 
@@ -659,12 +662,7 @@ class PropertyShareView(APIView):
         )
 
         # Track share interaction
-        PropertyInteraction.objects.create(
-            property=property_obj,
-            user=user,
-            interaction_type='share',
-            session_key=session_key
-        )
+        record_interaction(property_obj.id, 'share', user=user, session_key=session_key)
 
         # Build share URL with token
         share_url = f"{settings.FRONTEND_URL}/shared/{share.share_token}"
@@ -740,12 +738,7 @@ class PropertyInquiryView(APIView):
         )
 
         # Track inquiry interaction
-        PropertyInteraction.objects.create(
-            property=property_obj,
-            user=user,
-            interaction_type='inquiry',
-            session_key=session_key
-        )
+        record_interaction(property_obj.id, 'inquiry', user=user, session_key=session_key)
 
         # Send email notification to agent
         sender_name = name if not user else (user.firstname or user.username)
@@ -842,137 +835,52 @@ class PropertyRecommendationView(APIView):
         return Response(serializer.data)
 
     def get_personalized_recommendations(self, user):
-        # Collaborative filtering based on similar users
-        similar_users = self.find_similar_users(user)
-        
-        # Content-based filtering based on user preferences
-        user_preferences = self.extract_user_preferences(user)
-        
-        return Property.objects.filter(
-            Q(propertyinteraction__user__in=similar_users) |
-            Q(**user_preferences)
-        ).distinct().order_by('-created_at')[:10]
+        # Neighbours of what the user recently viewed, saved or asked about
+        seed_limit = getattr(settings, 'RECOMMENDER_SEED_COUNT', 20)
+        seeds = list(PropertyInteraction.objects.filter(user=user).order_by(
+            '-timestamp'
+        ).values_list('property_id', flat=True)[:seed_limit * 2])
+        favorites = list(FavoriteProperty.objects.filter(user=user).values_list('property_id', flat=True))
+        recommendations = self.similar_to(seeds[:seed_limit] + favorites, exclude=favorites)
+        return recommendations or self.get_global_recommendations()
 
     def get_session_based_recommendations(self, session_key):
-        # Get recent interactions from session
-        recent_properties = PropertyInteraction.objects.filter(
-            session_key=session_key
-        ).values_list('property', flat=True)[:5]
-        
-        if recent_properties:
-            # Find properties with similar features
-            return Property.objects.filter(
-                Q(property_type__in=Property.objects.filter(
-                    id__in=recent_properties).values('property_type')) |
-                Q(location__in=Property.objects.filter(
-                    id__in=recent_properties).values('location'))
-            ).exclude(id__in=recent_properties)[:10]
-        
-        return self.get_global_recommendations()
+        seed_limit = getattr(settings, 'RECOMMENDER_SEED_COUNT', 20)
+        seeds = list(PropertyInteraction.objects.filter(session_key=session_key).order_by(
+            '-timestamp'
+        ).values_list('property_id', flat=True)[:seed_limit * 2])
+        return self.similar_to(seeds[:seed_limit]) or self.get_global_recommendations()
+
+    def similar_to(self, seeds, limit=10, exclude=()):
+        # Co-interaction neighbours first; listings too new to have any are
+        # filled in from the content-based feature index
+        recommendations = recommend(seeds, limit=limit, exclude=exclude)
+        if seeds and len(recommendations) < limit:
+            recommendations += similar_properties(
+                seeds[:5], limit=limit - len(recommendations),
+                exclude=[p.id for p in recommendations] + list(exclude),
+            )
+        return recommendations
 
     def get_global_recommendations(self):
-        # Combine popularity and freshness
-        return Property.objects.annotate(
-            popularity_score=Count('propertyinteraction') + F('price')/1000
-        ).order_by('-popularity_score', '-created_at')[:10]
-
-    def find_similar_users(self, user):
-        # Find users with similar interaction patterns
-        user_properties = user.propertyinteraction_set.values_list('property', flat=True)
-        return User.objects.annotate(
-            common_interactions=Count(
-                'propertyinteraction',
-                filter=Q(propertyinteraction__property__in=user_properties)
-        ).order_by('-common_interactions')[:5])
-
-    def extract_user_preferences(self, user):
-        # Extract preferences from user's historical data
-        preferences = {
-            'price__lte': user.propertyinteraction_set.aggregate(
-                avg_price=Avg('property__price'))['avg_price'] * 1.2,
-            'property_type__in': user.propertyinteraction_set.values_list(
-                'property__property_type', flat=True).distinct()
-        }
-        return {k: v for k, v in preferences.items() if v}
+        # Top of the maintained popularity scores, an index read
+        return top_properties('popular', limit=10)
 
 class AdminDashboardView(APIView):
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        from django.db.models import Count, Sum
-        from django.db.models.functions import TruncDate
-        from datetime import date, timedelta
-
-        # Date ranges for trend calculation
-        today = date.today()
-        seven_days_ago = today - timedelta(days=7)
-        fourteen_days_ago = today - timedelta(days=14)
-        thirty_days_ago = today - timedelta(days=30)
-
-        # Get stats from PropertyStat for the last 7 days
-        stats_last_7_days = PropertyStat.objects.filter(
-            date__gte=seven_days_ago
-        ).values('date').annotate(
-            total_views=Sum('views'),
-            total_inquiries=Sum('inquiries'),
-            total_favorites=Sum('favorites'),
-            total_shares=Sum('shares')
-        ).order_by('-date')
-
-        # Get stats for previous 7 days (for trend comparison)
-        stats_prev_7_days = PropertyStat.objects.filter(
-            date__gte=fourteen_days_ago,
-            date__lt=seven_days_ago
-        ).aggregate(
-            views=Sum('views'),
-            inquiries=Sum('inquiries'),
-            favorites=Sum('favorites'),
-            shares=Sum('shares')
-        )
-
-        # Current period totals
-        current_totals = PropertyStat.objects.filter(
-            date__gte=seven_days_ago
-        ).aggregate(
-            views=Sum('views'),
-            inquiries=Sum('inquiries'),
-            favorites=Sum('favorites'),
-            shares=Sum('shares')
-        )
-
-        # Calculate trends (percentage change)
-        def calc_trend(current, previous):
-            current = current or 0
-            previous = previous or 0
-            if previous == 0:
-                return 100 if current > 0 else 0
-            return round(((current - previous) / previous) * 100, 1)
-
-        trends = {
-            'views': calc_trend(current_totals['views'], stats_prev_7_days['views']),
-            'inquiries': calc_trend(current_totals['inquiries'], stats_prev_7_days['inquiries']),
-            'favorites': calc_trend(current_totals['favorites'], stats_prev_7_days['favorites']),
-            'shares': calc_trend(current_totals['shares'], stats_prev_7_days['shares']),
-        }
-
-        # Popular properties (from PropertyStat aggregated data)
-        popular_properties = Property.objects.filter(
-            stats__date__gte=thirty_days_ago
-        ).annotate(
-            total_views=Sum('stats__views'),
-            total_inquiries=Sum('stats__inquiries'),
-            total_favorites=Sum('stats__favorites'),
-            total_shares=Sum('stats__shares')
-        ).order_by('-total_views')[:10]
+        # Served from the rollup table; refreshes invalidate the cached copy
+        stats = dict(cached('stats', dashboard_stats, timeout=900, namespace=ADMIN_DASHBOARD))
+        stats['admin_email_queries_saved'] = admin_email_queries_saved()
 
         # Recent admin actions
         recent_actions = AdminActionLog.objects.filter(
             admin=request.user
         ).select_related('admin', 'target_user').order_by('-timestamp')[:10]
 
-        recent_actions_data = []
-        for action in recent_actions:
-            recent_actions_data.append({
+        stats['recent_actions'] = [
+            {
                 'id': action.id,
                 'action_type': action.action_type,
                 'admin_username': action.admin.username if action.admin else None,
@@ -980,63 +888,53 @@ class AdminDashboardView(APIView):
                 'details': action.details,
                 'ip_address': action.ip_address,
                 'timestamp': action.timestamp.isoformat(),
-            })
-
-        # User growth over last 7 days
-        user_growth = User.objects.filter(
-            date_joined__date__gte=seven_days_ago
-        ).annotate(
-            date=TruncDate('date_joined')
-        ).values('date').annotate(
-            count=Count('id')
-        ).order_by('-date')
-
-        stats = {
-            # Summary stats
-            'total_views': PropertyStat.objects.aggregate(total=Sum('views'))['total'] or 0,
-            'total_inquiries': PropertyStat.objects.aggregate(total=Sum('inquiries'))['total'] or 0,
-            'total_favorites': PropertyStat.objects.aggregate(total=Sum('favorites'))['total'] or 0,
-            'total_shares': PropertyStat.objects.aggregate(total=Sum('shares'))['total'] or 0,
-
-            # Period stats with daily breakdown
-            'stats_last_7_days': list(stats_last_7_days),
-
-            # Trends
-            'trends': trends,
-
-            # Popular properties
-            'popular_properties': [
-                {
-                    'id': p.id,
-                    'title': p.title,
-                    'location': p.location,
-                    'views': p.total_views or 0,
-                    'inquiries': p.total_inquiries or 0,
-                    'favorites': p.total_favorites or 0,
-                    'shares': p.total_shares or 0,
-                } for p in popular_properties
-            ],
-
-            # Platform stats
-            'total_users': User.objects.count(),
-            'active_listings': Property.objects.filter(is_published=True).count(),
-            'pending_listings': Property.objects.filter(is_published=False).count(),
-            'active_admins': User.objects.filter(is_staff=True).count(),
-
-            # Location breakdown
-            'popular_locations': list(Property.objects.values('location')
-                             .annotate(count=Count('id'))
-                             .order_by('-count')[:5]),
-
-            # Admin activity
-            'recent_actions': recent_actions_data,
-            'user_growth': list(user_growth),
-            'admin_activity': list(AdminActionLog.objects.values('action_type')
-                               .annotate(total=Count('id'))
-                               .order_by('-total')),
-        }
+            } for action in recent_actions
+        ]
         return Response(stats)
-    
+
+class StatsBackfillView(APIView):
+    """
+    Start, resume and watch chunked PropertyStat backfills.
+    GET lists recent runs (or one run with pk); POST starts a run of ?days
+    days, or resumes the unfinished chunks of run pk.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, pk=None):
+        from .models import BackfillRun
+
+        if pk is not None:
+            return Response(backfill_progress(get_object_or_404(BackfillRun, pk=pk)))
+        runs = BackfillRun.objects.prefetch_related('chunks')[:20]
+        return Response([backfill_progress(run) for run in runs])
+
+    def post(self, request, pk=None):
+        from datetime import date
+        from .models import BackfillRun
+        from .tasks import backfill_property_stats
+
+        if pk is not None:
+            run = get_object_or_404(BackfillRun, pk=pk)
+            if run.status == 'completed':
+                return Response({"detail": "Run already completed"}, status=400)
+        else:
+            try:
+                days = int(request.data.get('days', 30))
+                chunk_days = request.data.get('chunk_days')
+                chunk_days = int(chunk_days) if chunk_days not in (None, '') else None
+            except (TypeError, ValueError):
+                return Response({"detail": "days and chunk_days must be integers"}, status=400)
+            if days < 1 or (chunk_days is not None and chunk_days < 1):
+                return Response({"detail": "days and chunk_days must be at least 1"}, status=400)
+            days = min(days, getattr(settings, 'STATS_BACKFILL_MAX_DAYS', 730))
+            if chunk_days is not None:
+                chunk_days = min(chunk_days, days)
+            end_date = date.today() - timedelta(days=1)
+            run = plan_backfill(end_date - timedelta(days=days), end_date, chunk_days)
+
+        transaction.on_commit(lambda: backfill_property_stats.delay(run_id=run.id))
+        return Response(backfill_progress(run), status=status.HTTP_202_ACCEPTED)
+
 class UserDashboardView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -1065,7 +963,7 @@ class PropertyStatsView(APIView):
 
         # Date range parameters
         days = int(request.query_params.get('days', 30))
-        end_date = date.today()
+        end_date = timezone.localdate()  # The day live counters are kept for
         start_date = end_date - timedelta(days=days)
 
         # Get aggregated stats from PropertyStat
@@ -1093,6 +991,9 @@ class PropertyStatsView(APIView):
             shares=Sum('shares')
         )
 
+        # Today's counts not yet flushed from the live counters
+        live = pending_counts(property_obj.pk)
+
         # User type breakdown from raw interactions (for detailed analytics)
         user_types = PropertyInteraction.objects.filter(property=property_obj).annotate(
             is_authenticated=Case(
@@ -1111,16 +1012,12 @@ class PropertyStatsView(APIView):
                 'end_date': str(end_date),
             },
             'period_totals': {
-                'views': totals['views'] or 0,
-                'inquiries': totals['inquiries'] or 0,
-                'favorites': totals['favorites'] or 0,
-                'shares': totals['shares'] or 0,
+                metric: (totals[metric] or 0) + live[metric]
+                for metric in ('views', 'inquiries', 'favorites', 'shares')
             },
             'all_time_totals': {
-                'views': all_time['views'] or 0,
-                'inquiries': all_time['inquiries'] or 0,
-                'favorites': all_time['favorites'] or 0,
-                'shares': all_time['shares'] or 0,
+                metric: (all_time[metric] or 0) + live[metric]
+                for metric in ('views', 'inquiries', 'favorites', 'shares')
             },
             'daily_breakdown': daily_stats,
             'user_types': list(user_types),
@@ -1476,27 +1373,16 @@ class AgentViewSet(viewsets.ModelViewSet):
         """
         agent = self.get_object()
         
-        # Calculate statistics
-        total_properties = agent.agent_properties.count()
-        primary_properties = agent.agent_properties.filter(is_primary=True).count()
-        
-        # Get property statuses
-        available_properties = agent.agent_properties.filter(
-            property__status='available'
-        ).count()
-        sold_properties = agent.agent_properties.filter(
-            property__status='sold'
-        ).count()
-        pending_properties = agent.agent_properties.filter(
-            property__status='pending'
-        ).count()
+        def compute():
+            # One conditional aggregate instead of a count per status
+            return agent.agent_properties.aggregate(
+                total_properties=Count('id'),
+                primary_properties=Count('id', filter=Q(is_primary=True)),
+                available_properties=Count('id', filter=Q(property__status='available')),
+                sold_properties=Count('id', filter=Q(property__status='sold')),
+                pending_properties=Count('id', filter=Q(property__status='pending')),
+            )
         
-        stats = {
-            'total_properties': total_properties,
-            'primary_properties': primary_properties,
-            'available_properties': available_properties,
-            'sold_properties': sold_properties,
-            'pending_properties': pending_properties,
-        }
+        stats = cached(f'agent:{agent.pk}', compute, timeout=300, namespace=AGENT_STATS)
         
         return Response(stats)
\ No newline at end of file
@@ -2005,7 +2005,7 @@ const PropertyDashboard = () => {
           <motion.button
             whileHover={{ scale: 1.02 }}
             whileTap={{ scale: 0.98 }}
-            onClick={() => dispatch(fetchProperties())}
+            onClick={() => dispatch(fetchProperties({ view: "full" }))}
             className="px-6 py-3 bg-gradient-to-r from-[#C9A962] to-[#B8985A] text-[#0A1628] font-semibold rounded-xl"
           >
             Retry
@@ -189,7 +189,7 @@ const AgentDashboard = () => {
 
   useEffect(() => {
     dispatch(fetchAgents());
-    dispatch(fetchProperties());
+    dispatch(fetchProperties({ view: "full" }));
     dispatch(fetchLeads());
   }, [dispatch]);
 
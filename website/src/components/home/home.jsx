@@ -594,7 +594,7 @@ const PropertyCard = ({ property, index, variant = "default" }) => {
   const cardRef = useRef(null);
   const isInView = useInView(cardRef, { once: true, margin: "-100px" });
 
-  const primaryImage = property.images?.[0]?.image || "/hsp-fallback2.png";
+  const primaryImage = property.primary_image || property.images?.[0]?.image || "/hsp-fallback2.png";
 
   const formatPrice = (price) => {
     if (!price) return "POA";
@@ -361,7 +361,7 @@ const AllPropertiesMap = ({ height = '80vh', showFilters = true }) => {
   // Fetch properties if not already loaded
   useEffect(() => {
     if (properties.length === 0 && propertiesStatus !== 'loading') {
-      dispatch(fetchProperties({ page_size: 100 })); // Fetch more properties for the map
+      dispatch(fetchProperties({ page_size: 100, view: "full" })); // Fetch more properties for the map
     }
   }, [dispatch, properties.length, propertiesStatus]);
 
@@ -198,9 +198,9 @@ const PropertyCard = ({ property, viewMode, isFavorite, onToggleFavorite }) => {
       >
         {/* Image */}
         <div className={`relative overflow-hidden ${isGrid ? "h-56" : "w-1/3 h-auto min-h-[200px]"}`}>
-          {property.images && property.images.length > 0 ? (
+          {property.primary_image || property.images?.length > 0 ? (
             <img
-              src={property.images[0].image}
+              src={property.primary_image || property.images[0].image}
               alt={property.title}
               className="w-full h-full object-cover transform group-hover:scale-110 transition-transform duration-700"
               onError={(e) => {
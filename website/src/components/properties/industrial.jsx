@@ -343,9 +343,9 @@ const PropertyCard = React.memo(
             }`}
           >
             <div className="absolute inset-0 bg-gradient-to-r from-[#1E3A5F] to-[#0A1628]">
-              {property.images && property.images.length > 0 ? (
+              {property.primary_image || property.images?.length > 0 ? (
                 <img
-                  src={property.images[0].image}
+                  src={property.primary_image || property.images[0].image}
                   alt={property.title}
                   className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-500"
                   loading="lazy"
@@ -183,7 +183,7 @@ const PropertyCard = ({ property, savedPropertyIds, onToggleFavorite, onShare, i
   const cardRef = useRef(null);
   const isInView = useInView(cardRef, { once: true, margin: "-50px" });
 
-  const primaryImage = property.images?.[0]?.image || "/hsp-fallback2.png";
+  const primaryImage = property.primary_image || property.images?.[0]?.image || "/hsp-fallback2.png";
   const PropertyIcon = getPropertyIcon(property.property_type);
 
   const daysListed = useMemo(() => {
@@ -14,6 +14,8 @@ export const fetchProperties = createAsyncThunk(
       // Set default pagination if missing
       if (!cleanFilters.page) cleanFilters.page = 1;
       if (!cleanFilters.page_size) cleanFilters.page_size = 12;
+      // Listing grids only need cards; pass view: "full" for nested images and features
+      if (!cleanFilters.view) cleanFilters.view = "card";
       
       // Remove undefined values
       Object.keys(cleanFilters).forEach(